@@ -1,12 +1,19 @@
 import sys
 import os
 import importlib
+import threading
+import time
 import flet as ft
+import hashlib
 import subprocess
 import typing
 import shutil
-import numpy as np
-from lib.utils import set_config_value, load_config_toml
+from lib.modulation import DEFAULT_MODULATION, MODULATIONS
+from lib.params import ModemParams
+from lib.cache import WavCache, clean_cache_key, noisy_cache_key
+from lib.compression import compress_payload, decompress_payload
+from lib.profiling import Profiler
+from lib.utils import ConversionCancelled, bits_to_bytes, set_config_value, set_config_values, load_config_toml, wav_md5, write_wav
 
 WORK_DIR = os.path.dirname(os.path.abspath(__file__))
 config_template_path = os.path.join(WORK_DIR, "config.toml.in")
@@ -37,6 +44,8 @@ def main(page: ft.Page) -> None:
 
     # ノイズレベル
     noise_slider = ft.Slider(min=0, max=8, divisions=8, label="ノイズレベル: {value}", value=0)
+    # ノイズの乱数シード（同じシードならノイズ付加の結果もキャッシュから使い回す。空欄なら毎回ランダム）
+    noise_seed_input = ft.TextField(label="ノイズのシード（空欄で毎回ランダム）", value="", width=200)
 
     # config.tomlから初期値取得
     config = load_config_toml(config_path)
@@ -51,8 +60,8 @@ def main(page: ft.Page) -> None:
         width=180
     )
 
-    # ビットレート選択肢（9600Hzサンプリングで4800までOK）
-    bitrate_options = [300, 600, 1200, 2400, 4800]
+    # ビットレート選択肢（4800では側波帯が0Hzをまたいで折り返し、ノイズなしでも復元できないので2400まで）
+    bitrate_options = [300, 600, 1200, 2400]
     bitrate_dropdown = ft.Dropdown(
         label="ビットレート",
         options=[ft.dropdown.Option(str(b)) for b in bitrate_options],
@@ -60,9 +69,54 @@ def main(page: ft.Page) -> None:
         width=180
     )
 
+    # 検出方式選択肢（fft=帯域FFT, goertzel=2トーンのエネルギー比較, discriminator=位相連続FSK用の周波数弁別）
+    detector_dropdown = ft.Dropdown(
+        label="検出方式",
+        options=[ft.dropdown.Option(d) for d in decode_mod.DETECTOR_NAMES],
+        value="fft",
+        width=180
+    )
+
+    # 変調方式（4fsk/8fskは1シンボルで2/3ビット送るので、音声が1/2・1/3の長さになる）
+    modulation_init = config.get("MODULATION", DEFAULT_MODULATION)
+    modulation_dropdown = ft.Dropdown(
+        label="変調方式",
+        options=[ft.dropdown.Option(m) for m in MODULATIONS],
+        value=modulation_init if modulation_init in MODULATIONS else DEFAULT_MODULATION,
+        width=180
+    )
+
+    # FDMのチャンネル数（サンプリングレートが高いほど多くのチャンネルを同時に送れる）
+    channels_options = [1, 2, 4, 8]
+    channels_init = config.get("CHANNELS", 1)
+    channels_dropdown = ft.Dropdown(
+        label="チャンネル数",
+        options=[ft.dropdown.Option(str(c)) for c in channels_options],
+        value=str(channels_init) if channels_init in channels_options else "1",
+        width=180
+    )
+
+    # 位相連続FSK（2400bpsではdiscriminatorと組み合わせる）
+    continuous_phase_checkbox = ft.Checkbox(
+        label="位相連続FSK",
+        value=bool(config.get("CONTINUOUS_PHASE", False))
+    )
+
+    # 変調前の圧縮（デコード側はヘッダから判別して自動で展開する）
+    compress_checkbox = ft.Checkbox(label="変調前に圧縮", value=False)
+
+    # 並列数（エンコード・デコードのワーカー数）
+    workers_options = [1, 2, 4, 8, 16]
+    workers_dropdown = ft.Dropdown(
+        label="並列数",
+        options=[ft.dropdown.Option(str(w)) for w in workers_options],
+        value="1",
+        width=180
+    )
+
     def on_sample_rate_dropdown_change(e: ft.ControlEvent) -> None:
         if sample_rate_dropdown.value is not None:
-            set_config_value("SAMPLE_RATE", sample_rate_dropdown.value, config_path)
+            set_config_value("SAMPLE_RATE", int(sample_rate_dropdown.value), config_path)
         page.update()
     sample_rate_dropdown.on_change = on_sample_rate_dropdown_change
 
@@ -73,11 +127,6 @@ def main(page: ft.Page) -> None:
         page.update()
     bitrate_dropdown.on_change = on_bitrate_dropdown_change
 
-    def set_noise_level_config(level: int) -> None:
-        set_config_value("NOISE_LEVEL", level, config_path)
-    def set_bitrate_config(bitrate: int) -> None:
-        set_config_value("BITRATE", bitrate, config_path)
-
     # 実行ボタン
     run_btn = ft.ElevatedButton("変換開始", disabled=False)
 
@@ -86,6 +135,13 @@ def main(page: ft.Page) -> None:
     md5_text = ft.Text(value="", size=14)
     # スピナー
     progress_ring = ft.ProgressRing(visible=False)
+    # 進捗バーとキャンセルボタン
+    progress_bar = ft.ProgressBar(value=0, width=400)
+    progress_label = ft.Text(value="", size=12)
+    cancel_btn = ft.ElevatedButton("キャンセル", disabled=True)
+    # ステージごとの処理時間・メモリの表示
+    profile_text = ft.Text(value="", size=12, font_family="monospace")
+    profile_json_checkbox = ft.Checkbox(label="計測結果をstatic/profile.jsonに保存", value=False)
 
     # 音声再生ボタン
     play_encode_btn = ft.ElevatedButton("エンコードWAV再生", disabled=True)
@@ -101,85 +157,231 @@ def main(page: ft.Page) -> None:
     encode_wav_path = os.path.join(WORK_DIR, "static", "output_orig.wav")  # エンコードWAVはstatic/output_orig.wav
     noise_wav_path = os.path.join(WORK_DIR, "static", "output.wav")        # ノイズ付加WAVはstatic/output.wav
     orig_file_path = ""
+    # 直近の変換結果（再生時にWAVへ書き出すサンプル配列）
+    last_run: dict[str, typing.Any] = {}
+    # エンコード・ノイズ付加の結果のキャッシュ（入力の内容とパラメータが同じなら作り直さない）
+    wav_cache = WavCache(os.path.join(WORK_DIR, "static", "cache"))
 
     # Audioコントロール削除（外部アプリ再生に戻す）
 
-    def on_run(e: ft.ControlEvent) -> None:
-        # スピナー表示
-        progress_ring.visible = True
+    # バックグラウンド変換の状態（実行中スレッド、実行中に押された分をまとめて1回再実行するフラグ）
+    run_state: dict[str, typing.Any] = {"thread": None, "pending": False}
+    cancel_event = threading.Event()
+
+    def set_progress(fraction: float, stage_name: str) -> None:
+        progress_bar.value = fraction
+        progress_label.value = f"{stage_name}: {fraction * 100:.0f}%"
         page.update()
-        # ファイル名取得
-        nonlocal orig_file_path
-        file_path_from_input = file_name_input.value.strip() if file_name_input.value else ""
-        if file_path_from_input:
-            orig_file_path = file_path_from_input
-        if not orig_file_path:
-            result_text.value = translations[current_lang]["file_required"]
-            page.update()
-            return
-        noise_level = int(noise_slider.value)
-        bitrate = int(bitrate_dropdown.value) if bitrate_dropdown.value is not None else 1200
-        sample_rate = int(sample_rate_dropdown.value) if sample_rate_dropdown.value is not None else 9600
-        set_noise_level_config(noise_level)
-        set_bitrate_config(bitrate)
-        set_config_value("SAMPLE_RATE", sample_rate)
-        # staticディレクトリ作成（なければ）
-        static_dir = os.path.join(WORK_DIR, "static")
-        if not os.path.exists(static_dir):
-            os.makedirs(static_dir)
-        # ファイルエンコード
-        bit_string = encode.file_to_bitstring(orig_file_path)
-        encode.validate_bit_string(bit_string)
-        encode.generate_tone(bit_string, duration=1.0/bitrate, sample_rate=sample_rate, noise_level=noise_level, output_path=encode_wav_path)
-        # ノイズ付加
-        import shutil
-        shutil.copy2(encode_wav_path, noise_wav_path)
-        with open(noise_wav_path, "rb") as wf:
-            import wave
-            with wave.open(wf, 'rb') as wavf:
-                params = wavf.getparams()
-                frames = wavf.readframes(wavf.getnframes())
-                samples = np.frombuffer(frames, dtype=np.int16)
-        noisy_samples = noise_mod.add_noise(samples, sample_rate, noise_level)
-        with wave.open(noise_wav_path, 'wb') as wf:
-            wf.setparams(params)
-            wf.writeframes(noisy_samples.tobytes())
+
+    def stage_progress(stage_name: str, begin: float, end: float) -> typing.Callable[[float], None]:
+        """
+        ステージ内の進捗（0.0〜1.0）を全体の begin〜end に割り当てて表示するコールバックを作る。
+        キャンセルが要求されていれば ConversionCancelled を送出して処理を中断する。
+        """
+        last = {"time": 0.0}
+
+        def callback(fraction: float) -> None:
+            if cancel_event.is_set():
+                raise ConversionCancelled()
+            now = time.monotonic()
+            # 画面更新が多すぎないよう間引く
+            if fraction >= 1.0 or now - last["time"] >= 0.1:
+                last["time"] = now
+                set_progress(begin + (end - begin) * fraction, stage_name)
+
+        callback(0.0)
+        return callback
+
+    def run_conversion(
+        orig_file_path: str,
+        params: ModemParams,
+        detector: str,
+        workers: int,
+        static_dir: str,
+        compress: bool = False,
+        seed: typing.Optional[int] = None
+    ) -> None:
+        """変換処理本体（バックグラウンドスレッドで実行）"""
+        sample_rate = params.sample_rate
+        profiler = Profiler()
+        # ファイルエンコード（WAVには書かず、サンプル配列のままノイズ付加・デコードへ渡す）
+        with profiler.stage("read_input") as stage:
+            with open(orig_file_path, 'rb') as f:
+                orig_bytes = f.read()
+            stage.n_bytes = len(orig_bytes)
+        payload = orig_bytes
+        compressed = None
+        if compress:
+            with profiler.stage("compress", n_bytes=len(orig_bytes)):
+                compressed = compress_payload(orig_bytes)
+                payload = compressed.data
+        # キャッシュのキー: クリーンな音声は変調するデータの内容と変調パラメータ、ノイズ付加後はそれにノイズレベルとシードを加える
+        with profiler.stage("hash", n_bytes=len(payload)):
+            clean_key = clean_cache_key(payload, params)
+        cache_status = []
+        with profiler.stage("encode", n_bytes=len(payload)) as stage:
+            progress = stage_progress("encode", 0.0, 0.4)
+            cached = wav_cache.get(clean_key)
+            if cached is not None:
+                clean_samples = cached[0]
+                progress(1.0)
+            else:
+                # キーにノイズレベルを含めないので、エンコーダが加えるノイズもレベル0にする（ノイズは次の段で加える）
+                clean_samples = encode.encode_samples(
+                    payload, workers=workers, progress=progress, params=params.with_overrides(noise_level=0)
+                )
+                wav_cache.put(clean_key, clean_samples, sample_rate)
+            cache_status.append(f"エンコード: {'ヒット' if cached is not None else 'ミス'}")
+            stage.n_samples = len(clean_samples)
+        # ノイズ付加（ノイズレベル0ならクリーンな音声そのもの、シードが空欄なら毎回ランダムなのでキャッシュしない）
+        stage_progress("add_noise", 0.4, 0.5)
+        noisy_key = noisy_cache_key(clean_key, params.noise_level, seed)
+        with profiler.stage("add_noise", n_samples=len(clean_samples)):
+            cached = wav_cache.get(noisy_key) if noisy_key is not None else None
+            if cached is not None:
+                noisy_samples = cached[0]
+            else:
+                noisy_samples = noise_mod.add_noise(clean_samples, sample_rate, params.noise_level, seed)
+                if noisy_key is not None:
+                    wav_cache.put(noisy_key, noisy_samples, sample_rate)
+            if noisy_key is not None:
+                cache_status.append(f"ノイズ付加: {'ヒット' if cached is not None else 'ミス'}")
         # デコード
-        with open(orig_file_path, 'rb') as f:
-            orig_bytes = f.read()
-        correct_bit_string = ''.join(f'{b:08b}' for b in orig_bytes)
-        bit_string_decoded = decode_mod.decode_tone(noise_wav_path, correct_bit_string, duration=1.0/bitrate, sample_rate=sample_rate)
-        restored_bytes = decode_mod.bitstring_to_bytes(bit_string_decoded)
-        # エンコードWAVのMD5
-        import hashlib
-        with open(encode_wav_path, 'rb') as f:
-            encode_wav_md5 = hashlib.md5(f.read()).hexdigest()
-        encode_wav_md5_text.value = f"MD5: {encode_wav_md5}"
-        # ノイズ付加WAVのMD5
-        with open(noise_wav_path, 'rb') as f:
-            noise_wav_md5 = hashlib.md5(f.read()).hexdigest()
-        noise_wav_md5_text.value = f"MD5: {noise_wav_md5}"
+        with profiler.stage("decode", n_samples=len(noisy_samples)) as stage:
+            restored_bits = decode_mod.decode_samples(noisy_samples, detector=detector, workers=workers, progress=stage_progress("decode", 0.5, 0.95), params=params)
+            restored_bytes = bits_to_bytes(restored_bits)
+            stage.n_bytes = len(restored_bytes)
+        decompress_error = None
+        if compressed is not None:
+            try:
+                restored_bytes = decompress_payload(restored_bytes)
+            except ValueError as e:
+                decompress_error = str(e)
+        stage_progress("md5", 0.95, 1.0)
+        with profiler.stage("md5") as stage:
+            # 各WAVのMD5（WAVファイルは再生時に初めて書き出すので、ここではメモリ上で計算する）
+            encode_wav_md5_text.value = f"MD5: {wav_md5(clean_samples, sample_rate)}"
+            noise_wav_md5_text.value = f"MD5: {wav_md5(noisy_samples, sample_rate)}"
+            stage.n_samples = len(clean_samples) + len(noisy_samples)
+        # 再生用に保持（WAVファイルは再生ボタンが押されたときに1回だけ書く）
+        last_run.clear()
+        last_run.update({"encode": clean_samples, "noise": noisy_samples, "sample_rate": sample_rate, "written": set()})
         # 全体比較用MD5
         md5_text.value = ""
         orig_md5 = hashlib.md5(orig_bytes).hexdigest()
         restored_md5 = hashlib.md5(restored_bytes).hexdigest()
-        compare_result = f"[MD5] 元データ: {orig_md5}\n[MD5] 復元データ: {restored_md5}"
+        compare_result = f"[キャッシュ] {', '.join(cache_status)}\n[MD5] 元データ: {orig_md5}\n[MD5] 復元データ: {restored_md5}"
+        if compressed is not None:
+            compare_result = f"[圧縮] {compressed.describe()}\n" + compare_result
+        if decompress_error is not None:
+            compare_result += f"\n[NG] {decompress_error}"
         if orig_md5 == restored_md5:
             compare_result += "\n[OK] MD5一致: 完全復元"
         else:
             compare_result += "\n[NG] MD5不一致: データ化けあり"
         md5_text.value = compare_result
         result_text.value = translations[current_lang]["decode_result"]
+        set_progress(1.0, "done")
+        # ステージごとの計測結果
+        profile_text.value = profiler.report()
+        if profile_json_checkbox.value:
+            profiler.write_json(os.path.join(static_dir, "profile.json"))
         # ボタン有効化
         play_encode_btn.disabled = False
         play_noise_btn.disabled = False
         stop_encode_btn.disabled = False
         stop_noise_btn.disabled = False
-        # スピナー非表示
-        progress_ring.visible = False
-        page.update()
+
+    def conversion_worker(*args: typing.Any) -> None:
+        try:
+            run_conversion(*args)
+        except ConversionCancelled:
+            result_text.value = translations[current_lang]["cancelled"]
+        except Exception as ex:
+            result_text.value = f"[ERROR] {ex}"
+        finally:
+            # スピナー非表示
+            progress_ring.visible = False
+            cancel_btn.disabled = True
+            run_state["thread"] = None
+            page.update()
+        # 実行中に押された分は、最新のUI設定でまとめて1回だけ再実行する
+        if run_state["pending"]:
+            run_state["pending"] = False
+            start_conversion()
+
+    def start_conversion() -> None:
+        # ファイル名取得
+        nonlocal orig_file_path
+        file_path_from_input = file_name_input.value.strip() if file_name_input.value else ""
+        if file_path_from_input:
+            orig_file_path = file_path_from_input
+        if not orig_file_path:
+            result_text.value = translations[current_lang]["file_required"]
+            page.update()
+            return
+        noise_level = int(noise_slider.value)
+        bitrate = int(bitrate_dropdown.value) if bitrate_dropdown.value is not None else 1200
+        sample_rate = int(sample_rate_dropdown.value) if sample_rate_dropdown.value is not None else 9600
+        detector = detector_dropdown.value if detector_dropdown.value is not None else "fft"
+        workers = int(workers_dropdown.value) if workers_dropdown.value is not None else 1
+        seed_text = noise_seed_input.value.strip() if noise_seed_input.value else ""
+        try:
+            seed = int(seed_text) if seed_text else None
+        except ValueError:
+            result_text.value = translations[current_lang]["seed_invalid"]
+            page.update()
+            return
+        # パラメータは不変オブジェクトにしてスレッドへ渡す（config.tomlは変更があったときだけ1回で書き込む）
+        continuous_phase = bool(continuous_phase_checkbox.value)
+        modulation = modulation_dropdown.value if modulation_dropdown.value is not None else DEFAULT_MODULATION
+        channels = int(channels_dropdown.value) if channels_dropdown.value is not None else 1
+        params = ModemParams(
+            bitrate=bitrate, sample_rate=sample_rate, noise_level=noise_level, continuous_phase=continuous_phase,
+            modulation=modulation, channels=channels
+        )
+        # デコードできない組み合わせ（4fsk/8fskで600を超えるビットレートなど）は変換を始めない
+        try:
+            params.validate()
+        except ValueError as ex:
+            result_text.value = f"[ERROR] {ex}"
+            page.update()
+            return
+        set_config_values(params.to_config(), config_path)
+        # staticディレクトリ作成（なければ）
+        static_dir = os.path.join(WORK_DIR, "static")
+        if not os.path.exists(static_dir):
+            os.makedirs(static_dir)
+        # スピナー・進捗表示
+        cancel_event.clear()
+        progress_ring.visible = True
+        cancel_btn.disabled = False
+        result_text.value = ""
+        set_progress(0.0, "encode")
+        thread = threading.Thread(
+            target=conversion_worker,
+            args=(orig_file_path, params, detector, workers, static_dir, bool(compress_checkbox.value), seed),
+            daemon=True,
+        )
+        run_state["thread"] = thread
+        thread.start()
+
+    def on_run(e: ft.ControlEvent) -> None:
+        thread = run_state["thread"]
+        if thread is not None and thread.is_alive():
+            # 実行中の連打は1回の再実行にまとめる
+            run_state["pending"] = True
+            result_text.value = translations[current_lang]["queued"]
+            page.update()
+            return
+        start_conversion()
+
+    def on_cancel(e: ft.ControlEvent) -> None:
+        run_state["pending"] = False
+        cancel_event.set()
 
     run_btn.on_click = on_run
+    cancel_btn.on_click = on_cancel
 
     # 再生停止用
     play_process: dict[str, typing.Any] = {"encode": None, "noise": None}
@@ -187,8 +389,6 @@ def main(page: ft.Page) -> None:
     play_indicator = ft.Text(value="", size=12)
     play_indicator_stop_flag: dict[str, bool] = {"encode": False, "noise": False}
 
-    import time
-    import threading
     import wave as pywave
 
     def format_time(sec: float) -> str:
@@ -244,11 +444,20 @@ def main(page: ft.Page) -> None:
             proc = subprocess.Popen(["start", path], shell=True)
         play_process[kind] = proc
 
+    def ensure_wav(kind: str) -> None:
+        """直近の変換結果のWAVを、まだ書いていなければ書き出す"""
+        if kind in last_run.get("written", set()):
+            return
+        path = encode_wav_path if kind == "encode" else noise_wav_path
+        write_wav(path, last_run[kind], last_run["sample_rate"])
+        last_run["written"].add(kind)
+
     def play_encode_btn_click(e):
         if os.name == "nt" and not wav_play_notice_shown["encode"]:
             page.snack_bar = ft.SnackBar(ft.Text("外部プレイヤーで流しているので、停止は外部プレイヤーの終了をしてから押してください"), open=True)
             page.update()
             wav_play_notice_shown["encode"] = True
+        ensure_wav("encode")
         play_wav(encode_wav_path, "encode")
 
     def play_noise_btn_click(e):
@@ -256,6 +465,7 @@ def main(page: ft.Page) -> None:
             page.snack_bar = ft.SnackBar(ft.Text("外部プレイヤーで流しているので、停止は外部プレイヤーの終了をしてから押してください"), open=True)
             page.update()
             wav_play_notice_shown["noise"] = True
+        ensure_wav("noise")
         play_wav(noise_wav_path, "noise")
 
     play_encode_btn.on_click = play_encode_btn_click
@@ -282,8 +492,20 @@ def main(page: ft.Page) -> None:
             "run": "変換開始",
             "file_label": "変換元ファイル名（パス）",
             "noise_level": "ノイズレベル",
+            "noise_seed": "ノイズのシード（空欄で毎回ランダム）",
+            "seed_invalid": "ノイズのシードは整数で指定してください",
             "sample_rate": "サンプリングレート",
             "bitrate": "ビットレート",
+            "detector": "検出方式",
+            "modulation": "変調方式",
+            "channels": "チャンネル数",
+            "workers": "並列数",
+            "continuous_phase": "位相連続FSK",
+            "compress": "変調前に圧縮",
+            "profile_json": "計測結果をstatic/profile.jsonに保存",
+            "cancel": "キャンセル",
+            "cancelled": "変換をキャンセルしました",
+            "queued": "実行中です。終了後に最新の設定でもう一度実行します",
             "encode_wav": "エンコードWAV",
             "noise_wav": "ノイズ付加WAV",
             "decode_result": "デコード結果を表示しました（内容は非表示）",
@@ -298,8 +520,20 @@ def main(page: ft.Page) -> None:
             "run": "开始转换",
             "file_label": "源文件名（路径）",
             "noise_level": "噪声等级",
+            "noise_seed": "噪声随机种子（留空则每次随机）",
+            "seed_invalid": "噪声随机种子请输入整数",
             "sample_rate": "采样率",
             "bitrate": "比特率",
+            "detector": "检测方式",
+            "modulation": "调制方式",
+            "channels": "信道数",
+            "workers": "并行数",
+            "continuous_phase": "相位连续FSK",
+            "compress": "调制前压缩",
+            "profile_json": "将测量结果保存到static/profile.json",
+            "cancel": "取消",
+            "cancelled": "已取消转换",
+            "queued": "正在运行。结束后将以最新设置再运行一次",
             "encode_wav": "编码WAV",
             "noise_wav": "加噪WAV",
             "decode_result": "解码结果已显示（内容隐藏）",
@@ -314,8 +548,20 @@ def main(page: ft.Page) -> None:
             "run": "ပြောင်းလဲမှုစတင်ပါ",
             "file_label": "မူရင်းဖိုင်နာမည် (လမ်းကြောင်း)",
             "noise_level": "ဆူညံသံအဆင့်",
+            "noise_seed": "ဆူညံသံ seed (ဗလာထားလျှင် အကြိမ်တိုင်း ကျပန်း)",
+            "seed_invalid": "ဆူညံသံ seed ကို ကိန်းပြည့်ဖြင့် ထည့်ပါ",
             "sample_rate": "နမူနာနှုန်း",
             "bitrate": "ဘစ်နှုန်း",
+            "detector": "ရှာဖွေမှုနည်းလမ်း",
+            "modulation": "မော်ဂျူလေးရှင်းနည်းလမ်း",
+            "channels": "ချန်နယ်အရေအတွက်",
+            "workers": "အပြိုင်လုပ်ဆောင်မှုအရေအတွက်",
+            "continuous_phase": "အဆင့်ဆက်တိုက် FSK",
+            "compress": "မော်ဂျူလိတ်မလုပ်မီ ချုံ့ရန်",
+            "profile_json": "တိုင်းတာမှုရလဒ်ကို static/profile.json တွင် သိမ်းဆည်းရန်",
+            "cancel": "ပယ်ဖျက်ရန်",
+            "cancelled": "ပြောင်းလဲမှုကို ပယ်ဖျက်လိုက်ပါပြီ",
+            "queued": "လုပ်ဆောင်နေဆဲဖြစ်သည်။ ပြီးဆုံးပြီးနောက် နောက်ဆုံးဆက်တင်ဖြင့် ထပ်မံလုပ်ဆောင်ပါမည်",
             "encode_wav": "Encode WAV",
             "noise_wav": "Noise WAV",
             "decode_result": "ပြန်ဖတ်ရလဒ် ပြသပြီး (အကြောင်းအရာ မပြသပါ)",
@@ -330,8 +576,20 @@ def main(page: ft.Page) -> None:
             "run": "রূপান্তর শুরু করুন",
             "file_label": "ফাইলের নাম (পথ)",
             "noise_level": "নয়েজ স্তর",
+            "noise_seed": "নয়েজ সিড (খালি রাখলে প্রতিবার এলোমেলো)",
+            "seed_invalid": "নয়েজ সিড একটি পূর্ণসংখ্যা হতে হবে",
             "sample_rate": "স্যাম্পল রেট",
             "bitrate": "বিটরেট",
+            "detector": "সনাক্তকরণ পদ্ধতি",
+            "modulation": "মডুলেশন পদ্ধতি",
+            "channels": "চ্যানেল সংখ্যা",
+            "workers": "সমান্তরাল কর্মী সংখ্যা",
+            "continuous_phase": "ধারাবাহিক ফেজ FSK",
+            "compress": "মডুলেশনের আগে সংকোচন",
+            "profile_json": "পরিমাপের ফলাফল static/profile.json-এ সংরক্ষণ করুন",
+            "cancel": "বাতিল",
+            "cancelled": "রূপান্তর বাতিল করা হয়েছে",
+            "queued": "চলমান। শেষ হলে সর্বশেষ সেটিংসে আবার চালানো হবে",
             "encode_wav": "এনকোড WAV",
             "noise_wav": "নয়েজ WAV",
             "decode_result": "ডিকোড ফলাফল দেখানো হয়েছে (বিষয়বস্তু লুকানো)",
@@ -354,13 +612,26 @@ def main(page: ft.Page) -> None:
         page.title = t["title"]
         file_name_input.label = t["file_label"]
         noise_slider.label = t["noise_level"] + ": {value}"
+        noise_seed_input.label = t["noise_seed"]
         sample_rate_dropdown.label = t["sample_rate"]
         bitrate_dropdown.label = t["bitrate"]
+        detector_dropdown.label = t["detector"]
+        modulation_dropdown.label = t["modulation"]
+        channels_dropdown.label = t["channels"]
+        workers_dropdown.label = t["workers"]
+        continuous_phase_checkbox.label = t["continuous_phase"]
+        compress_checkbox.label = t["compress"]
+        profile_json_checkbox.label = t["profile_json"]
         run_btn.text = t["run"]
+        cancel_btn.text = t["cancel"]
         # サイドラベルも更新
         noise_label.value = t["noise_level"]
         sample_rate_label.value = t["sample_rate"]
         bitrate_label.value = t["bitrate"]
+        detector_label.value = t["detector"]
+        modulation_label.value = t["modulation"]
+        channels_label.value = t["channels"]
+        workers_label.value = t["workers"]
         encode_wav_label.value = t["encode_wav"]
         noise_wav_label.value = t["noise_wav"]
         play_encode_btn.text = t["play_encode"]
@@ -371,12 +642,17 @@ def main(page: ft.Page) -> None:
         noise_wav_md5_text.value = ""
         result_text.value = ""
         md5_text.value = ""
+        profile_text.value = ""
         page.update()
 
     # サイドラベル用Text
     noise_label = ft.Text(translations[current_lang]["noise_level"], size=14, weight=ft.FontWeight.BOLD)
     sample_rate_label = ft.Text(translations[current_lang]["sample_rate"], size=14, weight=ft.FontWeight.BOLD)
     bitrate_label = ft.Text(translations[current_lang]["bitrate"], size=14, weight=ft.FontWeight.BOLD)
+    detector_label = ft.Text(translations[current_lang]["detector"], size=14, weight=ft.FontWeight.BOLD)
+    modulation_label = ft.Text(translations[current_lang]["modulation"], size=14, weight=ft.FontWeight.BOLD)
+    channels_label = ft.Text(translations[current_lang]["channels"], size=14, weight=ft.FontWeight.BOLD)
+    workers_label = ft.Text(translations[current_lang]["workers"], size=14, weight=ft.FontWeight.BOLD)
     encode_wav_label = ft.Text(translations[current_lang]["encode_wav"], size=12, weight=ft.FontWeight.BOLD)
     noise_wav_label = ft.Text(translations[current_lang]["noise_wav"], size=12, weight=ft.FontWeight.BOLD)
 
@@ -396,10 +672,21 @@ def main(page: ft.Page) -> None:
                 lang_dropdown,
                 noise_label,
                 noise_slider,
+                noise_seed_input,
                 sample_rate_label,
                 sample_rate_dropdown,
                 bitrate_label,
                 bitrate_dropdown,
+                detector_label,
+                detector_dropdown,
+                modulation_label,
+                modulation_dropdown,
+                channels_label,
+                channels_dropdown,
+                continuous_phase_checkbox,
+                compress_checkbox,
+                workers_label,
+                workers_dropdown,
             ], alignment=ft.MainAxisAlignment.START, width=220),
             ft.VerticalDivider(width=1),
             ft.Column(filter_none([
@@ -407,10 +694,13 @@ def main(page: ft.Page) -> None:
                     file_name_input,
                     file_name_label
                 ], alignment=ft.MainAxisAlignment.START),
-                run_btn,
-                progress_ring,
+                ft.Row([run_btn, cancel_btn, progress_ring], alignment=ft.MainAxisAlignment.START),
+                progress_bar,
+                progress_label,
                 result_text,
                 md5_text,
+                profile_json_checkbox,
+                profile_text,
                 play_indicator if os.name != "nt" else None,
                 ft.Row([
                     ft.Column([
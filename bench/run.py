@@ -0,0 +1,249 @@
+"""
+エンコード・ノイズ付加・WAV読み込み・デコードのスループットを
+ビットレート × サンプリングレート × ペイロードサイズの組み合わせで計測するベンチマーク。
+
+使い方:
+    python -m bench.run --output bench.json
+    python -m bench.run --baseline bench.json --threshold 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from lib import decode, encode, noise
+from lib.params import ModemParams
+from lib.utils import bytes_to_bits, read_wav_file, wav_header
+
+BITRATES = [300, 600, 1200, 2400]  # app.pyのビットレート選択肢
+SAMPLE_RATES = [8000, 9600, 16000, 22050, 44100, 48000]  # app.pyのサンプリングレート選択肢
+PAYLOAD_SIZES = [256, 4096]  # ペイロードのバイト数
+NOISE_LEVELS = list(range(9))
+MIN_COMPARE_SECONDS = 0.001  # これより短い計測はベースライン比較の対象外
+# 結果を突き合わせるときのキー
+RESULT_KEYS = ("stage", "bitrate", "sample_rate", "payload_bytes", "noise_level")
+
+
+def measure(func: Callable[[], Any], repeat: int) -> tuple[float, int, Any]:
+    """
+    func を repeat 回実行して最短の経過時間を求め、別に1回だけ tracemalloc でピークメモリを測る。
+
+    :return: (最短秒数, ピーク確保バイト数, 最後の戻り値)
+    """
+    best = float("inf")
+    result = None
+    # 計測対象のprint出力は表示しない
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+def bit_error_rate(expected: np.ndarray, actual: np.ndarray) -> float:
+    """ビット誤り率（長さが違う場合は足りない分を誤りとして数える）"""
+    n = min(len(expected), len(actual))
+    errors = int(np.count_nonzero(expected[:n] != actual[:n])) + abs(len(expected) - len(actual))
+    return errors / max(len(expected), 1)
+
+
+def record(
+    stage: str,
+    bitrate: int,
+    sample_rate: int,
+    payload_bytes: int,
+    noise_level: Optional[int],
+    seconds: float,
+    peak: int,
+    n_bits: int,
+    n_samples: int,
+    ber: Optional[float] = None
+) -> dict[str, Any]:
+    return {
+        "stage": stage,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "payload_bytes": payload_bytes,
+        "noise_level": noise_level,
+        "seconds": seconds,
+        "bits_per_s": n_bits / seconds if seconds > 0 else None,
+        "samples_per_s": n_samples / seconds if seconds > 0 else None,
+        "peak_bytes": peak,
+        "ber": ber,
+    }
+
+
+def cell_params(bitrate: int, sample_rate: int) -> ModemParams:
+    """計測に使う変調パラメータ（bfsk・1チャンネル・位相連続なし・エンコーダのノイズ0）"""
+    return ModemParams(bitrate=bitrate, sample_rate=sample_rate, noise_level=0)
+
+
+def bench_cell(
+    bitrate: int,
+    sample_rate: int,
+    payload_bytes: int,
+    noise_levels: list[int],
+    repeat: int,
+    work_dir: str,
+    seed: int
+) -> list[dict[str, Any]]:
+    """1つの（ビットレート, サンプリングレート, ペイロードサイズ）の組み合わせを計測する"""
+    results = []
+    rng = np.random.default_rng(seed)
+    payload = rng.integers(0, 256, payload_bytes, dtype=np.uint8).tobytes()
+    bits = bytes_to_bits(payload)
+    # 変調方式やチャンネル数がconfig.tomlの設定で変わらないよう、パラメータはすべて明示する
+    params = cell_params(bitrate, sample_rate)
+    samples_per_tone = int(params.samples_per_bit())
+    wav_path = os.path.join(work_dir, f"bench_{bitrate}_{sample_rate}_{payload_bytes}.wav")
+    n_samples = len(bits) * samples_per_tone
+
+    def run_encode() -> None:
+        encode.encode_bits(bits, output_path=wav_path, params=params)
+
+    seconds, peak, _ = measure(run_encode, repeat)
+    results.append(record("generate_tone", bitrate, sample_rate, payload_bytes, None, seconds, peak, len(bits), n_samples))
+
+    def run_read() -> np.ndarray:
+        samples = read_wav_file(wav_path)
+        # メモリマップは遅延読み込みなので、全サンプルに一度触れるところまでを計測する
+        samples.sum()
+        return samples
+
+    seconds, peak, samples = measure(run_read, repeat)
+    results.append(record("read_wav_file", bitrate, sample_rate, payload_bytes, None, seconds, peak, len(bits), len(samples)))
+    clean = np.array(samples)
+    del samples
+
+    for noise_level in noise_levels:
+        seconds, peak, noisy = measure(lambda: noise.add_noise(clean, sample_rate, noise_level, seed=seed), repeat)
+        results.append(record("add_noise", bitrate, sample_rate, payload_bytes, noise_level, seconds, peak, len(bits), len(clean)))
+
+        noisy_path = os.path.join(work_dir, f"bench_{bitrate}_{sample_rate}_{payload_bytes}_noise{noise_level}.wav")
+        with open(noisy_path, "wb") as f:
+            f.write(wav_header(len(noisy), sample_rate))
+            f.write(noisy.astype('<i2', copy=False).tobytes())
+        seconds, peak, decoded = measure(
+            lambda: decode.decode_bits(noisy_path, params=params), repeat,
+        )
+        os.remove(noisy_path)
+        results.append(record(
+            "decode_tone", bitrate, sample_rate, payload_bytes, noise_level, seconds, peak,
+            len(bits), len(noisy), bit_error_rate(bits, decoded),
+        ))
+
+    os.remove(wav_path)
+    return results
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    threshold: float,
+    min_seconds: float = MIN_COMPARE_SECONDS
+) -> list[str]:
+    """
+    ベースラインと比べて threshold（割合）以上遅くなった項目の説明を返す。
+    ベースラインが min_seconds 未満の項目は計測誤差が大きいので比較しない。
+    """
+    base_by_key = {tuple(r[k] for k in RESULT_KEYS): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = base_by_key.get(tuple(r[k] for k in RESULT_KEYS))
+        if base is None or base["seconds"] < min_seconds:
+            continue
+        ratio = r["seconds"] / base["seconds"]
+        if ratio > 1 + threshold:
+            label = ", ".join(f"{k}={r[k]}" for k in RESULT_KEYS if r[k] is not None)
+            regressions.append(f"{label}: {base['seconds']*1000:.2f}ms -> {r['seconds']*1000:.2f}ms (x{ratio:.2f})")
+    return regressions
+
+
+def print_table(results: list[dict[str, Any]]) -> None:
+    print(f"{'stage':<14}{'bitrate':>8}{'rate':>7}{'bytes':>8}{'noise':>6}{'ms':>10}{'kbit/s':>13}{'Msamp/s':>11}{'peakMB':>8}{'BER':>8}")
+    for r in results:
+        noise_level = "" if r["noise_level"] is None else r["noise_level"]
+        ber = "" if r["ber"] is None else f"{r['ber']:.4f}"
+        bits_per_s = (r["bits_per_s"] or 0) / 1000
+        samples_per_s = (r["samples_per_s"] or 0) / 1e6
+        print(
+            f"{r['stage']:<14}{r['bitrate']:>8}{r['sample_rate']:>7}{r['payload_bytes']:>8}{noise_level!s:>6}"
+            f"{r['seconds']*1000:>10.2f}{bits_per_s:>13.1f}{samples_per_s:>11.2f}{r['peak_bytes']/1e6:>8.2f}{ber:>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="エンコード/ノイズ/デコードのスループットを計測する")
+    parser.add_argument('--bitrates', type=int, nargs='+', default=BITRATES, help='計測するビットレート')
+    parser.add_argument('--sample-rates', type=int, nargs='+', default=SAMPLE_RATES, help='計測するサンプリングレート')
+    parser.add_argument('--sizes', type=int, nargs='+', default=PAYLOAD_SIZES, help='ペイロードのバイト数')
+    parser.add_argument('--noise-levels', type=int, nargs='+', default=NOISE_LEVELS, help='計測するノイズレベル')
+    parser.add_argument('--repeat', type=int, default=3, help='各計測の繰り返し回数（最短時間を採用）')
+    parser.add_argument('--seed', type=int, default=0, help='ペイロードとノイズの乱数シード')
+    parser.add_argument('--output', type=str, help='結果のJSONを書き出すパス')
+    parser.add_argument('--baseline', type=str, help='比較するベースラインのJSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='この割合以上遅くなったら回帰とみなす')
+    parser.add_argument('--min-seconds', type=float, default=MIN_COMPARE_SECONDS, help='ベースラインがこれより短い項目は比較しない')
+    args = parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for bitrate in args.bitrates:
+            for sample_rate in args.sample_rates:
+                try:
+                    cell_params(bitrate, sample_rate).validate()
+                except ValueError as e:
+                    # 復元できない組み合わせのBERは偶然と同じなので、ベースラインに載せない
+                    print(f"[SKIP] {bitrate}bps / {sample_rate}Hz: {e}")
+                    continue
+                for payload_bytes in args.sizes:
+                    results.extend(bench_cell(
+                        bitrate, sample_rate, payload_bytes, args.noise_levels, args.repeat, work_dir, args.seed,
+                    ))
+    print_table(results)
+
+    if args.output:
+        report = {
+            "meta": {
+                "python": sys.version.split()[0],
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] 結果を書き出しました: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"[NG] {len(regressions)}件の性能低下（しきい値 {args.threshold:.0%}）:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"[OK] ベースラインからの性能低下なし（しきい値 {args.threshold:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
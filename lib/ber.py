@@ -0,0 +1,259 @@
+from lib.decode import DETECTOR_NAMES, decode_samples
+from lib.encode import encode_samples
+from lib.framing import FRAME_PAYLOAD_SIZE, frame_bytes, unframe_bytes
+from lib.modulation import MODULATIONS
+from lib.noise import add_noise
+from lib.params import ModemParams
+from lib.utils import BitErrorStats, bit_error_stats, bits_to_bytes, bytes_to_bits
+import argparse
+import contextlib
+import csv
+import io
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+NOISE_LEVELS = list(range(9))  # add_noiseのノイズレベル（0〜8）
+BITRATES = [300, 1200]
+SAMPLE_RATES = [8000, 44100]
+DEFAULT_TRIALS = 20
+DEFAULT_PAYLOAD_BYTES = 256
+CSV_FIELDS = (
+    "bitrate", "sample_rate", "noise_level", "trials", "ber", "byte_error_rate", "frame_error_rate",
+    "first_error_min", "first_error_mean", "bit_errors", "n_bits", "goodput_bps",
+)
+
+
+class SweepCell(NamedTuple):
+    """BERスイープの1マス（この組み合わせで trials 回試行する）"""
+    bitrate: int
+    sample_rate: int
+    noise_level: int
+
+
+class TrialResult(NamedTuple):
+    """1回の試行の結果"""
+    errors: BitErrorStats
+    delivered_bits: int  # 受信側が正しいと判断できたペイロードのビット数（フレームなしでは全体が正しいときだけ）
+    seconds: float  # 音声の長さ
+
+
+class CellResult(NamedTuple):
+    """1マス分の試行をまとめた結果"""
+    cell: SweepCell
+    trials: int
+    n_bits: int  # 全試行の正解のビット数の合計
+    bit_errors: int
+    n_bytes: int
+    byte_errors: int
+    failed_trials: int  # 1ビットでも誤りがあった試行の数
+    first_error_min: Optional[int]  # 全試行で最も早い誤りの位置
+    first_error_mean: Optional[float]  # 誤りがあった試行での、最初の誤りの位置の平均
+    delivered_bits: int
+    seconds: float
+
+    @property
+    def ber(self) -> float:
+        return self.bit_errors / max(self.n_bits, 1)
+
+    @property
+    def byte_error_rate(self) -> float:
+        return self.byte_errors / max(self.n_bytes, 1)
+
+    @property
+    def frame_error_rate(self) -> float:
+        """ペイロード全体を正しく復元できなかった試行の割合"""
+        return self.failed_trials / max(self.trials, 1)
+
+    @property
+    def goodput(self) -> float:
+        """実効スループット（音声1秒あたりに正しく届いたペイロードのビット数）"""
+        return self.delivered_bits / self.seconds if self.seconds > 0 else 0.0
+
+
+def run_trial(
+    params: ModemParams,
+    noise_level: int,
+    payload_bytes: int,
+    detector: str,
+    entropy: tuple[int, ...],
+    framing: Optional[int] = None
+) -> TrialResult:
+    """
+    ランダムなペイロードを エンコード → add_noise → デコード して、正解と比べる。
+
+    :param params: 変調パラメータ（noise_level はエンコード時には使わず、add_noise の強さは引数で渡す）
+    :param entropy: ペイロードとノイズの乱数シード（同じ値なら同じペイロード・ノイズになる）
+    :param framing: 指定するとこのバイト数ずつのブロックにCRC32とFECを付けて送り、フレームを外してから比べる
+    """
+    payload_seed, noise_seed = np.random.SeedSequence(entropy).generate_state(2)
+    payload = np.random.default_rng(payload_seed).integers(0, 256, payload_bytes, dtype=np.uint8).tobytes()
+    sent = frame_bytes(payload, framing) if framing else payload
+    # 短いセグメントの警告などは表に混ざらないよう捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        clean = encode_samples(sent, params=params.with_overrides(noise_level=0))
+        noisy = add_noise(clean, params.sample_rate, noise_level, seed=int(noise_seed))
+        decoded = decode_samples(noisy, detector=detector, params=params)
+    seconds = len(noisy) / params.sample_rate
+    if not framing:
+        errors = bit_error_stats(bytes_to_bits(payload), decoded)
+        return TrialResult(errors, errors.n_bits if errors.bit_errors == 0 else 0, seconds)
+    report = unframe_bytes(bits_to_bytes(decoded), framing)
+    errors = bit_error_stats(bytes_to_bits(payload), bytes_to_bits(report.data))
+    # CRCが合ったブロックは受信側で正しいと分かるので、失敗したブロックだけ送り直せばよい
+    lost = sum(min(framing, payload_bytes - seq * framing) for seq in report.failed if seq * framing < payload_bytes)
+    return TrialResult(errors, (payload_bytes - lost) * 8, seconds)
+
+
+def _run_trial_task(task: tuple[ModemParams, int, int, str, tuple[int, ...], Optional[int]]) -> TrialResult:
+    """プロセスプールから呼ぶための1引数版"""
+    return run_trial(*task)
+
+
+def summarize(cell: SweepCell, trials: list[TrialResult]) -> CellResult:
+    """1マス分の試行の比較結果を合計する"""
+    stats = [t.errors for t in trials]
+    firsts = np.array([s.first_error for s in stats if s.first_error is not None], dtype=np.int64)
+    return CellResult(
+        cell=cell,
+        trials=len(stats),
+        n_bits=sum(s.n_bits for s in stats),
+        bit_errors=sum(s.bit_errors for s in stats),
+        n_bytes=sum(s.n_bytes for s in stats),
+        byte_errors=sum(s.byte_errors for s in stats),
+        failed_trials=len(firsts),
+        first_error_min=int(firsts.min()) if len(firsts) > 0 else None,
+        first_error_mean=float(firsts.mean()) if len(firsts) > 0 else None,
+        delivered_bits=sum(t.delivered_bits for t in trials),
+        seconds=sum(t.seconds for t in trials),
+    )
+
+
+def sweep(
+    params: ModemParams,
+    bitrates: list[int],
+    sample_rates: list[int],
+    noise_levels: list[int],
+    trials: int = DEFAULT_TRIALS,
+    payload_bytes: int = DEFAULT_PAYLOAD_BYTES,
+    detector: str = "fft",
+    workers: int = 1,
+    seed: int = 0,
+    progress: Optional[Callable[[float], None]] = None,
+    framing: Optional[int] = None
+) -> list[CellResult]:
+    """
+    ビットレート × サンプリングレート × ノイズレベルの各マスで trials 回ずつ試行し、誤り率を求める。
+    試行はすべて独立なので、workers が2以上ならプロセスプールでまとめて並列に実行する。
+
+    :param params: 変調方式・チャンネル数・位相連続モードなど、グリッド以外のパラメータ
+    :param seed: ペイロードとノイズの乱数シード（マスと試行の番号と組み合わせるので、並列数によらず同じ値になる。
+                 エンコーダ自身が加える小さなノイズはシードの対象外）
+    :param progress: 進捗（0.0〜1.0）を受け取るコールバック
+    :param framing: 指定するとこのバイト数ずつのブロックにCRC32とFECを付けて送る（lib.framing）
+    """
+    if detector not in DETECTOR_NAMES:
+        raise ValueError(f"未対応の検出方式です: {detector}")
+    cells: list[tuple[SweepCell, ModemParams]] = []
+    for bitrate in bitrates:
+        for sample_rate in sample_rates:
+            cell_params = params.with_overrides(bitrate=bitrate, sample_rate=sample_rate)
+            # デコードできないビットレートや、このサンプリングレートに収まらないチャンネル数ならここで ValueError
+            cell_params.validate()
+            cells.extend((SweepCell(bitrate, sample_rate, level), cell_params) for level in noise_levels)
+    tasks = [
+        (cell_params, cell.noise_level, payload_bytes, detector, (seed, index, trial), framing)
+        for index, (cell, cell_params) in enumerate(cells)
+        for trial in range(trials)
+    ]
+    stats: list[TrialResult] = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # 1つずつ送るとプロセス間通信の方が重くなるので、ある程度まとめて渡す
+            chunksize = max(1, len(tasks) // (workers * 8))
+            for result in pool.map(_run_trial_task, tasks, chunksize=chunksize):
+                stats.append(result)
+                if progress is not None:
+                    progress(len(stats) / len(tasks))
+    else:
+        for task in tasks:
+            stats.append(_run_trial_task(task))
+            if progress is not None:
+                progress(len(stats) / len(tasks))
+    return [summarize(cell, stats[i * trials:(i + 1) * trials]) for i, (cell, _) in enumerate(cells)]
+
+
+def result_row(result: CellResult) -> dict[str, object]:
+    """CSVの1行（CSV_FIELDS のキーのdict）"""
+    return {
+        "bitrate": result.cell.bitrate,
+        "sample_rate": result.cell.sample_rate,
+        "noise_level": result.cell.noise_level,
+        "trials": result.trials,
+        "ber": result.ber,
+        "byte_error_rate": result.byte_error_rate,
+        "frame_error_rate": result.frame_error_rate,
+        "first_error_min": result.first_error_min,
+        "first_error_mean": result.first_error_mean,
+        "bit_errors": result.bit_errors,
+        "n_bits": result.n_bits,
+        "goodput_bps": result.goodput,
+    }
+
+
+def write_csv(path: str, results: list[CellResult]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result_row(result))
+
+
+def print_table(results: list[CellResult]) -> None:
+    print(f"{'bitrate':>8}{'rate':>7}{'noise':>6}{'trials':>7}{'BER':>11}{'byteER':>11}{'FER':>7}{'first':>8}{'mean1st':>10}{'goodput':>10}")
+    for r in results:
+        first = "" if r.first_error_min is None else r.first_error_min
+        mean_first = "" if r.first_error_mean is None else f"{r.first_error_mean:.0f}"
+        print(
+            f"{r.cell.bitrate:>8}{r.cell.sample_rate:>7}{r.cell.noise_level:>6}{r.trials:>7}"
+            f"{r.ber:>11.3e}{r.byte_error_rate:>11.3e}{r.frame_error_rate:>7.2f}{first!s:>8}{mean_first:>10}{r.goodput:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="エンコード → ノイズ → デコードを繰り返し、条件ごとのビット誤り率を求める")
+    parser.add_argument('--bitrates', type=int, nargs='+', default=BITRATES, help='調べるビットレート（シンボルレート）')
+    parser.add_argument('--sample-rates', type=int, nargs='+', default=SAMPLE_RATES, help='調べるサンプリングレート')
+    parser.add_argument('--noise-levels', type=int, nargs='+', default=NOISE_LEVELS, help='調べるノイズレベル（0〜8）')
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help='1つの組み合わせあたりの試行回数')
+    parser.add_argument('--payload-bytes', type=int, default=DEFAULT_PAYLOAD_BYTES, help='1回の試行で送るランダムなペイロードのバイト数')
+    parser.add_argument('--detector', choices=DETECTOR_NAMES, default='fft', help='検出方式')
+    parser.add_argument('--modulation', choices=sorted(MODULATIONS), help='変調方式（省略時はconfig.tomlのMODULATION）')
+    parser.add_argument('--channels', type=int, help='周波数分割多重のチャンネル数（省略時はconfig.tomlのCHANNELS）')
+    parser.add_argument('--continuous-phase', action='store_true', help='位相連続FSKで試す')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='並列に試行するプロセス数')
+    parser.add_argument('--seed', type=int, default=0, help='ペイロードとノイズの乱数シード')
+    parser.add_argument('--framing', type=int, nargs='?', const=FRAME_PAYLOAD_SIZE,
+                        help=f'ブロック（既定{FRAME_PAYLOAD_SIZE}バイト）ごとにCRC32とFECを付けて送る')
+    parser.add_argument('--csv', type=str, help='結果を書き出すCSVパス')
+    args = parser.parse_args()
+
+    if any(not (0 <= level <= 8) for level in args.noise_levels):
+        parser.error("ノイズレベルは0〜8で指定してください")
+    params = ModemParams.from_config().with_overrides(
+        continuous_phase=True if args.continuous_phase else None, modulation=args.modulation, channels=args.channels
+    )
+    n_cells = len(args.bitrates) * len(args.sample_rates) * len(args.noise_levels)
+    print(f"[INFO] {n_cells}通り × {args.trials}回を {args.workers} プロセスで試行します（{params.modulation}, channels={params.channels}）")
+    results = sweep(
+        params, args.bitrates, args.sample_rates, args.noise_levels, args.trials, args.payload_bytes, args.detector,
+        args.workers, args.seed, framing=args.framing
+    )
+    print_table(results)
+    if args.csv:
+        write_csv(args.csv, results)
+        print(f"[INFO] 結果を書き出しました: {args.csv}")
+
+if __name__ == "__main__":
+    main()
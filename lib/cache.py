@@ -0,0 +1,125 @@
+import hashlib
+import os
+import struct
+import threading
+import numpy as np
+from typing import Any, Optional
+from lib.params import ModemParams
+from lib.utils import read_wav_with_info, write_wav
+
+# キャッシュの合計サイズの上限（バイト）
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_SUFFIX = ".wav"
+
+
+def content_hash(data: bytes) -> str:
+    """入力データの内容のハッシュ（キャッシュのキーに使う）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_key(*parts: Any) -> str:
+    """キーの構成要素（ハッシュやパラメータ）から、ファイル名に使えるキーを作る"""
+    return hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:32]
+
+
+def clean_cache_key(payload: bytes, params: ModemParams) -> str:
+    """
+    ノイズを加える前の音声のキー（変調するデータの内容と、波形を決める変調パラメータ）。
+    ノイズレベルは含めないので、この音声はノイズレベル0（params.with_overrides(noise_level=0)）でエンコードする。
+    """
+    return cache_key(
+        content_hash(payload), params.bitrate, params.sample_rate, params.modulation, params.continuous_phase,
+        params.channels
+    )
+
+
+def noisy_cache_key(clean_key: str, noise_level: int, seed: Optional[int]) -> Optional[str]:
+    """ノイズ付加後の音声のキー。シードが無い（毎回ランダム）か、ノイズレベル0（クリーンな音声そのもの）ならキャッシュしないので None"""
+    if seed is None or noise_level <= 0:
+        return None
+    return cache_key(clean_key, noise_level, seed)
+
+
+class WavCache:
+    """
+    エンコード・ノイズ付加したサンプル列を、キーごとにWAVファイルとして保存するキャッシュ。
+    合計サイズが max_bytes を超えたら、最後に使ったのが古いものから消す（LRU）。
+    最後に使った時刻はファイルの更新時刻で持つので、アプリを再起動しても引き継がれる。
+    読み出しはメモリマップなので、大きなWAVでもコピーしない。
+
+    :param directory: 保存先のディレクトリ（なければ作る）
+    :param max_bytes: 合計サイズの上限（バイト）
+    """
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Optional[tuple[np.ndarray, int]]:
+        """
+        キャッシュにあれば (サンプル配列, サンプリングレート) を返し、最後に使った時刻を更新する。
+        無ければ、または読めなければ（途中で切れたファイルなど）None。
+        """
+        path = self.path(key)
+        with self._lock:
+            try:
+                samples, info = read_wav_with_info(path)
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError, struct.error):
+                self._remove(path)
+                return None
+        return samples, info.sample_rate
+
+    def put(self, key: str, samples: np.ndarray, sample_rate: int) -> None:
+        """サンプル配列を保存し、上限を超えた分を古いものから消す（書き込み中のファイルは読まれないよう、別名で書いてから置き換える）"""
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write_wav(tmp_path, samples, sample_rate)
+        with self._lock:
+            os.replace(tmp_path, path)
+            self._evict(keep=path)
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(最後に使った時刻, サイズ, パス) の一覧"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(CACHE_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def total_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            if self._remove(path):
+                total -= size
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            # Windowsでは再生中・メモリマップ中のファイルは消せないので、次の機会に回す
+            return False
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, _, path in self._entries():
+                self._remove(path)
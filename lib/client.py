@@ -0,0 +1,197 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+from typing import Any, Optional
+from urllib.parse import urlencode
+from lib.frame_format import FRAME_PAYLOAD_SIZE
+
+# NumPyなどの重いモジュールは読み込まない（起動を速くするため標準ライブラリと lib.frame_format だけで書く）
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ModemServerError(Exception):
+    """サーバーがエラー応答を返したときに送出する"""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"[{status}] {message}")
+        self.status = status
+
+
+class ModemClient:
+    """
+    lib.server の常駐サーバーに接続するクライアント。
+    1つの接続をkeep-aliveで使い回すので、小さなデータを大量に送る場合でも接続のコストは1回分で済む。
+
+    :param host: サーバーのホスト
+    :param port: サーバーのポート
+    :param timeout: 応答待ちのタイムアウト（秒）
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: Optional[float] = None) -> None:
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        self.last_headers: dict[str, str] = {}  # 直前の応答のヘッダ（decodeの X-Failed-Blocks など）
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ModemClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None, **query: Any) -> bytes:
+        query = {k: v for k, v in query.items() if v is not None}
+        url = f"{path}?{urlencode(query)}" if query else path
+        headers = {"Content-Type": "application/octet-stream"} if body is not None else {}
+        self.conn.request(method, url, body=body, headers=headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise ModemServerError(response.status, data.decode("utf-8", errors="replace"))
+        self.last_headers = dict(response.getheaders())
+        return data
+
+    def health(self) -> dict[str, Any]:
+        return json.loads(self._request("GET", "/health"))
+
+    def encode(
+        self,
+        data: bytes,
+        bitrate: Optional[int] = None,
+        sample_rate: Optional[int] = None,
+        noise_level: Optional[int] = None,
+        preamble: bool = False,
+        continuous_phase: bool = False,
+        modulation: Optional[str] = None,
+        channels: Optional[int] = None,
+        output_format: Optional[str] = None,
+        framing: Optional[int] = None,
+        compress: bool = False
+    ) -> bytes:
+        """
+        バイト列をエンコードしたWAVのバイト列を返す（output_format は pcm16/pcm8/float32/raw）。
+        framing を指定するとそのバイト数ずつのブロックにCRC32・FECを付け、compress がTrueなら変調前に圧縮する。
+        """
+        return self._request(
+            "POST", "/encode", data,
+            bitrate=bitrate, sample_rate=sample_rate, noise_level=noise_level, preamble=1 if preamble else None,
+            continuous_phase=1 if continuous_phase else None, modulation=modulation, channels=channels,
+            format=output_format, framing=framing, compress=1 if compress else None,
+        )
+
+    def add_noise(
+        self,
+        wav: bytes,
+        noise_level: Optional[int] = None,
+        seed: Optional[int] = None,
+        output_format: Optional[str] = None,
+        channel: Optional[int] = None
+    ) -> bytes:
+        """WAVのバイト列にノイズを加えたWAVのバイト列を返す"""
+        return self._request("POST", "/noise", wav, noise_level=noise_level, seed=seed, format=output_format, channel=channel)
+
+    def decode(
+        self,
+        wav: bytes,
+        bitrate: Optional[int] = None,
+        detector: Optional[str] = None,
+        sync: bool = False,
+        continuous_phase: bool = False,
+        modulation: Optional[str] = None,
+        channels: Optional[int] = None,
+        channel: Optional[int] = None,
+        framing: Optional[int] = None
+    ) -> bytes:
+        """
+        WAVのバイト列から復元したバイト列を返す（channel は複数チャンネルのWAVで読むチャンネル）。
+        framing を指定するとフレームを外し、失敗したブロックは failed_blocks() で分かる。
+        """
+        return self._request(
+            "POST", "/decode", wav,
+            bitrate=bitrate, detector=detector, sync=1 if sync else None,
+            continuous_phase=1 if continuous_phase else None, modulation=modulation, channels=channels, channel=channel,
+            framing=framing,
+        )
+
+    def failed_blocks(self) -> list[int]:
+        """直前の decode(framing=...) で失敗したブロックの通し番号"""
+        value = self.last_headers.get("X-Failed-Blocks", "")
+        return [int(seq) for seq in value.split(",") if seq]
+
+
+def _read_input(path: str) -> bytes:
+    if path == "-":
+        return sys.stdin.buffer.read()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_output(path: Optional[str], data: bytes) -> None:
+    if path is None or path == "-":
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="常駐サーバー（python -m lib.server）にエンコード・ノイズ付加・デコードを依頼する")
+    parser.add_argument('command', choices=['encode', 'noise', 'decode', 'health'], help='実行する処理')
+    parser.add_argument('inputs', nargs='*', help='入力ファイル（- で標準入力、複数指定すると1つの接続で順に処理）')
+    parser.add_argument('-o', '--output', type=str, help='出力ファイル（省略時は標準出力、入力が1つのときのみ）')
+    parser.add_argument('--output-dir', type=str, help='入力が複数のときの出力先ディレクトリ')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help='サーバーのホスト')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='サーバーのポート')
+    parser.add_argument('--bitrate', type=int, help='ビットレート（省略時はサーバーの設定）')
+    parser.add_argument('--sample-rate', type=int, help='サンプリングレート（encodeのみ）')
+    parser.add_argument('--noise-level', type=int, help='ノイズレベル')
+    parser.add_argument('--seed', type=int, help='ノイズの乱数シード（noiseのみ）')
+    parser.add_argument('--detector', type=str, help='検出方式（decodeのみ）')
+    parser.add_argument('--preamble', action='store_true', help='データの前に同期ワードを付ける（encodeのみ）')
+    parser.add_argument('--sync', action='store_true', help='同期ワードを探してその直後からデコードする（decodeのみ）')
+    parser.add_argument('--continuous-phase', action='store_true', help='位相連続FSKでエンコード・デコードする')
+    parser.add_argument('--modulation', type=str, help='変調方式（bfsk/4fsk/8fsk、省略時はサーバーの設定）')
+    parser.add_argument('--channels', type=int, help='周波数分割多重のチャンネル数（省略時はサーバーの設定）')
+    parser.add_argument('--format', type=str, help='出力形式（pcm16/pcm8/float32/raw、encode・noiseのみ）')
+    parser.add_argument('--channel', type=int, help='複数チャンネルのWAVで読むチャンネル（noise・decodeのみ）')
+    parser.add_argument('--compress', action='store_true', help='変調前に圧縮する（encodeのみ、decodeは自動で展開）')
+    parser.add_argument('--framing', type=int, nargs='?', const=FRAME_PAYLOAD_SIZE,
+                        help=f'ブロック（既定{FRAME_PAYLOAD_SIZE}バイト）ごとにCRC32・FECを付ける（encode・decode）')
+    args = parser.parse_args()
+
+    with ModemClient(args.host, args.port) as client:
+        try:
+            if args.command == 'health':
+                print(json.dumps(client.health(), ensure_ascii=False))
+                return
+            if not args.inputs:
+                parser.error("入力ファイルを指定してください")
+            if len(args.inputs) > 1 and not args.output_dir:
+                parser.error("入力が複数のときは --output-dir を指定してください")
+            suffix = ".bin" if args.command == 'decode' else ".wav"
+            for path in args.inputs:
+                data = _read_input(path)
+                if args.command == 'encode':
+                    result = client.encode(data, args.bitrate, args.sample_rate, args.noise_level, args.preamble, args.continuous_phase, args.modulation, args.channels, args.format, args.framing, args.compress)
+                elif args.command == 'noise':
+                    result = client.add_noise(data, args.noise_level, args.seed, args.format, args.channel)
+                else:
+                    result = client.decode(data, args.bitrate, args.detector, args.sync, args.continuous_phase, args.modulation, args.channels, args.channel, args.framing)
+                    if args.framing and client.failed_blocks():
+                        print(f"[WARN] {path}: 失敗したブロック: {', '.join(map(str, client.failed_blocks()))}", file=sys.stderr)
+                if args.output_dir:
+                    name = os.path.splitext(os.path.basename(path))[0] + suffix
+                    _write_output(os.path.join(args.output_dir, name), result)
+                else:
+                    _write_output(args.output, result)
+        except (ModemServerError, OSError) as e:
+            print(f"[ERROR] {e}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
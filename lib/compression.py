@@ -0,0 +1,98 @@
+import lzma
+import struct
+import zlib
+from typing import NamedTuple
+
+# 圧縮したペイロードの先頭に付けるヘッダ: マジック(2) + 方式(1) + 元のバイト数(4) + 元データのCRC32(4)
+COMPRESSION_MAGIC = b'\xf5\x5a'
+COMPRESSION_HEADER = struct.Struct('>2sBII')
+METHOD_STORED = 0  # 圧縮しても小さくならなかった（ヘッダだけ付ける）
+METHOD_ZLIB = 1  # zlibヘッダなしのdeflate
+METHOD_LZMA = 2  # コンテナなしのLZMA2
+COMPRESSION_METHODS = {METHOD_STORED: "stored", METHOD_ZLIB: "zlib", METHOD_LZMA: "lzma"}
+_LZMA_PRESET = 9 | lzma.PRESET_EXTREME
+_LZMA_MIN_DICT_SIZE = 4096
+_LZMA_MAX_DICT_SIZE = 64 * 1024 * 1024
+
+
+class CompressionInfo(NamedTuple):
+    """compress_payload の結果"""
+    data: bytes  # ヘッダ付きの圧縮データ
+    method: str
+    original_size: int
+
+    @property
+    def ratio(self) -> float:
+        """圧縮後 / 圧縮前（ヘッダ込み）"""
+        return len(self.data) / max(self.original_size, 1)
+
+    def describe(self) -> str:
+        return f"{self.method}: {self.original_size} → {len(self.data)} バイト（{self.ratio:.1%}）"
+
+
+def _lzma_filters(original_size: int) -> list[dict]:
+    """
+    コンテナ（.xz）を付けるとそれだけで数十バイト増えるので、フィルタを直接指定する。
+    辞書はデータより大きくしても縮まらずメモリ（preset 9 のままだと数百MB）だけ増えるので、元のバイト数に合わせる。
+    展開側もヘッダの元のバイト数から同じ値を求める。
+    """
+    dict_size = min(max(original_size, _LZMA_MIN_DICT_SIZE), _LZMA_MAX_DICT_SIZE)
+    return [{"id": lzma.FILTER_LZMA2, "preset": _LZMA_PRESET, "dict_size": dict_size}]
+
+
+def _compress(method: int, data: bytes) -> bytes:
+    if method == METHOD_ZLIB:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    if method == METHOD_LZMA:
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_lzma_filters(len(data)))
+    return data
+
+
+def _decompress(method: int, data: bytes, original_size: int) -> bytes:
+    if method == METHOD_ZLIB:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+    if method == METHOD_LZMA:
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_lzma_filters(original_size))
+    return data
+
+
+def compress_payload(data: bytes) -> CompressionInfo:
+    """
+    変調する前のバイト列を zlib と lzma の両方で圧縮し、小さい方にヘッダを付けて返す。
+    どちらでも小さくならなければ無圧縮（stored）のままヘッダだけ付ける。
+    """
+    data = bytes(data)
+    best_method, best = METHOD_STORED, data
+    for method in (METHOD_ZLIB, METHOD_LZMA):
+        compressed = _compress(method, data)
+        if len(compressed) < len(best):
+            best_method, best = method, compressed
+    header = COMPRESSION_HEADER.pack(COMPRESSION_MAGIC, best_method, len(data), zlib.crc32(data))
+    return CompressionInfo(header + best, COMPRESSION_METHODS[best_method], len(data))
+
+
+def is_compressed(data: bytes) -> bool:
+    """compress_payload のヘッダで始まっているか"""
+    return (
+        len(data) >= COMPRESSION_HEADER.size and data[:2] == COMPRESSION_MAGIC
+        and data[2] in COMPRESSION_METHODS
+    )
+
+
+def decompress_payload(data: bytes) -> bytes:
+    """
+    compress_payload のヘッダが付いていれば展開し、付いていなければそのまま返す（圧縮の有無を指定しなくてよい）。
+    展開できない、または元のバイト数・CRC32が合わない場合（伝送誤り）は ValueError。
+    """
+    data = bytes(data)
+    if not is_compressed(data):
+        return data
+    _, method, size, crc = COMPRESSION_HEADER.unpack_from(data)
+    try:
+        restored = _decompress(method, data[COMPRESSION_HEADER.size:], size)
+    except (zlib.error, lzma.LZMAError) as e:
+        raise ValueError(f"圧縮データを展開できません（{COMPRESSION_METHODS[method]}）: {e}") from None
+    if len(restored) != size or zlib.crc32(restored) != crc:
+        raise ValueError(f"展開したデータが元のデータと一致しません（{COMPRESSION_METHODS[method]}）")
+    return restored
@@ -1,129 +1,954 @@
-from lib.utils import read_wav_file, calculate_fft
-import toml
-import io
+from lib.compression import decompress_payload, is_compressed
+from lib.encode import bit_boundaries, carrier_tones, count_bits, open_output, sync_slots, tone_signal
+from lib.framing import FRAME_PAYLOAD_SIZE, unframe_bytes
+from lib.modulation import DEFAULT_MODULATION, MODULATIONS, Modulation, get_modulation
+from lib.params import ModemParams, resolve_params
+from lib.profiling import Profiler, add_profile_arguments, finish_profile, profiler_from_args
+from lib.utils import (
+    bit_error_stats, bitstring_to_bits, bits_to_bitstring, bits_to_bytes, bytes_to_bits, is_mapped_format, read_raw_pcm,
+    read_wav_header, read_wav_with_info
+)
 import numpy as np
 import argparse
 import hashlib
-from typing import Optional
+import io
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from multiprocessing import shared_memory
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Any, Callable, NamedTuple, Optional, cast
 
-# 設定を読み込む（Windows対応: encoding指定）
-def load_config_toml(config_path: str = "config.toml") -> dict:
-    with open(config_path, "r", encoding="utf-8") as f:
-        return toml.load(io.StringIO(f.read()))
+# 周波数範囲を制限（Bell 202: 1000Hz〜2500Hzの範囲）
+BAND_MIN = 1000
+BAND_MAX = 2500
+# 一度にFFTする行数（巨大な行列を作らないための上限）
+BLOCK_ROWS = 4096
+# 進捗を報告する間隔（行数）
+PROGRESS_ROWS = BLOCK_ROWS * 16
+# FSKの2トーン（0=1200Hz, 1=2200Hz）
+TONE_FREQS = MODULATIONS["bfsk"].tones
+# 変調方式を省略したときに使うもの（bfsk）
+DEFAULT_SCHEME = MODULATIONS[DEFAULT_MODULATION]
+# 同期ワード探索で1回にFFTする長さ（overlap-saveのブロック長）
+SYNC_FFT_SIZE = 1 << 16
+# 周波数弁別器で1回に解析信号を求めるおおよそのサンプル数と、ブロック前後の余白
+DISCRIMINATOR_BLOCK = 1 << 18
+DISCRIMINATOR_MARGIN = 256
+# 信号の両端でトーンを延ばすときに周波数を求めるサンプル数の下限
+DISCRIMINATOR_FIT = 4
+# 周波数弁別器で落とす低域（ハムや直流）の上限
+DISCRIMINATOR_CUTOFF = 300.0
+# 正規化相関のピークがこれ未満なら同期ワードが見つからなかったとみなして警告する
+SYNC_MIN_PEAK = 0.5
+# FDMの最後のスロットで、最も強いチャンネルに対するエネルギー比がこれ未満のチャンネルは無音（穴埋め）とみなす
+FDM_SILENCE_RATIO = 0.1
+# 逐次デコードで1回に読むサンプル数の上限（8000Hzで約0.1秒）
+STREAM_CHUNK_FRAMES = 1024
 
-config = load_config_toml()
-SAMPLE_RATE: int = config["SAMPLE_RATE"]
-BITRATE: int = config["BITRATE"]  # 1秒間に何ビット詰め込むか
 
-def decode_tone(
-    file_path: str,
-    correct_bit_string: Optional[str] = None,
-    duration: Optional[float] = None,
-    sample_rate: int = SAMPLE_RATE
-) -> str:
+class SyncResult(NamedTuple):
+    """同期ワード探索の結果"""
+    offset: int  # 同期ワードの先頭のサンプル位置
+    peak: float  # 正規化相関のピーク値（1.0で完全一致）
+    data_offset: int  # データ（同期ワードの直後）の先頭のサンプル位置
+
+
+@lru_cache(maxsize=32)
+def fft_band(n_fft: int, sample_rate: int, band: tuple[float, float] = (BAND_MIN, BAND_MAX)) -> tuple[slice, np.ndarray]:
     """
-    WAVファイルを読み取り、0と1の文字列を復元する。
+    rfftの結果のうち、FSK帯域に含まれるビンの範囲とその周波数を返す（結果はキャッシュ）。
 
-    :param file_path: 入力WAVファイルのパス
-    :param correct_bit_string: 正解のビット列（オプション）
-    :param duration: 各音の長さ（秒）
+    :param band: 帯域の下限と上限（Hz、省略時はbfskの1000Hz〜2500Hz）
+    """
+    freqs = np.fft.rfftfreq(n_fft, d=1/sample_rate)
+    indices = np.flatnonzero((freqs >= band[0]) & (freqs <= band[1]))
+    if len(indices) == 0:
+        return slice(0, 0), freqs[:0]
+    bins = slice(int(indices[0]), int(indices[-1]) + 1)
+    return bins, freqs[bins]
+
+
+def detect_segments(
+    segments: np.ndarray,
+    sample_rate: int,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1
+) -> np.ndarray:
+    """
+    (シンボル数, サンプル数) の行列を行ごとにFFTし、ピーク周波数に最も近いトーンの番号の配列を返す
+    （bfskでは0/1のビット配列）。FDMでは1回のFFTの結果から各チャンネルの帯域のピークを探し、
+    行ごとにチャンネル順に並べる（長さ = 行数 * channels）。
+    ゼロパディング長はcalculate_fftと同じ（次の2のべき乗の2倍）。
+    """
+    n_rows, length = segments.shape
+    n_fft = 2**int(np.ceil(np.log2(length)) + 1)
+    # 有効な周波数が見つからないチャンネルはピーク0Hz扱い → 0
+    symbols = np.zeros((n_rows, channels), dtype=np.uint8)
+    tones = scheme.channel_tones(channels)
+    lookups = []
+    for c in range(channels):
+        band, band_freqs = fft_band(n_fft, sample_rate, scheme.channel_band(c))
+        if len(band_freqs) == 0:
+            continue
+        # 帯域の各ビンを最も近いトーンに割り当てる（2トーンの中点ちょうどなら高い方）
+        distance = np.abs(band_freqs[:, None] - tones[c][None, ::-1])
+        nearest = (tones.shape[1] - 1 - np.argmin(distance, axis=1)).astype(np.uint8)
+        lookups.append((c, band, nearest))
+    if not lookups:
+        return symbols.reshape(-1)
+    # 全チャンネルの帯域をまとめて含む範囲だけ振幅を求める
+    lo, hi = lookups[0][1].start, lookups[-1][1].stop
+    for i in range(0, n_rows, BLOCK_ROWS):
+        spectrum = np.fft.rfft(segments[i:i + BLOCK_ROWS], n=n_fft, axis=1)
+        magnitude = np.abs(spectrum[:, lo:hi])
+        for c, band, nearest in lookups:
+            symbols[i:i + BLOCK_ROWS, c] = nearest[np.argmax(magnitude[:, band.start - lo:band.stop - lo], axis=1)]
+    return symbols.reshape(-1)
+
+
+@lru_cache(maxsize=32)
+def reference_tones(length: int, sample_rate: int, freqs: tuple[float, ...] = TONE_FREQS) -> np.ndarray:
+    """
+    I/Q相関用の参照波形（cos/sin）を返す（結果はキャッシュ）。
+
+    :return: shape (length, 2 * len(freqs)) の行列（各周波数のcos列, sin列の順）
+    """
+    t = np.arange(length) / sample_rate
+    phase = 2 * np.pi * np.asarray(freqs, dtype=np.float64)[None, :] * t[:, None]
+    return np.concatenate([np.cos(phase), np.sin(phase)], axis=1)
+
+
+def tone_energies(segments: np.ndarray, sample_rate: int, freqs: tuple[float, ...] = TONE_FREQS) -> np.ndarray:
+    """
+    各行（1ビット分）について、指定周波数だけのエネルギーをI/Q相関で求める（Goertzel相当）。
+    1ビットあたりO(N)の計算量。
+
+    :return: shape (行数, len(freqs)) のエネルギー配列
+    """
+    n_rows, length = segments.shape
+    ref = reference_tones(length, sample_rate, tuple(freqs))
+    energies = np.empty((n_rows, len(freqs)), dtype=np.float64)
+    for i in range(0, n_rows, BLOCK_ROWS):
+        iq = segments[i:i + BLOCK_ROWS] @ ref
+        energies[i:i + BLOCK_ROWS] = iq[:, :len(freqs)]**2 + iq[:, len(freqs):]**2
+    return energies
+
+
+def segment_rows(samples: np.ndarray, samples_per_tone: float, start: int, stop: int) -> np.ndarray:
+    """
+    start〜stop ビット目のセグメントを (stop - start, 1ビットのサンプル数) の行列にする。
+    1ビットのサンプル数が整数ならコピーなしのビュー、端数がある場合（位相連続モード）は
+    エンコーダと同じビット境界から int(samples_per_tone) サンプルずつ切り出す。
+    """
+    if float(samples_per_tone).is_integer():
+        spt = int(samples_per_tone)
+        return samples[start * spt:stop * spt].reshape(-1, spt)
+    starts = bit_boundaries(start, stop - start, samples_per_tone)[:-1]
+    return sliding_window_view(samples, int(samples_per_tone))[starts]
+
+
+def split_segments(samples: np.ndarray, samples_per_tone: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    サンプル列を (ビット数, 1ビットのサンプル数) の行列と、端数のサンプルに分ける。
+    """
+    n_full = count_bits(len(samples), samples_per_tone)
+    end = int(bit_boundaries(n_full, 0, samples_per_tone)[0])
+    return segment_rows(samples, samples_per_tone, 0, n_full), samples[end:]
+
+
+def bit_energies(
+    samples: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1
+) -> np.ndarray:
+    """
+    シンボルごとの各トーンのエネルギーを返す（端数のセグメントも含む）。
+
+    :return: shape (シンボル数, チャンネル数 * トーン数) の配列（bfskの1チャンネルでは列0=1200Hz, 列1=2200Hz）
+    """
+    freqs = tuple(scheme.channel_tones(channels).reshape(-1))
+    matrix, tail = split_segments(samples, samples_per_tone)
+    energies = tone_energies(matrix, sample_rate, freqs)
+    if len(tail) > 0:
+        energies = np.vstack([energies, tone_energies(tail.reshape(1, -1), sample_rate, freqs)])
+    return energies
+
+
+def detect_goertzel(
+    segments: np.ndarray,
+    sample_rate: int,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1
+) -> np.ndarray:
+    """
+    各トーンのエネルギーを比較し、最も強いトーンの番号の配列を返す（bfskでは0/1のビット配列）。
+    FDMでは全チャンネルのトーンを1回の行列積で求め、行ごとにチャンネル順に並べる。
+    """
+    energies = tone_energies(segments, sample_rate, tuple(scheme.channel_tones(channels).reshape(-1)))
+    return np.argmax(energies.reshape(len(segments), channels, -1), axis=2).astype(np.uint8).reshape(-1)
+
+
+def count_silent_channels(segment: np.ndarray, sample_rate: int, scheme: Modulation, channels: int) -> int:
+    """
+    FDMの最後のスロットで、末尾の穴埋め（無音）になっているチャンネルの数を返す。
+    穴埋めは後ろのチャンネルから入るので、最後に音のあるチャンネルより後ろを数える。
+    """
+    freqs = tuple(scheme.channel_tones(channels).reshape(-1))
+    energies = tone_energies(segment.reshape(1, -1), sample_rate, freqs).reshape(channels, -1).max(axis=1)
+    active = np.flatnonzero(energies >= FDM_SILENCE_RATIO * energies.max())
+    if len(active) == 0:
+        return 0
+    return int(channels - 1 - active[-1])
+
+
+def extend_tone(samples: np.ndarray, n: int, fit: int) -> np.ndarray:
+    """
+    末尾の fit サンプルを1つの正弦波とみなし、その続きを n サンプル分返す。
+    正弦波は x[k] = 2cos(ω)x[k-1] - x[k-2] を満たすので、ω を最小二乗で求め、最後の2サンプルから位相と振幅を決める。
+    """
+    x = np.asarray(samples[-fit:], dtype=np.float64)
+    k = np.arange(1, n + 1)
+    energy = float(np.dot(x[1:-1], x[1:-1]))
+    if len(x) < 3 or energy == 0.0:
+        return np.full(n, float(x[-1]) if len(x) > 0 else 0.0)
+    omega = float(np.arccos(np.clip(np.dot(x[2:] + x[:-2], x[1:-1]) / energy / 2, -1.0, 1.0)))
+    if np.sin(omega) < 1e-6:
+        return np.full(n, float(x[-1]))
+    # x[-1] を k=0 として a*cos(ωk) + b*sin(ωk) で表す
+    a = x[-1]
+    b = (a * np.cos(omega) - x[-2]) / np.sin(omega)
+    return a * np.cos(omega * k) + b * np.sin(omega * k)
+
+
+def analytic_signal(
+    samples: np.ndarray,
+    sample_rate: int,
+    cutoff: float = DISCRIMINATOR_CUTOFF,
+    pad: int = DISCRIMINATOR_MARGIN,
+    fit: int = DISCRIMINATOR_FIT
+) -> np.ndarray:
+    """
+    FFTで負の周波数と cutoff 未満の成分（ハムや直流）を落とし、解析信号（複素数）を返す。
+    FFTは信号を周期的とみなすので、そのままでは末尾と先頭がつながって両端の位相が乱れる。
+    前後に pad サンプルずつ、両端のトーンをそのまま延ばした信号（extend_tone）を付けてから変換し、付けた分を取り除く。
+
+    :param fit: 両端のトーンの周波数を求めるのに使うサンプル数（1シンボル分が目安）
+    """
+    x = np.asarray(samples, dtype=np.float64)
+    n = len(x)
+    if n < 3:
+        pad = 0
+    padded = np.concatenate([extend_tone(x[::-1], pad, fit)[::-1], x, extend_tone(x, pad, fit)])
+    spectrum = np.fft.fft(padded)
+    freqs = np.fft.fftfreq(len(padded), d=1/sample_rate)
+    spectrum *= np.where(freqs >= cutoff, 2.0, 0.0)
+    return np.fft.ifft(spectrum)[pad:pad + n]
+
+
+def detect_discriminator(
+    samples: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    progress: Optional[Callable[[float], None]] = None,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1
+) -> np.ndarray:
+    """
+    位相連続FSK用の周波数弁別器。解析信号の隣接サンプル間の位相差をビットの区間で足し合わせ、
+    そのビットで進んだ位相（= 平均周波数）が隣り合うトーンの中点をいくつ超えたかでトーンの番号を決める
+    （bfskでは1200Hzと2200Hzの中点より大きければ1）。
+    位相が連続していれば区間内の位相差の和は両端の位相だけで決まるので、
+    1ビットが10サンプル程度しかない高ビットレートでもノイズの影響を受けにくい。
+    サンプル列全体を使うので、ビットの行列ではなくサンプル列を受け取る（端数のビットも判定する）。
+    複数のキャリアが重なると位相が定まらないので、FDM（channels > 1）には使えない。
+    """
+    if channels != 1:
+        raise ValueError("discriminator は1チャンネルの信号にだけ使えます（FDMでは fft か goertzel を指定してください）")
+    n_samples = len(samples)
+    n_full = count_bits(n_samples, samples_per_tone)
+    bounds = bit_boundaries(0, n_full, samples_per_tone)
+    if bounds[-1] < n_samples:
+        bounds = np.append(bounds, n_samples)
+    n_bits = len(bounds) - 1
+    bits = np.zeros(n_bits, dtype=np.uint8)
+    # 1ステップあたりの位相の進みの閾値（隣り合うトーンの中点の周波数）
+    tones = scheme.tone_freqs
+    thresholds = 2 * np.pi * (tones[:-1] + tones[1:]) / 2 / sample_rate
+    block_bits = max(1, DISCRIMINATOR_BLOCK // max(int(samples_per_tone), 1))
+    for k0 in range(0, n_bits, block_bits):
+        k1 = min(k0 + block_bits, n_bits)
+        # ブロック端での解析信号の乱れを避けるため、前後に余白を付けて計算する
+        lo = max(0, int(bounds[k0]) - DISCRIMINATOR_MARGIN)
+        hi = min(n_samples, int(bounds[k1]) + DISCRIMINATOR_MARGIN + 1)
+        z = analytic_signal(samples[lo:hi], sample_rate, fit=max(DISCRIMINATOR_FIT, int(samples_per_tone)))
+        cumulative = np.concatenate(([0.0], np.cumsum(np.angle(z[1:] * np.conj(z[:-1])))))
+        starts = bounds[k0:k1]
+        ends = np.minimum(bounds[k0 + 1:k1 + 1], n_samples - 1)
+        advance = cumulative[ends - lo] - cumulative[starts - lo]
+        bits[k0:k1] = np.sum(advance[:, None] > thresholds[None, :] * (ends - starts)[:, None], axis=1)
+        if progress is not None:
+            progress(k1 / n_bits)
+    return bits
+
+
+# 検出方式の一覧（名前 → 行列を受け取りトーン番号の配列を返す関数）
+DETECTORS = {
+    "fft": detect_segments,
+    "goertzel": detect_goertzel,
+}
+# サンプル列全体を受け取る検出方式（ビット単位に分割しないので、並列デコードはしない）
+SIGNAL_DETECTORS = {
+    "discriminator": detect_discriminator,
+}
+DETECTOR_NAMES = tuple(DETECTORS) + tuple(SIGNAL_DETECTORS)
+
+
+@lru_cache(maxsize=32)
+def sync_reference(
+    samples_per_tone: float,
+    sample_rate: int,
+    continuous_phase: bool = False,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1
+) -> np.ndarray:
+    """エンコーダと同じ方法で合成した、ノイズなしの同期ワードの波形（結果はキャッシュ）"""
+    return tone_signal(
+        sync_slots(scheme, channels), samples_per_tone, sample_rate, continuous_phase, carrier_tones(scheme, channels)
+    )
+
+
+def find_sync(
+    samples: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    block_size: int = SYNC_FFT_SIZE,
+    continuous_phase: bool = False,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1
+) -> SyncResult:
+    """
+    同期ワードの波形との相互相関（マッチトフィルタ）をFFTで計算し、ファイル全体から同期ワードの位置を探す。
+    overlap-save法でブロックごとに処理するので、計算量は O(N log N)、メモリはブロック長分で済む。
+    相関は各位置の窓のエネルギーで正規化するので、音量やノイズの大きさによらずピークを比較できる。
+
+    :param samples: int16のサンプル配列
+    :param samples_per_tone: 1ビットあたりのサンプル数
     :param sample_rate: サンプリングレート
+    :param block_size: 1回にFFTする長さ
+    :param continuous_phase: エンコード時に位相連続モードだったか
+    :param scheme: エンコード時の変調方式
+    :param channels: エンコード時のFDMのチャンネル数
+    """
+    ref = sync_reference(samples_per_tone, sample_rate, continuous_phase, scheme, channels)
+    m = len(ref)
+    n_out = len(samples) - m + 1
+    if m == 0 or n_out <= 0:
+        raise ValueError("音声が同期ワードより短いため、同期できません")
+    n_fft = max(block_size, 1 << int(np.ceil(np.log2(2 * m))))
+    step = n_fft - m + 1
+    ref_spec = np.conj(np.fft.rfft(ref, n_fft))
+    ref_norm = float(np.sqrt(np.dot(ref, ref)))
+
+    best_offset, best_peak = 0, -np.inf
+    for start in range(0, n_out, step):
+        count = min(step, n_out - start)
+        segment = np.asarray(samples[start:start + count + m - 1], dtype=np.float64)
+        corr = np.fft.irfft(np.fft.rfft(segment, n_fft) * ref_spec, n_fft)[:count]
+        # 各位置の窓（長さm）のエネルギーを累積和の差で求める
+        cumulative = np.concatenate(([0.0], np.cumsum(segment * segment)))
+        energy = cumulative[m:m + count] - cumulative[:count]
+        score = corr / (ref_norm * np.sqrt(np.maximum(energy, 1.0)))
+        k = int(np.argmax(score))
+        if score[k] > best_peak:
+            best_offset, best_peak = start + k, float(score[k])
+    return SyncResult(best_offset, best_peak, best_offset + m)
+
+
+def _sync_start(
+    samples: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    continuous_phase: bool,
+    scheme: Modulation,
+    channels: int
+) -> int:
+    """同期ワードを探して結果を表示し、データの先頭のサンプル位置を返す"""
+    result = find_sync(
+        samples, samples_per_tone, sample_rate, continuous_phase=continuous_phase, scheme=scheme, channels=channels
+    )
+    print(f"[SYNC] 同期ワードを検出しました: offset={result.offset}サンプル ({result.offset / sample_rate:.4f}秒), peak={result.peak:.3f}")
+    if result.peak < SYNC_MIN_PEAK:
+        print(f"Warning: 相関のピークが低いため（{result.peak:.3f} < {SYNC_MIN_PEAK}）、同期位置が正しくない可能性があります。")
+    return result.data_offset
+
+
+def _detect_shard(
+    source: tuple[str, str, str, int, int, int],
+    start: int,
+    stop: int,
+    samples_per_tone: float,
+    sample_rate: int,
+    detector: str,
+    modulation: str,
+    channels: int
+) -> np.ndarray:
+    """
+    ワーカープロセス側の処理: 共有元（WAVのメモリマップまたは共有メモリ）から
+    start〜stop シンボル目のセグメントを取り出して判定する。
+    """
+    kind, ref, dtype, n_samples, base, channel = source
+    shm = None
+    if kind == "file":
+        samples, _ = read_wav_with_info(ref, channel=channel)
+        samples = samples[base:base + n_samples]
+    else:
+        shm = shared_memory.SharedMemory(name=ref)
+        samples = np.ndarray((n_samples,), dtype=dtype, buffer=shm.buf)
+    try:
+        rows = segment_rows(samples, samples_per_tone, start, stop)
+        return DETECTORS[detector](rows, sample_rate, get_modulation(modulation), channels)
+    finally:
+        # 共有メモリを閉じる前にビューを解放する
+        del samples
+        if shm is not None:
+            shm.close()
+
+
+def detect_bits_parallel(
+    samples: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    detector: str,
+    workers: int,
+    file_path: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    file_offset: int = 0,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1,
+    file_channel: int = 0
+) -> np.ndarray:
+    """
+    完全なセグメント部分をシンボル境界で分割し、プロセスプールで並列に判定してトーン番号を順番に連結する。
+    ワーカーにはサンプルをpickleで渡さず、file_path があればWAVをメモリマップで、
+    なければ共有メモリにコピーしたものを読ませる。
     """
-    if duration is None:
-        duration = 1.0 / BITRATE  # 1ビットあたりの秒数
+    n_full = count_bits(len(samples), samples_per_tone)
+    # ワーカー数より多めに分割して負荷を均す
+    n_shards = min(n_full, workers * 4)
+    if n_shards == 0:
+        return np.empty(0, dtype=np.uint8)
+    bounds = np.linspace(0, n_full, n_shards + 1).astype(int)
+
+    shm = None
+    if file_path is not None:
+        source = ("file", file_path, samples.dtype.str, len(samples), file_offset, file_channel)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(samples.nbytes, 1))
+        shared = np.ndarray(samples.shape, dtype=samples.dtype, buffer=shm.buf)
+        shared[:] = samples
+        del shared
+        source = ("shm", shm.name, samples.dtype.str, len(samples), 0, 0)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _detect_shard, source, int(start), int(stop), samples_per_tone, sample_rate, detector, scheme.name,
+                    channels
+                )
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            parts = []
+            try:
+                for future in futures:
+                    parts.append(future.result())
+                    if progress is not None:
+                        progress(len(parts) / len(futures))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+    return np.concatenate(parts)
 
-    # 削除: 未使用の変数
-    # freq_map = {440: '0', 880: '1'}
-    #freq_map = {1200: '0', 2200: '1'}  # Bell 202 FSK
-    # threshold = 100
 
-    # WAVファイルを読み取る
-    samples = read_wav_file(file_path)
+def detect_bits(
+    samples: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    detector: str = "fft",
+    workers: int = 1,
+    file_path: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    file_offset: int = 0,
+    scheme: Modulation = DEFAULT_SCHEME,
+    channels: int = 1,
+    file_channel: int = 0
+) -> np.ndarray:
+    """
+    サンプル列をシンボル単位の行列に並べ替えてまとめてトーンを判定し、0/1のビット配列に戻す。
+    FDMでは各行（スロット）から全チャンネルのシンボルを判定し、チャンネル順に並べてからビットに戻す。
 
-    # 各セグメントの周波数を計算
-    bit_string = ""
-    samples_per_tone = int(sample_rate * duration)
-    for i in range(0, len(samples), samples_per_tone):
-        segment = samples[i:i + samples_per_tone]
+    :param samples_per_tone: 1ビットあたりのサンプル数（端数がある場合はエンコーダと同じビット境界で区切る）
+    :param detector: 検出方式（"fft", "goertzel" または "discriminator"）
+    :param workers: 並列に判定するプロセス数（1なら現在のプロセスで処理。discriminatorは常に1）
+    :param file_path: samples がこのWAVファイルのメモリマップなら、そのパス（ワーカーが直接マップする）
+    :param progress: 進捗（0.0〜1.0）を受け取るコールバック。例外を送出すると中断できる
+    :param file_offset: samples がメモリマップの何サンプル目から始まるビューか
+    :param scheme: 変調方式（M値FSKでは1シンボルを複数ビットに戻す）
+    :param channels: FDMのチャンネル数
+    :param file_channel: samples がWAVの何番目のチャンネル（音声チャンネル）のビューか
+    """
+    if detector not in DETECTOR_NAMES:
+        raise ValueError(f"未対応の検出方式です: {detector}")
+    scheme.check_channels(channels, sample_rate)
+    n_full = count_bits(len(samples), samples_per_tone)
+    if detector in SIGNAL_DETECTORS:
+        symbols = SIGNAL_DETECTORS[detector](samples, samples_per_tone, sample_rate, progress, scheme, channels)
+        if len(symbols) > n_full:
+            print(f"Warning: Segment {n_full} is shorter than expected.")
+        return scheme.symbols_to_bits(symbols)
+    detect = DETECTORS[detector]
+    if workers > 1:
+        symbols = detect_bits_parallel(
+            samples, samples_per_tone, sample_rate, detector, workers, file_path, progress, file_offset, scheme, channels,
+            file_channel
+        )
+    else:
+        symbols = np.empty(n_full * channels, dtype=np.uint8)
+        for start in range(0, n_full, PROGRESS_ROWS):
+            stop = min(start + PROGRESS_ROWS, n_full)
+            rows = segment_rows(samples, samples_per_tone, start, stop)
+            symbols[start * channels:stop * channels] = detect(rows, sample_rate, scheme, channels)
+            if progress is not None:
+                progress(stop / n_full)
+    tail = samples[int(bit_boundaries(n_full, 0, samples_per_tone)[0]):]
+    if len(tail) > 0:
         # 最後のセグメントが短い場合でも処理する
-        if len(segment) < samples_per_tone:
-            print(f"Warning: Segment {i // samples_per_tone} is shorter than expected.")
+        print(f"Warning: Segment {n_full} is shorter than expected.")
+        symbols = np.append(symbols, detect(tail.reshape(1, -1), sample_rate, scheme, channels))
+    if channels > 1 and len(symbols) > 0:
+        # 最後のスロットの無音のチャンネル（穴埋め）はデータではないので捨てる
+        last = tail if len(tail) > 0 else segment_rows(samples, samples_per_tone, n_full - 1, n_full)[0]
+        symbols = symbols[:len(symbols) - count_silent_channels(last, sample_rate, scheme, channels)]
+    return scheme.symbols_to_bits(symbols)
+
+
+def decode_samples(
+    samples: np.ndarray,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    detector: str = "fft",
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    params: Optional[ModemParams] = None,
+    sync: bool = False
+) -> np.ndarray:
+    """
+    メモリ上のサンプル配列から0/1のビット配列（uint8）を復元する（WAVファイルを経由しない）。
+
+    :param sync: Trueなら同期ワードを探し、その直後からデコードする
+    """
+    p = resolve_params(params, sample_rate=sample_rate)
+    samples_per_tone = p.samples_per_bit(duration)
+    if sync:
+        samples = samples[_sync_start(samples, samples_per_tone, p.sample_rate, p.continuous_phase, p.scheme, p.channels):]
+    return detect_bits(
+        samples, samples_per_tone, p.sample_rate, detector, workers, None, progress, scheme=p.scheme, channels=p.channels
+    )
+
+
+class StreamingDecoder:
+    """
+    ライブ入力（サウンドカードやパイプ・ソケットから届くint16のPCM）を、届いた分だけ逐次デコードする。
+    任意の長さのチャンクを feed に渡すと、完成したシンボルのビットをすぐに返し、
+    シンボルの途中までのサンプルは次の呼び出しへ繰り越す。保持するのは1シンボル未満のサンプルだけなので、
+    あるシンボルのビットが出てくるまでの遅れは最大で1シンボル + 1チャンクになる
+    （FDMでは最後のスロットの穴埋めを見分けるため、さらに1スロット分待つ）。
+    入力が終わったら flush で端数のシンボルを判定する。
+
+    検出方式は fft と goertzel のみ（discriminator は信号全体のFFTが必要なので使えない）。
+    同期ワードは探さないので、入力の先頭がデータの先頭になるように渡す。
 
-        # 区間内の平均周波数を計算
-        freqs, magnitude = calculate_fft(segment, sample_rate)
+    :param params: 変調パラメータ（省略時はconfig.toml）
+    :param detector: 検出方式（"fft" または "goertzel"）
+    :param duration: 各音の長さ（秒、省略時は 1 / bitrate）
+    """
 
-        # 周波数範囲を制限（Bell 202: 1000Hz〜2500Hzの範囲）
-        valid_indices = np.where((freqs >= 1000) & (freqs <= 2500))
-        valid_freqs = freqs[valid_indices]
-        valid_magnitude = magnitude[valid_indices]
+    def __init__(self, params: Optional[ModemParams] = None, detector: str = "fft", duration: Optional[float] = None) -> None:
+        if detector not in DETECTORS:
+            raise ValueError(f"逐次デコードに使える検出方式は {', '.join(DETECTORS)} です（指定値: {detector}）")
+        self.params = resolve_params(params)
+        self.scheme = self.params.scheme
+        self.scheme.check_channels(self.params.channels, self.params.sample_rate)
+        self.samples_per_tone = self.params.samples_per_bit(duration)
+        self._detect = DETECTORS[detector]
+        self._buffer = np.zeros(0, dtype=np.int16)  # まだ判定していないサンプル（先頭は次のシンボルの境界）
+        self._offset = 0  # _buffer の先頭が、入力全体の何サンプル目か
+        self._symbol = 0  # 次に判定するシンボル（FDMではスロット）の番号
+        self._pending_bits = np.zeros(0, dtype=np.uint8)  # feed_bytes で8ビットに満たなかった分
+        self.n_samples = 0  # これまでに受け取ったサンプル数
+        self.n_bits = 0  # これまでに返したビット数
 
-        # 有効範囲内で最大振幅を持つ周波数を取得
-        if len(valid_freqs) > 0:
-            peak_freq = valid_freqs[np.argmax(valid_magnitude)]
+    @property
+    def buffered_samples(self) -> int:
+        """繰り越し中のサンプル数（出力の遅れ）"""
+        return len(self._buffer)
+
+    def _rows(self, n: int) -> tuple[np.ndarray, int]:
+        """_buffer の先頭から n シンボル分を (n, 1シンボルのサンプル数) の行列にし、その終端の位置と一緒に返す"""
+        bounds = bit_boundaries(self._symbol, n, self.samples_per_tone) - self._offset
+        if float(self.samples_per_tone).is_integer():
+            rows = self._buffer[:int(bounds[-1])].reshape(n, -1)
         else:
-            peak_freq = 0  # 有効な周波数が見つからない場合
+            rows = sliding_window_view(self._buffer, int(self.samples_per_tone))[bounds[:-1]]
+        return rows, int(bounds[-1])
+
+    def _consume(self, n: int, end: int) -> None:
+        """判定した n シンボル分を捨て、残りを次へ繰り越す（元のチャンクを参照し続けないようコピーする）"""
+        self._buffer = self._buffer[end:].copy()
+        self._offset += end
+        self._symbol += n
 
-        # FSK判定（1200Hz/2200Hz）
-        # print(f"Segment {i // samples_per_tone}: Filtered Peak Frequency = {peak_freq:.2f} Hz")
-        if abs(peak_freq - 1200) < abs(peak_freq - 2200):
-            bit_string += '0'
-            # print('0')
+    def _emit(self, symbols: np.ndarray) -> np.ndarray:
+        bits = self.scheme.symbols_to_bits(symbols)
+        self.n_bits += len(bits)
+        return bits
+
+    def feed(self, samples: np.ndarray) -> np.ndarray:
+        """
+        サンプルを追加し、新たに完成したシンボルのビット（0/1のuint8配列）を返す。
+        """
+        samples = np.asarray(samples, dtype=np.int16)
+        self.n_samples += len(samples)
+        self._buffer = np.concatenate([self._buffer, samples]) if len(self._buffer) > 0 else samples
+        n = count_bits(self._offset + len(self._buffer), self.samples_per_tone) - self._symbol
+        if self.params.channels > 1:
+            n -= 1
+        if n <= 0:
+            return np.zeros(0, dtype=np.uint8)
+        rows, end = self._rows(n)
+        symbols = self._detect(rows, self.params.sample_rate, self.scheme, self.params.channels)
+        self._consume(n, end)
+        return self._emit(symbols)
+
+    def flush(self) -> np.ndarray:
+        """
+        入力の終わりに呼び、残りのシンボル（端数のセグメントも含む）のビットを返す。
+        FDMでは detect_bits と同じく、最後のスロットの無音のチャンネルを捨てる。
+        """
+        channels = self.params.channels
+        n = count_bits(self._offset + len(self._buffer), self.samples_per_tone) - self._symbol
+        parts = []
+        last: Optional[np.ndarray] = None  # 最後のスロットのサンプル（FDMで無音のチャンネルを見分ける）
+        if n > 0:
+            rows, end = self._rows(n)
+            parts.append(self._detect(rows, self.params.sample_rate, self.scheme, channels))
+            last = rows[-1].copy()
+            self._consume(n, end)
+        if len(self._buffer) > 0:
+            last = self._buffer
+            parts.append(self._detect(last.reshape(1, -1), self.params.sample_rate, self.scheme, channels))
+            self._consume(1, len(self._buffer))
+        if last is None:
+            symbols = np.zeros(0, dtype=np.uint8)
         else:
-            bit_string += '1'
-            # print('1')
+            symbols = np.concatenate(parts)
+            if channels > 1:
+                symbols = symbols[:len(symbols) - count_silent_channels(last, self.params.sample_rate, self.scheme, channels)]
+        return self._emit(symbols)
+
+    def _pack(self, bits: np.ndarray) -> bytes:
+        bits = np.concatenate([self._pending_bits, bits])
+        n_bytes = len(bits) // 8
+        self._pending_bits = bits[n_bytes * 8:]
+        return bits_to_bytes(bits[:n_bytes * 8])
+
+    def feed_bytes(self, samples: np.ndarray) -> bytes:
+        """feed の結果を8ビットずつバイト列にして返す（端数のビットは次の呼び出しへ繰り越す）"""
+        return self._pack(self.feed(samples))
+
+    def flush_bytes(self) -> bytes:
+        """flush の結果をバイト列にして返す（最後に残った端数のビットは捨てる）"""
+        data = self._pack(self.flush())
+        self._pending_bits = np.zeros(0, dtype=np.uint8)
+        return data
+
+
+def decode_stream(
+    read: Callable[[int], bytes],
+    write: Callable[[bytes], Any],
+    params: Optional[ModemParams] = None,
+    detector: str = "fft",
+    chunk_frames: int = STREAM_CHUNK_FRAMES
+) -> int:
+    """
+    ヘッダなしの16ビットリトルエンディアンPCMを read から届いた分ずつ読み、復元したバイトを届いた順に write へ渡す。
+
+    :param read: 最大バイト数を受け取り、届いているデータを返す関数（終端で b''。BufferedReader.read1 など）
+    :param write: 復元したバイト列を受け取る関数
+    :param chunk_frames: 1回に読むサンプル数の上限
+    :return: 受け取ったサンプル数
+    """
+    decoder = StreamingDecoder(params, detector)
+    odd = b''  # チャンクの切れ目でサンプルの途中になった1バイト
+    while True:
+        data = read(chunk_frames * 2)
+        if not data:
+            break
+        data = odd + data
+        n_frames = len(data) // 2
+        odd = data[n_frames * 2:]
+        out = decoder.feed_bytes(np.frombuffer(data, dtype='<i2', count=n_frames))
+        if out:
+            write(out)
+    out = decoder.flush_bytes()
+    if out:
+        write(out)
+    return decoder.n_samples
+
+
+def decode_bits(
+    file_path: str,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    detector: str = "fft",
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    params: Optional[ModemParams] = None,
+    sync: bool = False,
+    channel: int = 0
+) -> np.ndarray:
+    """
+    WAVファイルを読み取り、0/1のビット配列（uint8）を復元する。
+
+    :param file_path: 入力WAVファイルのパス
+    :param duration: 各音の長さ（秒）
+    :param sample_rate: サンプリングレート（省略時はWAVヘッダの値）
+    :param detector: 検出方式（"fft"=帯域FFT, "goertzel"=トーンごとのエネルギー比較, "discriminator"=位相連続FSK用の周波数弁別）
+    :param workers: 並列に判定するプロセス数
+    :param progress: 進捗（0.0〜1.0）を受け取るコールバック
+    :param params: 変調パラメータ（ビットレート・位相連続モード・変調方式・チャンネル数に使う。省略時はconfig.toml）
+    :param sync: Trueなら同期ワードを探し、その直後からデコードする（先頭の無音やずれを吸収する）
+    :param channel: ステレオなど複数チャンネルのWAVで読むチャンネル（0から）
+    """
+    # WAVファイルを読み取る（16ビット以上の整数PCMはメモリマップなのでデータはコピーしない）
+    samples, info = read_wav_with_info(file_path, channel=channel)
+    if sample_rate is None:
+        sample_rate = info.sample_rate
+    p = resolve_params(params, sample_rate=sample_rate)
 
-    # 結果を表示
-    # print("復元された文字列:")
-    # print(bit_string)
-    #print("復元されたテキスト:")
-    #print(bitstring_to_str(bit_string))
+    samples_per_tone = p.samples_per_bit(duration)
+    start = _sync_start(samples, samples_per_tone, sample_rate, p.continuous_phase, p.scheme, p.channels) if sync else 0
 
-    # if correct_bit_string:
-    #     print("正解の文字列:")
-    #     print(correct_bit_string)
-    return bit_string
+    # 全セグメントをまとめて判定する（8ビットやfloat32は変換済みの配列なので、ワーカーには共有メモリで渡す）
+    mapped_path = file_path if is_mapped_format(info) else None
+    return detect_bits(
+        samples[start:], samples_per_tone, sample_rate, detector, workers, mapped_path, progress, start, p.scheme,
+        p.channels, channel
+    )
+
+
+def decode_bytes(
+    file_path: str,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    detector: str = "fft",
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    params: Optional[ModemParams] = None,
+    sync: bool = False,
+    channel: int = 0
+) -> bytes:
+    """
+    WAVファイルを読み取り、元のバイト列を復元する（端数のビットは捨てる）。
+    """
+    return bits_to_bytes(decode_bits(file_path, duration, sample_rate, detector, workers, progress, params, sync, channel))
+
+
+def decode_tone(
+    file_path: str,
+    correct_bit_string: Optional[str] = None,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    detector: str = "fft",
+    workers: int = 1,
+    params: Optional[ModemParams] = None,
+    sync: bool = False
+) -> str:
+    """
+    WAVファイルを読み取り、0と1の文字列を復元する。
+
+    :param file_path: 入力WAVファイルのパス
+    :param correct_bit_string: 正解のビット列（オプション、指定するとビット誤り率などを表示する）
+    :param duration: 各音の長さ（秒）
+    :param sample_rate: サンプリングレート（省略時はWAVヘッダの値）
+    :param detector: 検出方式（"fft"=帯域FFT, "goertzel"=トーンごとのエネルギー比較, "discriminator"=周波数弁別）
+    :param workers: 並列に判定するプロセス数
+    :param params: 変調パラメータ（ビットレートに使う。省略時はconfig.toml）
+    :param sync: Trueなら同期ワードを探し、その直後からデコードする
+    """
+    bits = decode_bits(file_path, duration, sample_rate, detector, workers, params=params, sync=sync)
+    if correct_bit_string is not None:
+        print(f"[BER] {bit_error_stats(bitstring_to_bits(correct_bit_string), bits).describe()}")
+    return bits_to_bitstring(bits)
 
 
 def bitstring_to_str(bit_string: str) -> str:
     # 8ビットごとに区切ってバイト列に変換し、UTF-8デコード
-    bytes_list = [bit_string[i:i+8] for i in range(0, len(bit_string), 8)]
-    byte_values = [int(b, 2) for b in bytes_list if len(b) == 8]
     try:
-        return bytes(byte_values).decode('utf-8')
+        return bitstring_to_bytes(bit_string).decode('utf-8')
     except Exception as e:
         return f"[デコード失敗: {e}]"
 
 def bitstring_to_bytes(bit_string: str) -> bytes:
-    bytes_list = [bit_string[i:i+8] for i in range(0, len(bit_string), 8)]
-    byte_values = [int(b, 2) for b in bytes_list if len(b) == 8]
-    return bytes(byte_values)
+    return bits_to_bytes(bitstring_to_bits(bit_string))
+
+def _stream_main(args: argparse.Namespace, params: ModemParams, profiler: Profiler) -> None:
+    """decode.py --stream: 標準入力などからPCMを読みながらデコードする"""
+    if args.output == '-':
+        # 標準出力は復元したデータに使うので、メッセージは標準エラーへ出す
+        sys.stdout = sys.stderr
+    if args.detector not in DETECTORS:
+        print(f"--stream では --detector に {', '.join(DETECTORS)} のいずれかを指定してください")
+        return
+    if args.sync or args.framing or args.energy_out or args.compress:
+        print("--stream は --sync / --framing / --energy-out / --compress と一緒に使えません")
+        return
+    orig_bytes = None
+    if args.file:
+        with open(args.file, 'rb') as f:
+            orig_bytes = f.read()
+    restored = bytearray()
+
+    with ExitStack() as stack:
+        # 標準入力も通常は BufferedReader なので、read1 で届いている分だけを待たずに読める
+        source = cast(io.BufferedReader, sys.stdin.buffer) if args.input == '-' else stack.enter_context(open(args.input, 'rb'))
+        out = stack.enter_context(open_output(args.output))
+
+        def write(data: bytes) -> None:
+            out.write(data)
+            out.flush()
+            if orig_bytes is not None:
+                restored.extend(data)
+
+        with profiler.stage("decode") as stage:
+            stage.n_samples = decode_stream(source.read1, write, params, args.detector, args.chunk_frames)
+            stage.n_bytes = len(restored)
+    if orig_bytes is not None:
+        orig_md5 = hashlib.md5(orig_bytes).hexdigest()
+        restored_md5 = hashlib.md5(restored).hexdigest()
+        print(f"[MD5] 元データ: {orig_md5}")
+        print(f"[MD5] 復元データ: {restored_md5}")
+        if orig_md5 == restored_md5:
+            print("[OK] MD5一致: 完全復元")
+        else:
+            print("[NG] MD5不一致: データ化けあり")
+            print(f"[BER] {bit_error_stats(bytes_to_bits(orig_bytes), bytes_to_bits(bytes(restored))).describe()}")
+    finish_profile(profiler, args)
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="FSK音声からビット列・文字列・ファイルを復元")
-    parser.add_argument('input', help='デコードするWAVファイル')
+    parser.add_argument('input', help='デコードするWAVファイル（--raw / --stream のときは - で標準入力）')
     parser.add_argument('--file', type=str, help='元データファイル（MD5比較用）')
+    parser.add_argument('--detector', choices=DETECTOR_NAMES, default='fft', help='検出方式（fft/goertzel/discriminator）')
+    parser.add_argument('--workers', type=int, default=1, help='並列にデコードするプロセス数')
+    parser.add_argument('--continuous-phase', action='store_true', help='位相連続FSK（encode.py --continuous-phase）としてビット境界を計算する')
+    parser.add_argument('--sync', action='store_true', help='同期ワードを探してその直後からデコードする（encode.py --preamble で付けたもの）')
+    parser.add_argument('--modulation', choices=sorted(MODULATIONS), help='変調方式（省略時はconfig.tomlのMODULATION）')
+    parser.add_argument('--channels', type=int, help='周波数分割多重のチャンネル数（省略時はconfig.tomlのCHANNELS）')
+    parser.add_argument('--channel', type=int, default=0, help='ステレオなど複数チャンネルのWAVで読むチャンネル（0から）')
+    parser.add_argument('--raw', action='store_true', help='入力をヘッダなしの16ビットPCM（encode.py --format raw）として読む（サンプリングレートはconfig.tomlの値）')
+    parser.add_argument('--framing', type=int, nargs='?', const=FRAME_PAYLOAD_SIZE,
+                        help=f'encode.py --framing で付けたブロック（既定{FRAME_PAYLOAD_SIZE}バイト）を誤り訂正し、失敗したブロックを表示する')
+    parser.add_argument('--compress', action='store_true',
+                        help='encode.py --compress で送ったデータとして扱う（ヘッダがあれば指定しなくても展開する。無ければ警告する）')
+    parser.add_argument('--stream', action='store_true',
+                        help='入力（- で標準入力）をヘッダなしの16ビットPCMとして届いた分ずつデコードし、復元したバイトを逐次書き出す')
+    parser.add_argument('-o', '--output', type=str, default='-', help='--stream 時に復元したバイトを書き出すファイル（- で標準出力）')
+    parser.add_argument('--chunk-frames', type=int, default=STREAM_CHUNK_FRAMES, help='--stream 時に1回に読むサンプル数の上限')
+    parser.add_argument('--energy-out', type=str, help='シンボルごとの各トーン（bfskでは1200Hz/2200Hz）のエネルギーを書き出すCSVパス')
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    profiler = profiler_from_args(args)
+    # 設定はここで1回だけ読み、以降は引数で明示的に渡す
+    params = ModemParams.from_config().with_overrides(
+        continuous_phase=True if args.continuous_phase else None, modulation=args.modulation, channels=args.channels
+    )
+
+    if args.stream:
+        _stream_main(args, params, profiler)
+        return
 
     file_path = args.input
-    correct_bit_string = None
-    orig_bytes = None
     orig_md5 = None
     if args.file:
-        with open(args.file, 'rb') as f:
-            orig_bytes = f.read()
+        with profiler.stage("md5_orig") as stage:
+            with open(args.file, 'rb') as f:
+                orig_bytes = f.read()
             orig_md5 = hashlib.md5(orig_bytes).hexdigest()
-        correct_bit_string = ''.join(f'{b:08b}' for b in orig_bytes)
+            stage.n_bytes = len(orig_bytes)
 
-    bit_string = decode_tone(file_path, correct_bit_string)
-    restored_bytes = bitstring_to_bytes(bit_string)
+    with profiler.stage("decode") as stage:
+        if args.raw:
+            raw_samples = read_raw_pcm(file_path)
+            bits = decode_samples(raw_samples, detector=args.detector, workers=args.workers, params=params, sync=args.sync)
+            restored_bytes = bits_to_bytes(bits)
+            stage.n_samples = len(raw_samples)
+        else:
+            restored_bytes = decode_bytes(
+                file_path, detector=args.detector, workers=args.workers, params=params, sync=args.sync, channel=args.channel
+            )
+            stage.n_samples = read_wav_header(file_path).n_frames
+        stage.n_bytes = len(restored_bytes)
+    if args.framing:
+        with profiler.stage("unframe", n_bytes=len(restored_bytes)):
+            report = unframe_bytes(restored_bytes, args.framing)
+        restored_bytes = report.data
+        print(f"[FRAME] {report.describe()}")
+    # encode.py --compress で圧縮したデータは先頭のヘッダから判別して展開する（ヘッダが無ければそのまま）
+    if is_compressed(restored_bytes):
+        try:
+            restored_bytes = decompress_payload(restored_bytes)
+        except ValueError as e:
+            print(f"Warning: {e}")
+    elif args.compress:
+        print("Warning: --compress が指定されましたが、復元したデータに圧縮ヘッダがありません（そのまま出力します）")
+    if args.energy_out:
+        with profiler.stage("energy") as stage:
+            if args.raw:
+                samples, sample_rate = raw_samples, params.sample_rate
+            else:
+                samples, info = read_wav_with_info(file_path, channel=args.channel)
+                sample_rate = info.sample_rate
+            scheme = params.scheme
+            energies = bit_energies(
+                samples, params.with_overrides(sample_rate=sample_rate).samples_per_bit(), sample_rate, scheme,
+                params.channels
+            )
+            header = ','.join(f'e{int(f)}' for f in scheme.channel_tones(params.channels).reshape(-1))
+            np.savetxt(args.energy_out, energies, delimiter=',', header=header, comments='')
+            stage.n_samples = len(samples)
+        print(f"[INFO] シンボルごとのエネルギーを書き出しました: {args.energy_out}")
     if args.file:
-        restored_md5 = hashlib.md5(restored_bytes).hexdigest()
+        with profiler.stage("md5") as stage:
+            restored_md5 = hashlib.md5(restored_bytes).hexdigest()
+            stage.n_bytes = len(restored_bytes)
         print(f"[MD5] 元データ: {orig_md5}")
         print(f"[MD5] 復元データ: {restored_md5}")
         if orig_md5 == restored_md5:
             print("[OK] MD5一致: 完全復元")
         else:
             print("[NG] MD5不一致: データ化けあり")
+            print(f"[BER] {bit_error_stats(bytes_to_bits(orig_bytes), bytes_to_bits(restored_bytes)).describe()}")
+    finish_profile(profiler, args)
 
 if __name__ == "__main__":
     main()
@@ -1,99 +1,758 @@
-from lib.utils import validate_bit_string, validate_noise_level
-import wave
-import struct
-import math
-import random
-import toml
-import io
+from lib.compression import compress_payload
+from lib.framing import FRAME_PAYLOAD_SIZE, frame_bytes, framed_size, iter_framed_file
+from lib.modulation import MODULATIONS, Modulation
+from lib.params import ModemParams, resolve_params
+from lib.profiling import add_profile_arguments, finish_profile, profiler_from_args
+from lib.utils import (
+    DEFAULT_SAMPLE_FORMAT, SAMPLE_FORMATS, bits_to_bitstring, bytes_to_bits, convert_samples, format_header,
+    get_sample_format, iter_wav_bytes, validate_noise_level, wav_size
+)
+import itertools
+import numpy as np
+import os
+import sys
 import argparse
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from typing import BinaryIO, Callable, Generator, Iterable, Iterator, Optional, Union
 
-# 設定を読み込む（Windows対応: encoding指定）
-def load_config_toml(config_path: str = "config.toml") -> dict:
-    with open(config_path, "r", encoding="utf-8") as f:
-        return toml.load(io.StringIO(f.read()))
+# 周波数のマッピング（Bell 202 FSK: 0=1200Hz, 1=2200Hz）
+FREQ_MAP = {'0': 1200, '1': 2200}
+TONE_FREQS = MODULATIONS["bfsk"].tone_freqs
+AMPLITUDE = 32767  # 最大振幅（16ビットPCM）
+STREAM_BLOCK_SIZE = 64 * 1024  # ストリーミング時に一度に読むバイト数
+ENCODE_SHARD_SAMPLES = 1 << 20  # ファイルへの合成で1タスクが受け持つおおよそのサンプル数
+MAX_BIT_DENOMINATOR = 1 << 16  # 1ビットあたりのサンプル数を分数で表すときの分母の上限
+# データの前に付ける同期ワード（CCSDSの付加同期マーカーと同じ32ビット）
+SYNC_WORD = 0x1ACFFC1D
+SYNC_WORD_BITS = 32
 
-config = load_config_toml()
-BITRATE: int = config["BITRATE"]  # 1秒間に何ビット詰め込むか
-SAMPLE_RATE: int = config["SAMPLE_RATE"]
-NOISE_LEVEL: int = config["NOISE_LEVEL"]
+
+def sync_bits(word: int = SYNC_WORD, n_bits: int = SYNC_WORD_BITS) -> np.ndarray:
+    """同期ワードを0/1のuint8配列（MSBファースト）にする"""
+    shifts = np.arange(n_bits - 1, -1, -1)
+    return ((word >> shifts) & 1).astype(np.uint8)
+
+
+def sync_symbols(scheme: Modulation) -> np.ndarray:
+    """同期ワードを変調方式のトーン番号の配列にする"""
+    return scheme.bits_to_symbols(sync_bits())
+
+
+def carrier_tones(scheme: Modulation, channels: int = 1, sample_rate: Optional[int] = None) -> np.ndarray:
+    """
+    合成に使うトーン周波数の表。1チャンネルなら scheme.tone_freqs そのもの（1次元）。
+    FDMでは shape (チャンネル数, トーン数 + 1) で、最後の列は末尾の穴埋めに使う無音（0Hz）。
+
+    :param sample_rate: 指定するとチャンネルがナイキスト周波数に収まるか確認する
+    """
+    if sample_rate is not None:
+        scheme.check_channels(channels, sample_rate)
+    if channels == 1:
+        return scheme.tone_freqs
+    return np.hstack([scheme.channel_tones(channels), np.zeros((channels, 1))])
+
+
+def to_slots(symbols: np.ndarray, scheme: Modulation, channels: int = 1) -> np.ndarray:
+    """
+    トーン番号の配列を、FDMの各チャンネルへ順に割り振った (スロット数, チャンネル数) の配列にする。
+    スロット t はシンボル t*channels〜(t+1)*channels-1 を運ぶ。最後のスロットの余りは無音で埋める。
+    1チャンネルならそのまま返す。
+    """
+    if channels == 1:
+        return symbols
+    slots = np.full((len(symbols) + channels - 1) // channels * channels, len(scheme.tones), dtype=np.uint8)
+    slots[:len(symbols)] = symbols
+    return slots.reshape(-1, channels)
+
+
+def modulate_bits(bits: np.ndarray, scheme: Modulation, preamble: bool = False, channels: int = 1) -> np.ndarray:
+    """
+    0/1のビット配列をトーン番号の配列にする（FDMでは (スロット数, チャンネル数) の配列）。
+    preamble が True なら先頭に同期ワードを付ける（同期ワードはデータとは別にシンボルへ詰めるので、
+    データは必ずシンボルの切れ目から始まる。FDMでは全チャンネルで同じ同期ワードを送る）。
+    """
+    symbols = to_slots(scheme.bits_to_symbols(bits), scheme, channels)
+    if not preamble:
+        return symbols
+    return np.concatenate([sync_slots(scheme, channels), symbols])
+
+
+def sync_slots(scheme: Modulation, channels: int = 1) -> np.ndarray:
+    """同期ワードのトーン番号（FDMでは全チャンネルに同じものを並べた (スロット数, チャンネル数) の配列）"""
+    symbols = sync_symbols(scheme)
+    if channels == 1:
+        return symbols
+    return np.repeat(symbols[:, None], channels, axis=1)
+
+
+def symbol_freqs(symbols: np.ndarray, tones: np.ndarray) -> np.ndarray:
+    """
+    各シンボルのトーン周波数。tones が1次元ならトーン番号をそのまま引き、
+    FDMの (チャンネル数, トーン数) の表なら (スロット数, チャンネル数) の配列をチャンネルごとに引く。
+    """
+    tones = np.asarray(tones)
+    symbols = np.asarray(symbols, dtype=np.intp)
+    if tones.ndim == 1:
+        return tones[symbols]
+    return tones[np.arange(len(tones))[None, :], symbols]
+
+
+def tone_table(sample_rate: int, samples_per_tone: int, tones: np.ndarray = TONE_FREQS) -> np.ndarray:
+    """
+    各シンボルの1シンボル分の波形を事前計算する。
+
+    :param tones: 各シンボルのトーン周波数（省略時はbfskの1200Hz/2200Hz。FDMでは (チャンネル数, トーン数)）
+    :return: shape (len(tones), samples_per_tone) のfloat64配列（行i=トーン番号i。FDMではチャンネルの次元が前に付く）
+    """
+    t = np.arange(samples_per_tone) / sample_rate
+    freqs = np.asarray(tones, dtype=np.float64)
+    return AMPLITUDE * np.sin(2 * np.pi * freqs[..., None] * t)
+
+
+def _bit_ratio(samples_per_bit: float) -> tuple[int, int]:
+    """1ビットあたりのサンプル数を分数（分子, 分母）にする（浮動小数点の誤差で境界がずれないように）"""
+    ratio = Fraction(samples_per_bit).limit_denominator(MAX_BIT_DENOMINATOR)
+    return ratio.numerator, ratio.denominator
+
+
+def bit_boundaries(first_bit: int, n_bits: int, samples_per_bit: float) -> np.ndarray:
+    """
+    first_bit ビット目から n_bits ビット分の開始サンプル位置を返す（長さ n_bits+1、最後は終端）。
+    k ビット目は floor(k * samples_per_bit) から始まるので、端数は次のビットへ繰り越され、
+    全体の長さは公称のビットレートからずれない。
+    """
+    num, den = _bit_ratio(samples_per_bit)
+    k = np.arange(first_bit, first_bit + n_bits + 1, dtype=np.int64)
+    return (k * num) // den
+
+
+def total_samples(n_bits: int, samples_per_bit: float) -> int:
+    """n_bits ビット分のサンプル数"""
+    num, den = _bit_ratio(samples_per_bit)
+    return (n_bits * num) // den
+
+
+def count_bits(n_samples: int, samples_per_bit: float) -> int:
+    """n_samples サンプルに収まる完全なビットの数"""
+    num, den = _bit_ratio(samples_per_bit)
+    if num == 0:
+        return 0
+    return ((n_samples + 1) * den - 1) // num
+
+
+def bit_start_phases(
+    bits: np.ndarray,
+    bounds: np.ndarray,
+    sample_rate: int,
+    phase: Union[float, np.ndarray] = 0.0,
+    tones: np.ndarray = TONE_FREQS
+) -> tuple[np.ndarray, Union[float, np.ndarray]]:
+    """
+    位相連続FSKで各ビットが始まるときの位相（サイクル単位、0〜1）を、ビットごとの位相の進みの累積和で求める。
+
+    :param bounds: bit_boundaries の結果（長さ = ビット数 + 1）
+    :param bits: トーン番号の配列（bfskでは0/1）
+    :param phase: 最初のビットの開始位相（FDMではチャンネルごとの配列）
+    :param tones: 各シンボルのトーン周波数
+    :return: (各ビットの開始位相, 最後のビットの終端の位相)
+    """
+    freqs = symbol_freqs(bits, tones)
+    lengths = np.diff(bounds).reshape((-1,) + (1,) * (freqs.ndim - 1))
+    cycles = freqs * lengths / sample_rate
+    ends = np.cumsum(cycles, axis=0) + phase
+    starts = np.empty_like(cycles)
+    if len(cycles) > 0:
+        starts[0] = phase
+        starts[1:] = ends[:-1]
+    if freqs.ndim > 1:
+        end_phase = np.mod(ends[-1], 1.0) if len(ends) > 0 else np.broadcast_to(phase, freqs.shape[1:]).copy()
+        return np.mod(starts, 1.0), end_phase
+    end_phase = float(ends[-1]) if len(ends) > 0 else phase
+    return np.mod(starts, 1.0), end_phase % 1.0
+
+
+def continuous_phase_signal(
+    bits: np.ndarray,
+    bounds: np.ndarray,
+    phases: np.ndarray,
+    sample_rate: int,
+    tones: np.ndarray = TONE_FREQS
+) -> np.ndarray:
+    """
+    位相連続FSKの波形（ノイズなし、float64）を、サンプルごとの累積位相からまとめて計算する。
+    FDMでは各チャンネルの波形を 1/チャンネル数 の振幅で足し合わせる（無音のシンボルは0）。
+
+    :param bits: トーン番号（bfskでは0/1）を並べた整数配列
+    :param bounds: 各ビットの開始サンプル位置（bit_boundaries の結果、長さ = ビット数 + 1）
+    :param phases: 各ビットの開始位相（bit_start_phases の結果）
+    :param tones: 各シンボルのトーン周波数
+    """
+    freqs = symbol_freqs(bits, tones)
+    lengths = np.diff(bounds)
+    owner = np.repeat(np.arange(len(freqs)), lengths)  # 各サンプルが属するビット
+    elapsed = np.arange(bounds[-1] - bounds[0]) - (bounds[:-1] - bounds[0])[owner]
+    if freqs.ndim == 1:
+        phase = phases[owner] + freqs[owner] * elapsed / sample_rate
+        return AMPLITUDE * np.sin(2 * np.pi * phase)
+    sample_freqs = freqs[owner]
+    wave = np.sin(2 * np.pi * (phases[owner] + sample_freqs * elapsed[:, None] / sample_rate))
+    wave[sample_freqs == 0] = 0.0
+    return AMPLITUDE * wave.mean(axis=1)
+
+
+def tone_signal(
+    bits: np.ndarray,
+    samples_per_bit: float,
+    sample_rate: int,
+    continuous_phase: bool = False,
+    tones: np.ndarray = TONE_FREQS
+) -> np.ndarray:
+    """トーン番号の配列全体のノイズなしの波形（float64）を返す"""
+    if not continuous_phase:
+        return _table_signal(bits, tone_table(sample_rate, int(samples_per_bit), tones))
+    bounds = bit_boundaries(0, len(bits), samples_per_bit)
+    phases, _ = bit_start_phases(bits, bounds, sample_rate, tones=tones)
+    return continuous_phase_signal(bits, bounds, phases, sample_rate, tones)
+
+
+def _table_signal(bits: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """
+    事前計算した波形の表からシンボルごとの波形を引いて1次元に並べる。
+    FDMでは各チャンネルの波形を 1/チャンネル数 の振幅で足し合わせる。
+    """
+    bits = np.asarray(bits, dtype=np.intp)
+    if table.ndim == 2:
+        # (ビット数, samples_per_tone) に展開してから1次元に並べる
+        return table[bits].reshape(-1)
+    return table[np.arange(len(table))[None, :], bits].mean(axis=1).reshape(-1)
+
+
+def _quantize(
+    signal: np.ndarray,
+    noise_level: int,
+    rng: Optional[np.random.Generator],
+    out: Optional[np.ndarray]
+) -> np.ndarray:
+    """波形にノイズを加え、int16に変換する"""
+    max_noise = 100 + (noise_level * 100)  # ノイズ幅を100Hz単位で増加
+    uniform = rng.uniform if rng is not None else np.random.uniform
+    signal += uniform(-max_noise, max_noise, signal.shape)
+    np.clip(signal, -AMPLITUDE, AMPLITUDE, out=signal)
+    # int()と同じく0方向への切り捨て
+    if out is None:
+        return signal.astype(np.int16)
+    np.copyto(out, signal, casting='unsafe')
+    return out
+
+
+def synthesize(
+    bits: np.ndarray,
+    samples_per_tone: int,
+    sample_rate: int,
+    noise_level: int,
+    rng: Optional[np.random.Generator] = None,
+    out: Optional[np.ndarray] = None,
+    tones: np.ndarray = TONE_FREQS
+) -> np.ndarray:
+    """
+    0/1のビット配列（M値FSKではトーン番号の配列）からint16のサンプル列をまとめて生成する。
+
+    :param bits: 0/1（M値FSKではトーン番号）を並べた整数配列
+    :param samples_per_tone: 1ビットあたりのサンプル数
+    :param sample_rate: サンプリングレート
+    :param noise_level: ノイズの強さ
+    :param rng: ノイズ用の乱数生成器（省略時は np.random）
+    :param out: 結果を書き込むint16配列（長さ = ビット数 * samples_per_tone）
+    :param tones: 各シンボルのトーン周波数
+    :return: int16のサンプル配列
+    """
+    signal = _table_signal(bits, tone_table(sample_rate, samples_per_tone, tones))
+    return _quantize(signal, noise_level, rng, out)
+
+
+def synthesize_continuous(
+    bits: np.ndarray,
+    bounds: np.ndarray,
+    phases: np.ndarray,
+    sample_rate: int,
+    noise_level: int,
+    rng: Optional[np.random.Generator] = None,
+    out: Optional[np.ndarray] = None,
+    tones: np.ndarray = TONE_FREQS
+) -> np.ndarray:
+    """
+    位相連続FSKで0/1のビット配列からint16のサンプル列を生成する。
+    bounds と phases を渡すので、長いビット列を分割して別々に合成しても境界で位相がつながる。
+
+    :param bounds: 各ビットの開始サンプル位置（長さ = ビット数 + 1）
+    :param phases: 各ビットの開始位相（サイクル単位）
+    :param out: 結果を書き込むint16配列（長さ = bounds[-1] - bounds[0]）
+    """
+    return _quantize(continuous_phase_signal(bits, bounds, phases, sample_rate, tones), noise_level, rng, out)
+
+
+def synthesize_into(
+    bits: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    noise_level: int,
+    out: np.ndarray,
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    continuous_phase: bool = False,
+    tones: np.ndarray = TONE_FREQS,
+    output_format: str = DEFAULT_SAMPLE_FORMAT,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    事前に確保した配列 out（長さ = total_samples(ビット数, samples_per_tone)）へ、
+    互いに重ならないビット範囲ごとに直接合成する（workers が2以上ならスレッドプールで並列）。
+
+    :param samples_per_tone: 1ビットあたりのサンプル数（位相連続モードでは端数を含んでよい）
+    :param progress: 進捗（0.0〜1.0）を受け取るコールバック。例外を送出すると中断できる
+    :param continuous_phase: Trueなら位相連続FSKで合成する
+    :param tones: 各シンボルのトーン周波数（bits はトーン番号の配列）
+    :param output_format: out の形式（pcm16/raw以外ではシャードごとにint16で合成してから変換する）
+    :param seed: ノイズの乱数シード（シャードの分け方は workers によらないので、指定すれば並列数によらず同じ出力になる）
+    """
+    if len(out) == 0:
+        return out
+    shard_bits = max(1, ENCODE_SHARD_SAMPLES // max(int(samples_per_tone), 1))
+    starts = range(0, len(bits), shard_bits)
+    # シャードごとに独立した乱数列を使う（グローバル乱数のロック待ちを避ける）
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    bounds = bit_boundaries(0, len(bits), samples_per_tone)
+    if continuous_phase:
+        # 各ビットの開始位相を先に求めておけば、シャードを独立に合成しても位相がつながる
+        phases, _ = bit_start_phases(bits, bounds, sample_rate, tones=tones)
+
+    def run_shard(start: int, shard_seed: np.random.SeedSequence) -> None:
+        stop = min(start + shard_bits, len(bits))
+        rng = np.random.default_rng(shard_seed)
+        dst = out[bounds[start]:bounds[stop]]
+        target = dst if dst.dtype == np.int16 else np.empty(len(dst), dtype=np.int16)
+        if continuous_phase:
+            synthesize_continuous(
+                bits[start:stop], bounds[start:stop + 1], phases[start:stop], sample_rate, noise_level, rng, target, tones
+            )
+        else:
+            synthesize(bits[start:stop], int(samples_per_tone), sample_rate, noise_level, rng, target, tones)
+        if target is not dst:
+            convert_samples(target, output_format, dst)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_shard, start, shard_seed) for start, shard_seed in zip(starts, seeds)]
+            try:
+                for done, future in enumerate(futures, 1):
+                    future.result()
+                    if progress is not None:
+                        progress(done / len(futures))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    else:
+        for done, (start, shard_seed) in enumerate(zip(starts, seeds), 1):
+            run_shard(start, shard_seed)
+            if progress is not None:
+                progress(done / len(starts))
+    return out
+
+
+def synthesize_to_file(
+    bits: np.ndarray,
+    samples_per_tone: float,
+    sample_rate: int,
+    noise_level: int,
+    output_path: str,
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    continuous_phase: bool = False,
+    tones: np.ndarray = TONE_FREQS,
+    output_format: str = DEFAULT_SAMPLE_FORMAT,
+    seed: Optional[int] = None
+) -> None:
+    """
+    出力WAVのサイズを先に確定させてdata部をメモリマップし、synthesize_into で直接合成する。
+    WAVヘッダは最後に1回だけ書き込む（生PCMならヘッダなし）。
+
+    :param output_format: 出力形式（SAMPLE_FORMATS の名前）
+    :param seed: ノイズの乱数シード（synthesize_into に渡す）
+    """
+    fmt = get_sample_format(output_format)
+    n_frames = total_samples(len(bits), samples_per_tone)
+    header = format_header(n_frames, sample_rate, output_format)
+    with open(output_path, 'wb') as f:
+        f.truncate(wav_size(n_frames, output_format))
+    if n_frames > 0:
+        out = np.memmap(output_path, dtype=fmt.dtype, mode='r+', offset=len(header), shape=(n_frames,))
+        try:
+            synthesize_into(
+                bits, samples_per_tone, sample_rate, noise_level, out, workers, progress, continuous_phase, tones,
+                output_format, seed
+            )
+            out.flush()
+        finally:
+            del out
+    if header:
+        with open(output_path, 'r+b') as f:
+            f.write(header)
+
+
+def count_frames(n_bytes: int, params: ModemParams, duration: Optional[float] = None, preamble: bool = False) -> int:
+    """n_bytes バイトをエンコードしたときのサンプル数（FDMの最後のスロットの穴埋めと同期ワードを含む）"""
+    n_slots = -(-params.scheme.n_symbols(n_bytes * 8) // params.channels)
+    if preamble:
+        n_slots += params.scheme.n_symbols(SYNC_WORD_BITS)
+    return total_samples(n_slots, params.samples_per_bit(duration))
+
+
+def open_output(output_path: str) -> BinaryIO:
+    """出力先をバイナリで開く（"-" なら標準出力。sys.stdout を差し替えていてもファイルディスクリプタ1に書く）"""
+    if output_path == "-":
+        return open(1, 'wb', closefd=False)
+    return open(output_path, 'wb')
+
+
+def encode_samples(
+    data: bytes,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    noise_level: Optional[int] = None,
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    params: Optional[ModemParams] = None,
+    preamble: bool = False
+) -> np.ndarray:
+    """
+    バイト列をFSK音声にして、WAVに書き出さずにint16のサンプル配列として返す。
+
+    :param preamble: Trueならデータの前に同期ワードを付ける
+    """
+    p = resolve_params(params, sample_rate=sample_rate, noise_level=noise_level)
+    tones = carrier_tones(p.scheme, p.channels, p.sample_rate)
+    symbols = modulate_bits(bytes_to_bits(data), p.scheme, preamble, p.channels)
+    samples_per_bit = p.samples_per_bit(duration)
+    out = np.empty(total_samples(len(symbols), samples_per_bit), dtype=np.int16)
+    return synthesize_into(
+        symbols, samples_per_bit, p.sample_rate, p.noise_level, out, workers, progress, p.continuous_phase, tones
+    )
 
 
 def generate_tone(
     bit_string: str,
     duration: Optional[float] = None,
-    sample_rate: int = SAMPLE_RATE,
-    noise_level: int = NOISE_LEVEL,
-    output_path: str = "output.wav"
+    sample_rate: Optional[int] = None,
+    noise_level: Optional[int] = None,
+    output_path: str = "output.wav",
+    workers: int = 1,
+    params: Optional[ModemParams] = None,
+    preamble: bool = False,
+    output_format: str = DEFAULT_SAMPLE_FORMAT
 ) -> None:
-    if duration is None:
-        duration = 1.0 / BITRATE  # 1ビットあたりの秒数
-
     """
-    0と1の文字列から、それぞれ440Hzと880Hzの音を生成し、ノイズを加えたWAVファイルに保存する。
+    0と1の文字列から、それぞれ1200Hzと2200Hzの音（M値FSKでは複数ビットごとに1つのトーン）を生成し、
+    ノイズを加えたWAVファイルに保存する。
 
     :param bit_string: 0と1の並んだ文字列
     :param duration: 各音の長さ（秒）
     :param sample_rate: サンプリングレート
     :param noise_level: ノイズの強さ（0〜5）
     :param output_path: 出力WAVファイルパス
+    :param workers: 並列に合成するスレッド数
+    :param params: 変調パラメータ（個別に指定した引数が優先、省略時はconfig.toml）
+    :param preamble: Trueならデータの前に同期ワードを付ける（デコード側は sync=True で位置合わせできる）
+    :param output_format: 出力形式（"pcm16", "pcm8", "float32", "raw"）
     """
-    # 周波数のマッピング（Bell 202 FSK: 0=1200Hz, 1=2200Hz）
-    freq_map = {'0': 1200, '1': 2200}
+    invalid = set(bit_string) - set(FREQ_MAP)
+    if invalid:
+        for bit in sorted(invalid):
+            print(f"無効な文字: {bit}（スキップします）")
+        bit_string = ''.join(bit for bit in bit_string if bit in FREQ_MAP)
 
-    amplitude = 32767  # 最大振幅（16ビットPCM）
-    samples = []
+    # '0'/'1' の文字コードから0/1の配列を作る
+    bits = np.frombuffer(bit_string.encode('ascii'), dtype=np.uint8) - ord('0')
+    encode_bits(
+        bits, duration, sample_rate, noise_level, output_path, workers, params=params, preamble=preamble,
+        output_format=output_format
+    )
 
-    for bit in bit_string:
-        if bit not in freq_map:
-            print(f"無効な文字: {bit}（スキップします）")
-            continue
-        frequency = freq_map[bit]
-        for i in range(int(sample_rate * duration)):
-            t = i / sample_rate
-            sample = amplitude * math.sin(2 * math.pi * frequency * t)
-            max_noise = 100 + (noise_level * 100)  # ノイズ幅を100Hz単位で増加
-            noise = random.uniform(-max_noise, max_noise)
-            sample_with_noise = sample + noise
-            sample_with_noise = max(-amplitude, min(amplitude, sample_with_noise))
-            samples.append(int(sample_with_noise))
-
-    with wave.open(output_path, 'w') as wav_file:
-        wav_file.setnchannels(1)  # モノラル
-        wav_file.setsampwidth(2)  # 16ビット
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(struct.pack('<' + 'h' * len(samples), *samples))
 
+def encode_bits(
+    bits: np.ndarray,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    noise_level: Optional[int] = None,
+    output_path: str = "output.wav",
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    params: Optional[ModemParams] = None,
+    preamble: bool = False,
+    output_format: str = DEFAULT_SAMPLE_FORMAT
+) -> None:
+    """
+    0/1のビット配列をFSK音声にしてWAVファイルに保存する。
+
+    :param bits: 0/1を並べたuint8配列
+    :param duration: 各音の長さ（秒）
+    :param sample_rate: サンプリングレート
+    :param noise_level: ノイズの強さ（0〜5）
+    :param output_path: 出力WAVファイルパス
+    :param workers: 並列に合成するスレッド数
+    :param progress: 進捗（0.0〜1.0）を受け取るコールバック
+    :param params: 変調パラメータ（個別に指定した引数が優先、省略時はconfig.toml）
+    :param preamble: Trueならデータの前に同期ワードを付ける
+    :param output_format: 出力形式（"pcm16"=16ビットWAV, "pcm8"=8ビットWAV, "float32"=浮動小数点WAV, "raw"=ヘッダなしの16ビットPCM）
+    """
+    p = resolve_params(params, sample_rate=sample_rate, noise_level=noise_level)
+    tones = carrier_tones(p.scheme, p.channels, p.sample_rate)
+    symbols = modulate_bits(bits, p.scheme, preamble, p.channels)
+    synthesize_to_file(
+        symbols, p.samples_per_bit(duration), p.sample_rate, p.noise_level, output_path, workers, progress,
+        p.continuous_phase, tones, output_format
+    )
     print(f"WAVファイルを生成しました: {output_path}")
 
+
+def encode_bytes(
+    data: bytes,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    noise_level: Optional[int] = None,
+    output_path: str = "output.wav",
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None,
+    params: Optional[ModemParams] = None,
+    preamble: bool = False,
+    output_format: str = DEFAULT_SAMPLE_FORMAT
+) -> None:
+    """
+    バイト列をFSK音声にしてWAVファイルに保存する。
+    """
+    encode_bits(
+        bytes_to_bits(data), duration, sample_rate, noise_level, output_path, workers, progress, params, preamble,
+        output_format
+    )
+
+
 def str_to_bitstring(s: str) -> str:
-    return ''.join(f'{b:08b}' for b in s.encode('utf-8'))
+    return bits_to_bitstring(bytes_to_bits(s.encode('utf-8')))
 
-def file_to_bitstring(filepath: str) -> str:
+def file_to_bits(filepath: str) -> np.ndarray:
     with open(filepath, 'rb') as f:
         data = f.read()
-    return ''.join(f'{b:08b}' for b in data)
+    return bytes_to_bits(data)
+
+def file_to_bitstring(filepath: str) -> str:
+    return bits_to_bitstring(file_to_bits(filepath))
+
+def iter_file_bits(filepath: str, block_size: int = STREAM_BLOCK_SIZE) -> Generator[np.ndarray, None, None]:
+    """
+    ファイルを固定サイズのバイトブロックずつ読み、0/1のビット配列として順に返す。
+    """
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield np.unpackbits(np.frombuffer(block, dtype=np.uint8))
+
+
+def iter_symbol_blocks(blocks: Iterable[np.ndarray], scheme: Modulation, channels: int = 1) -> Iterator[np.ndarray]:
+    """
+    ビット配列のブロック列をトーン番号の配列（FDMではスロットの配列）のブロック列にする。
+    ブロックのビット数が1スロットで送るビット数で割り切れない場合は、余りを次のブロックへ繰り越す
+    （穴埋めは最後のブロックだけ）。
+    """
+    k = scheme.bits_per_symbol * channels
+    carry = np.empty(0, dtype=np.uint8)
+    for bits in blocks:
+        if len(carry) > 0:
+            bits = np.concatenate([carry, bits])
+        usable = len(bits) - len(bits) % k
+        carry = bits[usable:]
+        if usable > 0:
+            yield to_slots(scheme.bits_to_symbols(bits[:usable]), scheme, channels)
+    if len(carry) > 0:
+        yield to_slots(scheme.bits_to_symbols(carry), scheme, channels)
+
+
+def iter_tone_blocks(
+    filepath: str,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    noise_level: Optional[int] = None,
+    block_size: int = STREAM_BLOCK_SIZE,
+    params: Optional[ModemParams] = None,
+    preamble: bool = False,
+    framing: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """
+    ファイルをブロック単位でFSK音声に変換し、int16のサンプル配列を順に返す。
+    メモリ使用量は入力サイズによらずブロックサイズ分で一定。
+
+    :param filepath: エンコードするファイルパス
+    :param duration: 各音の長さ（秒）
+    :param sample_rate: サンプリングレート
+    :param noise_level: ノイズの強さ（0〜5）
+    :param block_size: 1ブロックあたりのバイト数
+    :param params: 変調パラメータ（個別に指定した引数が優先、省略時はconfig.toml）
+    :param preamble: Trueなら最初のブロックの前に同期ワードを出力する
+    :param framing: 指定するとこのバイト数ずつのブロックに通し番号・CRC32・FECを付けて送る（lib.framing）
+    """
+    p = resolve_params(params, sample_rate=sample_rate, noise_level=noise_level)
+    samples_per_bit = p.samples_per_bit(duration)
+    scheme = p.scheme
+    tones = carrier_tones(scheme, p.channels, p.sample_rate)
+    if framing:
+        bit_blocks = (bytes_to_bits(block) for block in iter_framed_file(filepath, framing, block_size))
+    else:
+        bit_blocks = iter_file_bits(filepath, block_size)
+    blocks = iter_symbol_blocks(bit_blocks, scheme, p.channels)
+    if preamble:
+        blocks = itertools.chain([sync_slots(scheme, p.channels)], blocks)
+    # 位相連続モードでは、シンボル位置と位相をブロック間で引き継ぐ
+    first_bit = 0
+    phase: Union[float, np.ndarray] = 0.0
+    for symbols in blocks:
+        if p.continuous_phase:
+            bounds = bit_boundaries(first_bit, len(symbols), samples_per_bit)
+            phases, phase = bit_start_phases(symbols, bounds, p.sample_rate, phase, tones)
+            yield synthesize_continuous(symbols, bounds, phases, p.sample_rate, p.noise_level, tones=tones)
+            first_bit += len(symbols)
+        else:
+            yield synthesize(symbols, int(samples_per_bit), p.sample_rate, p.noise_level, tones=tones)
+
+
+def generate_tone_stream(
+    filepath: str,
+    duration: Optional[float] = None,
+    sample_rate: Optional[int] = None,
+    noise_level: Optional[int] = None,
+    output_path: str = "output.wav",
+    block_size: int = STREAM_BLOCK_SIZE,
+    params: Optional[ModemParams] = None,
+    preamble: bool = False,
+    output_format: str = DEFAULT_SAMPLE_FORMAT,
+    framing: Optional[int] = None
+) -> int:
+    """
+    ファイルをブロック単位でエンコードし、WAVファイルに逐次追記する。
+    フレーム数は入力ファイルのサイズから先に決まるので、ヘッダを先頭に書いてから追記する
+    （シークできない標準出力やパイプにも書ける）。
+
+    :param output_path: 出力先（"-" なら標準出力）
+    :param output_format: 出力形式（SAMPLE_FORMATS の名前）
+    :param framing: 指定するとこのバイト数ずつのブロックに通し番号・CRC32・FECを付ける
+    :return: 書き込んだフレーム数
+    """
+    p = resolve_params(params, sample_rate=sample_rate, noise_level=noise_level)
+    n_bytes = os.path.getsize(filepath)
+    if framing:
+        n_bytes = framed_size(n_bytes, framing)
+    expected = count_frames(n_bytes, p, duration, preamble)
+    n_frames = 0
+    with open_output(output_path) as f:
+        f.write(format_header(expected, p.sample_rate, output_format))
+        for samples in iter_tone_blocks(
+            filepath, duration, block_size=block_size, params=p, preamble=preamble, framing=framing
+        ):
+            f.write(convert_samples(samples, output_format).tobytes())
+            n_frames += len(samples)
+        if n_frames != expected and get_sample_format(output_format).header and f.seekable():
+            # エンコード中に入力ファイルのサイズが変わった場合はヘッダを書き直す
+            f.seek(0)
+            f.write(format_header(n_frames, p.sample_rate, output_format))
+
+    print(f"WAVファイルを生成しました: {output_path}")
+    return n_frames
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="文字列またはファイルをFSK音声にエンコード")
     parser.add_argument('input', nargs='?', help='エンコードする文字列')
     parser.add_argument('--file', type=str, help='エンコードするファイルパス')
     parser.add_argument('noise_level', nargs='?', type=int, help='ノイズレベル(0〜5)')
+    parser.add_argument('--stream', action='store_true', help='ファイルをブロック単位で逐次エンコードする（--file指定時のみ）')
+    parser.add_argument('--workers', type=int, default=1, help='並列に合成するスレッド数')
+    parser.add_argument('--block-size', type=int, default=STREAM_BLOCK_SIZE, help='--stream時の1ブロックのバイト数')
+    parser.add_argument('--continuous-phase', action='store_true', help='位相連続FSKで合成する（端数のサンプルも繰り越す）')
+    parser.add_argument('--preamble', action='store_true', help=f'データの前に同期ワード(0x{SYNC_WORD:08X})を付ける')
+    parser.add_argument('--modulation', choices=sorted(MODULATIONS), help='変調方式（省略時はconfig.tomlのMODULATION）')
+    parser.add_argument('--channels', type=int, help='周波数分割多重で同時に送るチャンネル数（省略時はconfig.tomlのCHANNELS）')
+    parser.add_argument('--format', choices=list(SAMPLE_FORMATS), default=DEFAULT_SAMPLE_FORMAT,
+                        help='出力形式（pcm16=16ビットWAV, pcm8=8ビットWAV, float32=浮動小数点WAV, raw=ヘッダなしの16ビットPCM）')
+    parser.add_argument('-o', '--output', type=str, default='output.wav', help='出力ファイル（- で標準出力）')
+    parser.add_argument('--compress', action='store_true', help='変調する前にzlib/lzmaのうち小さくなる方で圧縮する（decode.pyは自動で展開）')
+    parser.add_argument('--framing', type=int, nargs='?', const=FRAME_PAYLOAD_SIZE,
+                        help=f'データをブロック（既定{FRAME_PAYLOAD_SIZE}バイト）に分け、通し番号・CRC32・Hamming(7,4)のFECを付ける')
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    profiler = profiler_from_args(args)
+    if args.output == '-':
+        # 標準出力は音声データに使うので、メッセージは標準エラーへ出す
+        sys.stdout = sys.stderr
+    # 設定はここで1回だけ読み、以降は引数で明示的に渡す
+    params = ModemParams.from_config().with_overrides(
+        noise_level=args.noise_level, continuous_phase=True if args.continuous_phase else None,
+        modulation=args.modulation, channels=args.channels
+    )
 
-    if args.file:
-        bit_string = file_to_bitstring(args.file)
-        print(f"[INFO] ファイル {args.file} をビット列に変換してエンコードします")
-    elif args.input:
-        bit_string = str_to_bitstring(args.input)
-    else:
-        print("使い方: python3 encode.py <文字列> [ノイズレベル] または --file <ファイルパス> [ノイズレベル]")
+    if args.stream:
+        if not args.file:
+            print("--stream は --file と一緒に指定してください")
+            return
+        if args.compress:
+            print("--compress はファイル全体を圧縮するので --stream とは一緒に使えません")
+            return
+        validate_noise_level(params.noise_level)
+        print(f"[INFO] ファイル {args.file} をストリーミングでエンコードします")
+        with profiler.stage("encode") as stage:
+            stage.n_samples = generate_tone_stream(
+                args.file, output_path=args.output, block_size=args.block_size, params=params, preamble=args.preamble,
+                output_format=args.format, framing=args.framing
+            )
+            stage.n_bytes = os.path.getsize(args.file)
+        finish_profile(profiler, args)
         return
 
-    validate_bit_string(bit_string)
-    noise_level = args.noise_level if args.noise_level is not None else NOISE_LEVEL
-    validate_noise_level(noise_level)
-    generate_tone(bit_string, noise_level=noise_level)
+    with profiler.stage("read_input") as stage:
+        if args.file:
+            with open(args.file, 'rb') as f:
+                data = f.read()
+            print(f"[INFO] ファイル {args.file} をビット列に変換してエンコードします")
+        elif args.input:
+            data = args.input.encode('utf-8')
+        else:
+            print("使い方: python3 encode.py <文字列> [ノイズレベル] または --file <ファイルパス> [ノイズレベル]")
+            return
+        stage.n_bytes = len(data)
+
+    validate_noise_level(params.noise_level)
+    if args.compress:
+        with profiler.stage("compress", n_bytes=len(data)):
+            compressed = compress_payload(data)
+            data = compressed.data
+        print(f"[INFO] 圧縮しました: {compressed.describe()}")
+    if args.framing:
+        with profiler.stage("framing", n_bytes=len(data)):
+            data = frame_bytes(data, args.framing)
+    with profiler.stage("encode", n_bytes=len(data)) as stage:
+        if args.output == '-':
+            # 標準出力はメモリマップできないので、サンプル配列を作ってから順に書き出す
+            samples = encode_samples(data, workers=args.workers, params=params, preamble=args.preamble)
+            with open_output(args.output) as f:
+                for chunk in iter_wav_bytes(samples, params.sample_rate, args.format):
+                    f.write(chunk)
+        else:
+            encode_bytes(
+                data, output_path=args.output, workers=args.workers, params=params, preamble=args.preamble,
+                output_format=args.format
+            )
+        stage.n_samples = count_frames(len(data), params, preamble=args.preamble)
+    finish_profile(profiler, args)
 
 if __name__ == "__main__":
     main()
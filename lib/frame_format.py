@@ -0,0 +1,8 @@
+import struct
+
+# lib.framing のブロックの構成（NumPyを読み込まない lib.client からも既定値を参照できるように分けてある）
+# ブロックの構成（FEC前）: 通し番号(4) + 全ブロック数(4) + ペイロード長(2) + ペイロード + CRC32(4)
+FRAME_HEADER = struct.Struct('>IIH')
+CRC_SIZE = 4
+FRAME_PAYLOAD_SIZE = 128  # 1ブロックのペイロードのバイト数（既定値）
+MAX_FRAME_PAYLOAD_SIZE = 0xFFFF
@@ -0,0 +1,181 @@
+import os
+import zlib
+import numpy as np
+from typing import Iterator, NamedTuple, Optional
+from lib.frame_format import CRC_SIZE, FRAME_HEADER, FRAME_PAYLOAD_SIZE, MAX_FRAME_PAYLOAD_SIZE
+
+# Hamming(7,4) 符号: 符号語 = [d1 d2 d3 d4 p1 p2 p3]（p1=d1^d2^d4, p2=d1^d3^d4, p3=d2^d3^d4）
+HAMMING_G = np.array([
+    [1, 0, 0, 0, 1, 1, 0],
+    [0, 1, 0, 0, 1, 0, 1],
+    [0, 0, 1, 0, 0, 1, 1],
+    [0, 0, 0, 1, 1, 1, 1],
+], dtype=np.uint8)
+HAMMING_H = np.array([
+    [1, 1, 0, 1, 1, 0, 0],
+    [1, 0, 1, 1, 0, 1, 0],
+    [0, 1, 1, 1, 0, 0, 1],
+], dtype=np.uint8)
+# シンドローム（H の列を2進数として読んだ値）→ 誤ったビットの位置（-1 は誤りなし）
+_SYNDROME_POSITION = np.full(8, -1, dtype=np.intp)
+_SYNDROME_POSITION[HAMMING_H.T @ np.array([4, 2, 1])] = np.arange(7)
+
+
+class FrameReport(NamedTuple):
+    """フレームを外した結果"""
+    data: bytes  # 復元したバイト列（失敗したブロックは0で埋める）
+    n_blocks: int  # 送られたブロック数
+    failed: list[int]  # CRCが合わなかった、または届かなかったブロックの通し番号
+    corrected_bits: int  # FECで訂正したビット数
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def describe(self) -> str:
+        failed = ", ".join(str(seq) for seq in self.failed) if self.failed else "なし"
+        return f"{self.n_blocks}ブロック中 {len(self.failed)}ブロック失敗（{failed}）、FECで{self.corrected_bits}ビット訂正"
+
+
+def _check_payload_size(payload_size: int) -> None:
+    if not (1 <= payload_size <= MAX_FRAME_PAYLOAD_SIZE):
+        raise ValueError(f"ブロックのサイズは1〜{MAX_FRAME_PAYLOAD_SIZE}バイトで指定してください（指定値: {payload_size}）")
+
+
+def frame_size(payload_size: int = FRAME_PAYLOAD_SIZE) -> int:
+    """FEC前の1ブロックのバイト数"""
+    return FRAME_HEADER.size + payload_size + CRC_SIZE
+
+
+def coded_frame_size(payload_size: int = FRAME_PAYLOAD_SIZE) -> int:
+    """FEC後の1ブロックのバイト数（1バイト = 2符号語 = 14ビットを、バイト境界まで0で埋める）"""
+    return (frame_size(payload_size) * 14 + 7) // 8
+
+
+def count_blocks(n_bytes: int, payload_size: int = FRAME_PAYLOAD_SIZE) -> int:
+    return -(-n_bytes // payload_size)
+
+
+def framed_size(n_bytes: int, payload_size: int = FRAME_PAYLOAD_SIZE) -> int:
+    """n_bytes バイトをフレームにしたときのバイト数"""
+    return count_blocks(n_bytes, payload_size) * coded_frame_size(payload_size)
+
+
+def hamming_encode(bits: np.ndarray) -> np.ndarray:
+    """0/1の配列（長さは4の倍数）を4ビットずつ Hamming(7,4) の符号語にする。shape (符号語数, 7)"""
+    return (bits.reshape(-1, 4) @ HAMMING_G) & 1
+
+
+def hamming_decode(codewords: np.ndarray) -> tuple[np.ndarray, int]:
+    """
+    Hamming(7,4) の符号語 (符号語数, 7) の1ビット誤りを訂正し、データビットを取り出す。
+
+    :return: (データビットの1次元配列, 訂正したビット数)
+    """
+    syndrome = ((codewords @ HAMMING_H.T) & 1) @ np.array([4, 2, 1], dtype=np.uint8)
+    position = _SYNDROME_POSITION[syndrome]
+    rows = np.flatnonzero(position >= 0)
+    codewords = codewords.copy()
+    codewords[rows, position[rows]] ^= 1
+    return codewords[:, :4].reshape(-1), len(rows)
+
+
+def frame_bytes(
+    data: bytes,
+    payload_size: int = FRAME_PAYLOAD_SIZE,
+    first_seq: int = 0,
+    total: Optional[int] = None
+) -> bytes:
+    """
+    バイト列を固定サイズのブロックに分け、通し番号とCRC32を付けて Hamming(7,4) で符号化する。
+    各ブロックの中では符号語をまたいでビットを並べ替える（インターリーブ）ので、
+    連続したビット誤りは別々の符号語に散らばり、それぞれ1ビット誤りとして訂正できる。
+
+    :param first_seq: 最初のブロックの通し番号（ファイルを分けて符号化するとき）
+    :param total: 全ブロック数（省略時は data のブロック数）
+    """
+    _check_payload_size(payload_size)
+    n_blocks = count_blocks(len(data), payload_size)
+    if total is None:
+        total = first_seq + n_blocks
+    if n_blocks == 0:
+        return b''
+    size = frame_size(payload_size)
+    frames = np.zeros((n_blocks, size), dtype=np.uint8)
+    payload = np.zeros(n_blocks * payload_size, dtype=np.uint8)
+    payload[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+    lengths = np.full(n_blocks, payload_size)
+    lengths[-1] = len(data) - (n_blocks - 1) * payload_size
+    header = np.zeros(n_blocks, dtype=[('seq', '>u4'), ('total', '>u4'), ('length', '>u2')])
+    header['seq'] = np.arange(first_seq, first_seq + n_blocks)
+    header['total'] = total
+    header['length'] = lengths
+    frames[:, :FRAME_HEADER.size] = header.view(np.uint8).reshape(n_blocks, FRAME_HEADER.size)
+    frames[:, FRAME_HEADER.size:size - CRC_SIZE] = payload.reshape(n_blocks, payload_size)
+    crcs = np.array([zlib.crc32(frame[:size - CRC_SIZE].tobytes()) for frame in frames], dtype='>u4')
+    frames[:, size - CRC_SIZE:] = crcs.view(np.uint8).reshape(n_blocks, CRC_SIZE)
+
+    # (ブロック数, 符号語数, 7) を (ブロック数, 7, 符号語数) に並べ替えて送る
+    codewords = hamming_encode(np.unpackbits(frames, axis=1)).reshape(n_blocks, size * 2, 7)
+    coded = np.zeros((n_blocks, coded_frame_size(payload_size) * 8), dtype=np.uint8)
+    coded[:, :size * 14] = codewords.transpose(0, 2, 1).reshape(n_blocks, -1)
+    return np.packbits(coded, axis=1).tobytes()
+
+
+def unframe_bytes(data: bytes, payload_size: int = FRAME_PAYLOAD_SIZE) -> FrameReport:
+    """
+    frame_bytes で符号化したバイト列をブロックごとに誤り訂正し、CRC32が合ったブロックだけを通し番号の位置に戻す。
+    CRCが合わないブロックや届かなかったブロック（全ブロック数から分かる）は failed に通し番号を入れる。
+    """
+    _check_payload_size(payload_size)
+    size = frame_size(payload_size)
+    coded_size = coded_frame_size(payload_size)
+    n_frames = len(data) // coded_size
+    if n_frames == 0:
+        return FrameReport(b'', 0, [], 0)
+    coded = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=n_frames * coded_size).reshape(n_frames, coded_size), axis=1)
+    codewords = coded[:, :size * 14].reshape(n_frames, 7, size * 2).transpose(0, 2, 1).reshape(-1, 7)
+    bits, corrected = hamming_decode(codewords)
+    frames = np.packbits(bits.reshape(n_frames, size * 8), axis=1)
+
+    header = frames[:, :FRAME_HEADER.size].copy().view([('seq', '>u4'), ('total', '>u4'), ('length', '>u2')]).reshape(-1)
+    crcs = frames[:, size - CRC_SIZE:].copy().view('>u4').reshape(-1)
+    good = np.array([zlib.crc32(frame[:size - CRC_SIZE].tobytes()) for frame in frames], dtype=np.uint32) == crcs
+    good &= (header['length'] <= payload_size) & (header['seq'] < header['total'])
+    # 全ブロック数は正しく届いたブロックの多数決で決める（1つも無ければ届いたフレーム数）
+    totals = header['total'][good]
+    total = int(np.bincount(totals).argmax()) if len(totals) > 0 else n_frames
+    good &= header['total'] == total
+
+    received = np.zeros(total, dtype=bool)
+    lengths = np.full(total, payload_size, dtype=np.int64)
+    out = np.zeros(total * payload_size, dtype=np.uint8).reshape(total, payload_size)
+    seqs = header['seq'][good].astype(np.intp)
+    received[seqs] = True
+    lengths[seqs] = header['length'][good]
+    out[seqs] = frames[good, FRAME_HEADER.size:size - CRC_SIZE]
+    n_bytes = (total - 1) * payload_size + int(lengths[-1]) if total > 0 else 0
+    return FrameReport(
+        data=out.reshape(-1)[:n_bytes].tobytes(),
+        n_blocks=total,
+        failed=np.flatnonzero(~received).tolist(),
+        corrected_bits=corrected,
+    )
+
+
+def iter_framed_file(filepath: str, payload_size: int = FRAME_PAYLOAD_SIZE, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    ファイルをおよそ block_size バイトずつ読み、frame_bytes で符号化したバイト列を順に返す。
+    全ブロック数はファイルサイズから先に決める。
+    """
+    _check_payload_size(payload_size)
+    total = count_blocks(os.path.getsize(filepath), payload_size)
+    read_size = max(1, block_size // payload_size) * payload_size
+    seq = 0
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(read_size)
+            if not block:
+                break
+            yield frame_bytes(block, payload_size, seq, total)
+            seq += count_blocks(len(block), payload_size)
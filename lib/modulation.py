@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from functools import cached_property
+import numpy as np
+
+# 周波数分割多重（FDM）で隣り合うチャンネルの帯域の間に空ける余白（Hz）
+CHANNEL_GUARD = 500.0
+
+
+@dataclass(frozen=True)
+class Modulation:
+    """
+    M値FSKの変調方式。1シンボルで log2(len(tones)) ビットを送る。
+    ビットのまとまりはグレイ符号でトーンに割り当てるので、隣のトーンと取り違えても誤りは1ビットで済む。
+
+    :param name: 変調方式の名前（config.tomlやCLIで指定する値）
+    :param tones: 各シンボルのトーン周波数（Hz、昇順）
+    :param band: FFT検出でピークを探す周波数範囲（Hz）
+    :param max_symbol_rate: 確実にデコードできるシンボルレートの上限（1シンボルの長さが短いとスペクトルが広がり、
+                            隣のトーンと区別できなくなる。位相連続なしの fft と goertzel の両方で、ノイズなしで誤りが出ない範囲を実測した値）
+    :param max_fdm_symbol_rate: FDM（2チャンネル以上）でのシンボルレートの上限（隣のチャンネルへのスペクトルの漏れ込みで、
+                                1チャンネルより低くなる。使えるすべてのチャンネル数・サンプリングレートで、位相連続の有無と
+                                fft / goertzel のどちらでも、ノイズなしで誤りが出ない範囲を実測した値）
+    """
+    name: str
+    tones: tuple[float, ...]
+    band: tuple[float, float]
+    max_symbol_rate: float
+    max_fdm_symbol_rate: float
+
+    @property
+    def bits_per_symbol(self) -> int:
+        return int(len(self.tones)).bit_length() - 1
+
+    @cached_property
+    def tone_freqs(self) -> np.ndarray:
+        """トーン周波数のfloat64配列"""
+        return np.array(self.tones, dtype=np.float64)
+
+    @cached_property
+    def _gray(self) -> np.ndarray:
+        """トーン番号 → そのトーンが表すビットの値（グレイ符号）"""
+        index = np.arange(len(self.tones), dtype=np.uint8)
+        return index ^ (index >> 1)
+
+    @cached_property
+    def _inverse_gray(self) -> np.ndarray:
+        """ビットの値 → トーン番号"""
+        inverse = np.empty(len(self.tones), dtype=np.uint8)
+        inverse[self._gray] = np.arange(len(self.tones), dtype=np.uint8)
+        return inverse
+
+    @property
+    def channel_spacing(self) -> float:
+        """FDMで隣のチャンネルへずらす周波数（帯域幅 + 余白）"""
+        return self.band[1] - self.band[0] + CHANNEL_GUARD
+
+    def channel_tones(self, channels: int) -> np.ndarray:
+        """
+        FDMの各チャンネルのトーン周波数。チャンネル c は全トーンを c * channel_spacing だけ高い方へずらす。
+
+        :return: shape (channels, トーン数) のfloat64配列
+        """
+        offsets = np.arange(channels, dtype=np.float64) * self.channel_spacing
+        return self.tone_freqs[None, :] + offsets[:, None]
+
+    def channel_band(self, channel: int) -> tuple[float, float]:
+        """チャンネル channel でFFT検出がピークを探す周波数範囲"""
+        offset = channel * self.channel_spacing
+        return self.band[0] + offset, self.band[1] + offset
+
+    def max_channels(self, sample_rate: int) -> int:
+        """ナイキスト周波数（sample_rate / 2）に収まるチャンネル数"""
+        return max(0, int((sample_rate / 2 - self.band[1]) // self.channel_spacing) + 1)
+
+    def check_channels(self, channels: int, sample_rate: int) -> None:
+        """チャンネル数がこのサンプリングレートで使えなければ ValueError"""
+        limit = self.max_channels(sample_rate)
+        if not (1 <= channels <= limit):
+            raise ValueError(f"{self.name} のチャンネル数は {sample_rate}Hz では1〜{limit}で指定してください（指定値: {channels}）")
+
+    def check_symbol_rate(self, symbol_rate: float, channels: int = 1) -> None:
+        """シンボルレート（ビットレート設定）がこの変調方式・チャンネル数で確実にデコードできなければ ValueError"""
+        if symbol_rate > self.max_symbol_rate:
+            raise ValueError(
+                f"{self.name} のトーン間隔ではシンボルレート {symbol_rate:g} はデコードできません（{self.max_symbol_rate:g} 以下で指定してください）"
+            )
+        if channels > 1 and symbol_rate > self.max_fdm_symbol_rate:
+            raise ValueError(
+                f"{self.name} のFDM（{channels}チャンネル）ではシンボルレート {symbol_rate:g} はデコードできません"
+                f"（{self.max_fdm_symbol_rate:g} 以下にするか、チャンネル数を1にしてください）"
+            )
+
+    def n_symbols(self, n_bits: int) -> int:
+        """n_bits ビットを送るのに必要なシンボル数"""
+        k = self.bits_per_symbol
+        return (n_bits + k - 1) // k
+
+    def bits_to_symbols(self, bits: np.ndarray) -> np.ndarray:
+        """
+        0/1のビット配列を bits_per_symbol ビットずつ（MSBファースト）トーン番号の配列にする。
+        端数のビットは0で埋める。
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        k = self.bits_per_symbol
+        if k == 1:
+            return bits
+        padded = np.zeros(self.n_symbols(len(bits)) * k, dtype=np.uint8)
+        padded[:len(bits)] = bits
+        weights = (1 << np.arange(k - 1, -1, -1)).astype(np.uint8)
+        return self._inverse_gray[padded.reshape(-1, k) @ weights]
+
+    def symbols_to_bits(self, symbols: np.ndarray) -> np.ndarray:
+        """トーン番号の配列を0/1のビット配列に戻す（長さ = シンボル数 * bits_per_symbol）"""
+        symbols = np.asarray(symbols, dtype=np.uint8)
+        k = self.bits_per_symbol
+        if k == 1:
+            return symbols
+        shifts = np.arange(k - 1, -1, -1, dtype=np.uint8)
+        return ((self._gray[symbols][:, None] >> shifts) & 1).reshape(-1)
+
+
+# 変調方式の一覧（名前 → Modulation）
+# bfskは従来どおりBell 202の2トーン。4fsk/8fskはトーンを400Hz間隔で並べ、
+# 8fskも8000Hzサンプリングのナイキスト周波数（4000Hz）に収まるようにする。
+# bfskの4800は0と1が交互に続くときの側波帯（中心1700Hz ± 2400Hz）が0Hzをまたいで折り返し、
+# どの検出方式でもビット誤り率が5割近くになるので2400までとする。
+# 400Hz間隔では1200シンボル/秒になると fft で誤りが出るので、4fsk/8fskは600までとする。
+# FDMでは隣のチャンネルのトーンが1シンボルの中で直交しないため、シンボルが短いと漏れ込みで誤る。
+# bfskの1200では fft が5チャンネル以上で、位相連続では goertzel でも3チャンネル以上で誤るので600まで、
+# 4fskの600では fft が4チャンネル以上で誤るので、4fsk/8fskは300までとする
+MODULATIONS = {
+    "bfsk": Modulation("bfsk", (1200.0, 2200.0), (1000.0, 2500.0), 2400.0, 600.0),
+    "4fsk": Modulation("4fsk", (1200.0, 1600.0, 2000.0, 2400.0), (1000.0, 2600.0), 600.0, 300.0),
+    "8fsk": Modulation("8fsk", (600.0, 1000.0, 1400.0, 1800.0, 2200.0, 2600.0, 3000.0, 3400.0), (400.0, 3600.0), 600.0, 300.0),
+}
+DEFAULT_MODULATION = "bfsk"
+
+
+def get_modulation(name: str) -> Modulation:
+    """名前から変調方式を返す（未対応の名前なら ValueError）"""
+    try:
+        return MODULATIONS[name]
+    except KeyError:
+        raise ValueError(f"未対応の変調方式です: {name}（{', '.join(MODULATIONS)} のいずれか）") from None
@@ -1,106 +1,205 @@
-import wave
+import argparse
+import math
+import os
 import numpy as np
 import sys
 import shutil
-import random
+from typing import Iterable, Iterator, Optional
+from lib.profiling import add_profile_arguments, finish_profile, profiler_from_args
+from lib.utils import flush_samples, is_mapped_format, read_wav_header, read_wav_with_info, write_wav
 
-# ノイズ生成関数
+NOISE_CHUNK = 1 << 16  # 一度に処理するサンプル数（作業バッファの長さ）
 
-def add_noise(samples: np.ndarray, sample_rate: int, noise_level: int) -> np.ndarray:
+
+class _NoiseEngine:
+    """
+    ノイズ付加の状態（乱数・開始位置）を保持し、チャンクごとに処理する。
+    作業バッファはfloat32のチャンク長ぶんだけを使い回す。
+    ハム・バンドノイズは1周期分のテーブルを引くので、チャンクをまたいでも位相が連続する。
+    """
+
+    def __init__(self, sample_rate: int, noise_level: int, seed: Optional[int] = None, chunk_size: int = NOISE_CHUNK) -> None:
+        self.noise_level = noise_level
+        self.rng = np.random.default_rng(seed)
+        self.chunk_size = chunk_size
+        self.offset = 0  # これまでに処理したサンプル数
+
+        # ホワイトノイズ
+        if noise_level == 8:
+            self.white_sigma = 25000.0
+        elif noise_level == 7:
+            self.white_sigma = 12000.0
+        else:
+            self.white_sigma = 200.0 * noise_level
+
+        # ハムノイズ
+        hum_freq = 50 if self.rng.random() < 0.5 else 60
+        if noise_level == 8:
+            hum_amp = 20000.0
+        elif noise_level == 7:
+            hum_amp = 10000.0
+        else:
+            hum_amp = 400.0 * noise_level
+
+        # バンドノイズ（FSK信号帯域）
+        if noise_level == 8:
+            band_amp, band_freqs = 12000.0, range(200, 401, 20)
+        elif noise_level == 7:
+            band_amp, band_freqs = 6000.0, range(200, 401, 40)
+        else:
+            band_amp, band_freqs = 0.0, range(0)
+
+        # ハム＋バンドノイズは整数Hzの正弦波の和なので、周期 sample_rate / gcd(sample_rate, 各周波数) で繰り返す
+        freq_gcd = math.gcd(hum_freq, *band_freqs)
+        self.period = sample_rate // math.gcd(sample_rate, freq_gcd)
+        t = np.arange(self.period) / sample_rate
+        tonal = hum_amp * np.sin(2 * np.pi * hum_freq * t)
+        for freq in band_freqs:
+            tonal += band_amp * np.sin(2 * np.pi * freq * t + self.rng.random()*2*np.pi)
+        self.tonal = tonal.astype(np.float32)
+
+        # パルスノイズ（サンプル数あたりの発生率と振幅）
+        if noise_level == 8:
+            self.pulse_rate, pulse_amp = 0.01, 32000
+        elif noise_level == 7:
+            self.pulse_rate, pulse_amp = 0.005, 20000
+        elif noise_level >= 3:
+            self.pulse_rate = 0.0003 * noise_level * (1 + (noise_level-5)*0.5 if noise_level > 5 else 1)
+            pulse_amp = 6000 * noise_level
+        else:
+            self.pulse_rate, pulse_amp = 0.0, 0
+        self.pulse_amp = float(min(pulse_amp, 32767))
+
+        # 作業バッファ（float32の累積用と一時用、インデックス用）
+        self.acc = np.empty(chunk_size, dtype=np.float32)
+        self.tmp = np.empty(chunk_size, dtype=np.float32)
+        self.ramp = np.arange(chunk_size, dtype=np.int64)
+        self.index = np.empty(chunk_size, dtype=np.int64)
+
+    def process(self, src: np.ndarray, dst: np.ndarray) -> None:
+        """src にノイズを加えて dst（int16）へ書き込む。src と dst は同じ配列でもよい。"""
+        for start in range(0, len(src), self.chunk_size):
+            n = min(self.chunk_size, len(src) - start)
+            self._process_chunk(src[start:start + n], dst[start:start + n])
+
+    def _process_chunk(self, src: np.ndarray, dst: np.ndarray) -> None:
+        n = len(src)
+        acc, tmp, index = self.acc[:n], self.tmp[:n], self.index[:n]
+        np.copyto(acc, src, casting='unsafe')
+
+        self.rng.standard_normal(out=tmp, dtype=np.float32)
+        tmp *= self.white_sigma
+        acc += tmp
+
+        np.add(self.ramp[:n], self.offset % self.period, out=index)
+        np.remainder(index, self.period, out=index)
+        np.take(self.tonal, index, out=tmp)
+        acc += tmp
+
+        # 累積位置で切り捨てるので、チャンク分割しても総パルス数は全体で一括処理した場合と同じ
+        num_pulses = int((self.offset + n) * self.pulse_rate) - int(self.offset * self.pulse_rate)
+        if num_pulses > 0:
+            idx = self.rng.integers(0, n, num_pulses)
+            signs = self.rng.integers(0, 2, num_pulses).astype(np.float32) * 2 - 1
+            acc[idx] += signs * self.pulse_amp
+
+        np.clip(acc, -32768, 32767, out=acc)
+        np.copyto(dst, acc, casting='unsafe')
+        self.offset += n
+
+
+def add_noise(
+    samples: np.ndarray,
+    sample_rate: int,
+    noise_level: int,
+    seed: Optional[int] = None,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     サンプル配列にノイズを加える。
     noise_level: 0(無し)〜8(8=徹底的に酷い)
+
+    :param seed: 乱数シード（Noneなら毎回異なるノイズ）
+    :param out: 結果を書き込むint16配列（samples自身を渡せばその場で上書き）
     """
     if noise_level == 0:
+        if out is not None and out is not samples:
+            out[:] = samples
+            return out
         return samples
 
-    # ホワイトノイズ
-    if noise_level == 8:
-        white_noise = np.random.normal(0, 25000, samples.shape)
-    elif noise_level == 7:
-        white_noise = np.random.normal(0, 12000, samples.shape)
-    else:
-        white_noise = np.random.normal(0, 200 * noise_level, samples.shape)
-
-    # ハムノイズ
-    hum_freq = 50 if random.random() < 0.5 else 60
-    t = np.arange(len(samples)) / sample_rate
-    if noise_level == 8:
-        hum_noise = 20000 * np.sin(2 * np.pi * hum_freq * t)
-    elif noise_level == 7:
-        hum_noise = 10000 * np.sin(2 * np.pi * hum_freq * t)
-    else:
-        hum_noise = 400 * noise_level * np.sin(2 * np.pi * hum_freq * t)
-
-    # パルスノイズ
-    pulse_noise = np.zeros_like(samples)
-    if noise_level >= 3:
-        if noise_level == 8:
-            num_pulses = int(len(samples) * 0.01)
-            amp = 32000
-        elif noise_level == 7:
-            num_pulses = int(len(samples) * 0.005)
-            amp = 20000
-        else:
-            num_pulses = int(len(samples) * 0.0003 * noise_level * (1 + (noise_level-5)*0.5 if noise_level > 5 else 1))
-            amp = 6000 * noise_level * (2 if noise_level >= 7 else 1)
-        for _ in range(num_pulses):
-            idx = random.randint(0, len(samples) - 1)
-            val = random.choice([-1, 1]) * amp
-            val = int(np.clip(val, -32768, 32767))
-            pulse_noise[idx] = val
-
-    # バンドノイズ（FSK信号帯域）
-    band_noise = np.zeros_like(samples, dtype=np.float64)
-    if noise_level == 8:
-        for freq in range(200, 401, 20):
-            band_noise += 12000 * np.sin(2 * np.pi * freq * t + np.random.rand()*2*np.pi)
-    elif noise_level == 7:
-        for freq in range(200, 401, 40):
-            band_noise += 6000 * np.sin(2 * np.pi * freq * t + np.random.rand()*2*np.pi)
-
-    if noise_level >= 7:
-        noisy = samples + white_noise + hum_noise + pulse_noise + band_noise
-    else:
-        noisy = samples + white_noise + hum_noise + pulse_noise
-    noisy = np.clip(noisy, -32768, 32767)
-    return noisy.astype(np.int16)
+    if out is None:
+        out = np.empty(len(samples), dtype=np.int16)
+    chunk_size = min(NOISE_CHUNK, max(len(samples), 1))
+    _NoiseEngine(sample_rate, noise_level, seed, chunk_size).process(samples, out)
+    return out
 
 
-def main() -> None:
-    if len(sys.argv) != 3:
-        print("使い方: python3 noise.py <wavファイル> <ノイズレベル(0-5)>")
-        sys.exit(1)
+def iter_add_noise(
+    chunks: Iterable[np.ndarray],
+    sample_rate: int,
+    noise_level: int,
+    seed: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """
+    チャンク列にノイズを加えて順に返す。ハム・バンドノイズの位相はチャンク間で連続する。
+    """
+    engine = _NoiseEngine(sample_rate, noise_level, seed)
+    for chunk in chunks:
+        if noise_level == 0:
+            yield chunk
+            continue
+        noisy = np.empty(len(chunk), dtype=np.int16)
+        engine.process(chunk, noisy)
+        yield noisy
+
 
-    wav_path = sys.argv[1]
-    noise_level = int(sys.argv[2])
+def main() -> None:
+    parser = argparse.ArgumentParser(description="WAVファイルにノイズを加えて上書きする（元ファイルは *_orig.wav にバックアップ）")
+    parser.add_argument('wav_path', help='ノイズを加えるWAVファイル')
+    parser.add_argument('noise_level', type=int, help='ノイズレベル(0-5)')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+
+    wav_path = args.wav_path
+    noise_level = args.noise_level
     if not (0 <= noise_level <= 5):
         print("ノイズレベルは0〜5で指定してください")
         sys.exit(1)
 
     # バックアップ作成
     backup_path = wav_path.rsplit('.', 1)[0] + "_orig.wav"
-    shutil.copy2(wav_path, backup_path)
+    with profiler.stage("backup", n_bytes=os.path.getsize(wav_path)):
+        shutil.copy2(wav_path, backup_path)
     print(f"バックアップ作成: {backup_path}")
 
     if noise_level == 0:
         print("ノイズレベル0のため、ファイルは変更しません。")
+        finish_profile(profiler, args)
         return
 
-    # WAV読み込み
-    with wave.open(wav_path, 'rb') as wf:
-        params = wf.getparams()
-        frames = wf.readframes(wf.getnframes())
-        samples = np.frombuffer(frames, dtype=np.int16)
-
-    # ノイズ付加
-    noisy_samples = add_noise(samples, params.framerate, noise_level)
-
-    # WAV書き込み（上書き）
-    with wave.open(wav_path, 'wb') as wf:
-        wf.setparams(params)
-        wf.writeframes(noisy_samples.tobytes())
+    # WAVを書き込み可能なメモリマップで開き（サンプリングレートはヘッダから取得）、
+    # チャンクごとにその場でノイズを加えて上書きする
+    with profiler.stage("add_noise") as stage:
+        info = read_wav_header(wav_path)
+        if is_mapped_format(info):
+            samples, info = read_wav_with_info(wav_path, writable=True)
+            add_noise(samples, info.sample_rate, noise_level, out=samples)
+            flush_samples(samples)
+        elif info.n_channels == 1:
+            # 8ビットとfloat32はその場で書き換えられないので、int16相当に変換してノイズを加え、同じ形式で書き直す
+            samples, info = read_wav_with_info(wav_path)
+            samples = add_noise(samples, info.sample_rate, noise_level)
+            write_wav(wav_path, samples, info.sample_rate, "pcm8" if info.sample_width == 1 else "float32")
+        else:
+            print("8ビット・float32の複数チャンネルのWAVには対応していません")
+            sys.exit(1)
+        stage.n_samples = len(samples)
+        stage.n_bytes = samples.nbytes
+        del samples
     print(f"ノイズを加えたファイルを保存しました: {wav_path}")
+    finish_profile(profiler, args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+from lib.modulation import DEFAULT_MODULATION, Modulation, get_modulation
+from lib.utils import load_config_toml
+import os
+
+DEFAULT_CONFIG_PATH = "config.toml"
+
+
+@dataclass(frozen=True)
+class ModemParams:
+    """
+    変調パラメータ一式。変更できないので、スレッド間で共有しても安全。
+    値を変えたいときは with_overrides で新しいオブジェクトを作る。
+
+    :param bitrate: 1秒間に何シンボル送るか（bfskではビットレートそのもの。M値FSKでは1シンボルで複数ビットを送る）
+    :param sample_rate: サンプリングレート
+    :param noise_level: エンコード時に加えるノイズの強さ
+    :param continuous_phase: Trueなら位相連続FSK（ビット境界で位相をリセットせず、端数のサンプルも繰り越す）
+    :param modulation: 変調方式（"bfsk", "4fsk", "8fsk"）
+    :param channels: 周波数分割多重（FDM）で同時に送るチャンネル数（1なら従来の単一キャリア）
+    """
+    bitrate: int = 300
+    sample_rate: int = 8000
+    noise_level: int = 0
+    continuous_phase: bool = False
+    modulation: str = DEFAULT_MODULATION
+    channels: int = 1
+
+    @property
+    def duration(self) -> float:
+        """1ビットあたりの秒数"""
+        return 1.0 / self.bitrate
+
+    @property
+    def samples_per_tone(self) -> int:
+        """1ビットあたりのサンプル数（整数に切り捨て）"""
+        return int(self.sample_rate * self.duration)
+
+    def samples_per_bit(self, duration: Optional[float] = None) -> float:
+        """
+        1ビットあたりのサンプル数。位相連続モードでは端数を切り捨てない（例: 44100Hz/1200bps = 36.75）。
+
+        :param duration: 各音の長さ（秒、省略時は 1 / bitrate）
+        """
+        if duration is None:
+            duration = self.duration
+        spb = self.sample_rate * duration
+        return spb if self.continuous_phase else int(spb)
+
+    @property
+    def scheme(self) -> Modulation:
+        """変調方式（未対応の名前なら ValueError）"""
+        return get_modulation(self.modulation)
+
+    @classmethod
+    def from_config(cls, config_path: str = DEFAULT_CONFIG_PATH) -> "ModemParams":
+        """
+        config.tomlから作る（読み込み結果はファイルの更新時刻でキャッシュされる）。
+        ファイルが無ければ既定値を使う。
+        """
+        if not os.path.exists(config_path):
+            return cls()
+        config = load_config_toml(config_path)
+        return cls(
+            bitrate=int(config.get("BITRATE", cls.bitrate)),
+            sample_rate=int(config.get("SAMPLE_RATE", cls.sample_rate)),
+            noise_level=int(config.get("NOISE_LEVEL", cls.noise_level)),
+            continuous_phase=bool(config.get("CONTINUOUS_PHASE", cls.continuous_phase)),
+            modulation=str(config.get("MODULATION", cls.modulation)),
+            channels=int(config.get("CHANNELS", cls.channels)),
+        )
+
+    def validate(self) -> None:
+        """この組み合わせでデコードできなければ ValueError（未対応の変調方式、速すぎるシンボルレート、収まらないチャンネル数）"""
+        scheme = self.scheme
+        scheme.check_symbol_rate(self.bitrate, self.channels)
+        scheme.check_channels(self.channels, self.sample_rate)
+
+    def with_overrides(self, **overrides: Optional[Any]) -> "ModemParams":
+        """Noneでない値だけを差し替えた新しいパラメータを返す"""
+        values = {k: v for k, v in overrides.items() if v is not None}
+        return replace(self, **values) if values else self
+
+    def to_config(self) -> Dict[str, Any]:
+        """config.tomlのキー名のdictにする（set_config_valuesにそのまま渡せる）"""
+        return {
+            "BITRATE": self.bitrate,
+            "SAMPLE_RATE": self.sample_rate,
+            "NOISE_LEVEL": self.noise_level,
+            "CONTINUOUS_PHASE": self.continuous_phase,
+            "MODULATION": self.modulation,
+            "CHANNELS": self.channels,
+        }
+
+
+def resolve_params(params: Optional[ModemParams] = None, **overrides: Optional[Any]) -> ModemParams:
+    """
+    引数で明示された値 > params > config.toml の優先順でパラメータを決める。
+    デコードできない組み合わせ（ModemParams.validate）なら ValueError。
+
+    :param params: 呼び出し側が渡したパラメータ（省略時はconfig.tomlから読む）
+    :param overrides: 個別に指定された値（Noneは未指定扱い）
+    """
+    if params is None:
+        params = ModemParams.from_config()
+    params = params.with_overrides(**overrides)
+    params.validate()
+    return params
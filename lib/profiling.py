@@ -0,0 +1,126 @@
+import argparse
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional
+
+
+@dataclass
+class StageRecord:
+    """1ステージ分の計測結果"""
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    n_bytes: int = 0  # 処理したバイト数（呼び出し側が設定）
+    n_samples: int = 0  # 処理したサンプル数（呼び出し側が設定）
+    peak_bytes: Optional[int] = None  # tracemallocで測ったピーク確保量
+
+
+class Profiler:
+    """
+    パイプラインの各ステージ（エンコード、WAV読み書き、ノイズ付加、デコード、MD5など）の
+    経過時間・CPU時間・処理量・ピークメモリを記録する。
+
+    :param enabled: Falseなら何も計測しない
+    :param trace_memory: Trueならtracemallocでステージごとのピーク確保量を測る
+    :param cprofile_stage: このステージ名だけcProfileで詳細プロファイルを取る
+    :param cprofile_path: cProfileの結果（pstats形式）の保存先
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        trace_memory: bool = True,
+        cprofile_stage: Optional[str] = None,
+        cprofile_path: Optional[str] = None
+    ) -> None:
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_path = cprofile_path
+        self.records: list[StageRecord] = []
+
+    @contextmanager
+    def stage(self, name: str, n_bytes: int = 0, n_samples: int = 0) -> Iterator[StageRecord]:
+        """
+        with ブロックの処理を1ステージとして計測する。
+        処理量が後から分かる場合は、yieldされたレコードの n_bytes / n_samples を書き換える。
+        """
+        record = StageRecord(name, n_bytes=n_bytes, n_samples=n_samples)
+        if not self.enabled:
+            yield record
+            return
+
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        profile = cProfile.Profile() if name == self.cprofile_stage else None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record.wall_s = time.perf_counter() - wall_start
+            record.cpu_s = time.process_time() - cpu_start
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record.peak_bytes = max(peak - base, 0)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profile is not None:
+                path = self.cprofile_path or f"{name}.prof"
+                profile.dump_stats(path)
+                print(f"[PROFILE] {name} のcProfile結果を保存しました: {path}")
+            self.records.append(record)
+
+    def report(self) -> str:
+        """記録したステージを表形式の文字列にする"""
+        lines = [f"{'stage':<12}{'wall ms':>10}{'cpu ms':>10}{'bytes':>12}{'samples':>12}{'peak MB':>9}"]
+        for r in self.records:
+            peak = "" if r.peak_bytes is None else f"{r.peak_bytes / 1e6:.2f}"
+            lines.append(
+                f"{r.name:<12}{r.wall_s * 1000:>10.1f}{r.cpu_s * 1000:>10.1f}{r.n_bytes:>12}{r.n_samples:>12}{peak:>9}"
+            )
+        total = sum(r.wall_s for r in self.records)
+        lines.append(f"{'total':<12}{total * 1000:>10.1f}")
+        return "\n".join(lines)
+
+    def write_json(self, path: str) -> None:
+        """記録したステージをJSONのトレースファイルに書き出す"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stages": [asdict(r) for r in self.records]}, f, ensure_ascii=False, indent=2)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """CLIにプロファイル関連のオプションを追加する"""
+    parser.add_argument('--profile', action='store_true', help='ステージごとの処理時間・メモリを表示する')
+    parser.add_argument('--profile-json', type=str, help='ステージごとの計測結果をJSONで書き出すパス')
+    parser.add_argument('--cprofile', type=str, metavar='STAGE', help='指定したステージだけcProfileを取る')
+    parser.add_argument('--cprofile-out', type=str, help='cProfileの結果の保存先（省略時は <STAGE>.prof）')
+
+
+def profiler_from_args(args: argparse.Namespace) -> Profiler:
+    """add_profile_argumentsで追加したオプションからProfilerを作る"""
+    enabled = bool(args.profile or args.profile_json or args.cprofile)
+    return Profiler(enabled=enabled, cprofile_stage=args.cprofile, cprofile_path=args.cprofile_out)
+
+
+def finish_profile(profiler: Profiler, args: argparse.Namespace) -> None:
+    """オプションに応じて計測結果を表示・保存する"""
+    if args.profile:
+        print(profiler.report())
+    if args.profile_json:
+        profiler.write_json(args.profile_json)
+        print(f"[PROFILE] 計測結果を書き出しました: {args.profile_json}")
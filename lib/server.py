@@ -0,0 +1,292 @@
+from lib.compression import compress_payload, decompress_payload, is_compressed
+from lib.decode import DETECTOR_NAMES, decode_samples
+from lib.encode import encode_samples
+from lib.framing import frame_bytes, unframe_bytes
+from lib.noise import add_noise
+from lib.params import ModemParams
+from lib.utils import (
+    DEFAULT_SAMPLE_FORMAT, bits_to_bytes, get_sample_format, iter_wav_bytes, read_wav_bytes, validate_noise_level, wav_size
+)
+import argparse
+import json
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_HOST = "127.0.0.1"  # ローカルからの接続だけを受け付ける
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 256 * 1024 * 1024  # 1リクエストで受け付ける本文の上限
+RECV_CHUNK = 1 << 20  # 本文を読み込む単位
+
+
+class Response:
+    """ハンドラの戻り値（本文はチャンク列で返し、全体を1つのbytesに連結しない）"""
+
+    def __init__(self, content_type: str, length: int, chunks: Iterable[Any], headers: Optional[dict[str, str]] = None) -> None:
+        self.content_type = content_type
+        self.length = length
+        self.chunks = chunks
+        self.headers = headers or {}
+
+
+def _query_int(query: dict[str, list[str]], name: str) -> Optional[int]:
+    if name not in query:
+        return None
+    try:
+        return int(query[name][-1])
+    except ValueError:
+        raise ValueError(f"{name} は整数で指定してください") from None
+
+
+def _query_flag(query: dict[str, list[str]], name: str) -> bool:
+    return query.get(name, ["0"])[-1].lower() in ("1", "true", "yes")
+
+
+def _request_params(
+    server: "ModemServer",
+    query: dict[str, list[str]],
+    sample_rate: Optional[int] = None
+) -> ModemParams:
+    """
+    サーバー起動時のパラメータを、クエリで指定された値で上書きする。
+
+    :param sample_rate: クエリより優先するサンプリングレート（デコードではWAVヘッダの値）
+    """
+    params = server.params.with_overrides(
+        bitrate=_query_int(query, "bitrate"),
+        sample_rate=sample_rate if sample_rate is not None else _query_int(query, "sample_rate"),
+        noise_level=_query_int(query, "noise_level"),
+        continuous_phase=True if _query_flag(query, "continuous_phase") else None,
+        modulation=query.get("modulation", [None])[-1],
+        channels=_query_int(query, "channels"),
+    )
+    if params.bitrate <= 0 or params.sample_rate <= 0:
+        raise ValueError("bitrate と sample_rate は正の整数で指定してください")
+    # 未対応の変調方式やシンボルレート・チャンネル数ならここで ValueError（400）にする
+    params.validate()
+    return params
+
+
+def _wav_response(samples: np.ndarray, sample_rate: int, query: dict[str, list[str]]) -> Response:
+    """クエリの format（pcm16/pcm8/float32/raw）で音声を返す"""
+    output_format = query.get("format", [DEFAULT_SAMPLE_FORMAT])[-1]
+    content_type = "audio/wav" if get_sample_format(output_format).header else "application/octet-stream"
+    return Response(
+        content_type, wav_size(len(samples), output_format), iter_wav_bytes(samples, sample_rate, output_format),
+        {"X-Sample-Rate": str(sample_rate)}
+    )
+
+
+def _read_body_wav(body: memoryview, query: dict[str, list[str]]) -> tuple[np.ndarray, Any]:
+    """本文のWAV（8/16/24/32ビット、float32、複数チャンネル）からクエリの channel のサンプルを取り出す"""
+    channel = _query_int(query, "channel")
+    return read_wav_bytes(body, channel=channel or 0)
+
+
+def handle_encode(server: "ModemServer", body: memoryview, query: dict[str, list[str]]) -> Response:
+    """
+    本文のバイト列をFSK音声にして、WAVで返す。
+    compress=1 で変調前に圧縮し、framing=ブロックのバイト数 でCRC32・FEC付きのフレームにする。
+    """
+    params = _request_params(server, query)
+    validate_noise_level(params.noise_level)
+    data = compress_payload(bytes(body)).data if _query_flag(query, "compress") else body
+    framing = _query_int(query, "framing")
+    if framing:
+        data = frame_bytes(bytes(data), framing)
+    samples = encode_samples(bytes(data), params=params, preamble=_query_flag(query, "preamble"))
+    return _wav_response(samples, params.sample_rate, query)
+
+
+def handle_noise(server: "ModemServer", body: memoryview, query: dict[str, list[str]]) -> Response:
+    """本文のWAVにノイズを加えて、WAVで返す（サンプリングレートはWAVヘッダの値）"""
+    noise_level = _query_int(query, "noise_level")
+    if noise_level is None:
+        noise_level = server.params.noise_level
+    if not (0 <= noise_level <= 8):
+        raise ValueError("noise_level は0〜8で指定してください")
+    samples, info = _read_body_wav(body, query)
+    noisy = add_noise(samples, info.sample_rate, noise_level, seed=_query_int(query, "seed"))
+    return _wav_response(noisy, info.sample_rate, query)
+
+
+def handle_decode(server: "ModemServer", body: memoryview, query: dict[str, list[str]]) -> Response:
+    """
+    本文のWAVからバイト列を復元して返す（サンプリングレートはWAVヘッダの値）。
+    framing を指定するとフレームを外し、失敗したブロックの通し番号を X-Failed-Blocks ヘッダで返す。
+    圧縮されたデータ（encode の compress=1）は自動で展開する（展開できなければ X-Decompress-Error を付けてそのまま返す）。
+    """
+    detector = query.get("detector", ["fft"])[-1]
+    if detector not in DETECTOR_NAMES:
+        raise ValueError(f"detector は {', '.join(DETECTOR_NAMES)} のいずれかで指定してください")
+    samples, info = _read_body_wav(body, query)
+    params = _request_params(server, query, sample_rate=info.sample_rate)
+    bits = decode_samples(samples, detector=detector, params=params, sync=_query_flag(query, "sync"))
+    data = bits_to_bytes(bits)
+    headers = {"X-Bit-Count": str(len(bits))}
+    framing = _query_int(query, "framing")
+    if framing:
+        report = unframe_bytes(data, framing)
+        data = report.data
+        headers["X-Block-Count"] = str(report.n_blocks)
+        headers["X-Failed-Blocks"] = ",".join(str(seq) for seq in report.failed)
+        headers["X-Corrected-Bits"] = str(report.corrected_bits)
+    if is_compressed(data):
+        try:
+            data = decompress_payload(data)
+        except ValueError:
+            # ヘッダはlatin-1しか使えないので、理由は付けずに印だけ返す
+            headers["X-Decompress-Error"] = "1"
+    return Response("application/octet-stream", len(data), [data], headers)
+
+
+ROUTES: dict[str, Callable[["ModemServer", memoryview, dict[str, list[str]]], Response]] = {
+    "/encode": handle_encode,
+    "/noise": handle_noise,
+    "/decode": handle_decode,
+}
+
+
+class ModemRequestHandler(BaseHTTPRequestHandler):
+    """POST /encode, /noise, /decode と GET /health を処理する"""
+    protocol_version = "HTTP/1.1"  # keep-aliveで接続を使い回せるようにする
+    disable_nagle_algorithm = True  # 小さなリクエストの往復で遅延が入らないようにする
+    timeout = 30  # 無通信の接続がワーカーを占有し続けないよう切断するまでの秒数
+    server: "ModemServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, response: Response) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", str(response.length))
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        for chunk in response.chunks:
+            self.wfile.write(chunk)
+
+    def _send_error(self, status: int, message: str) -> None:
+        body = message.encode("utf-8")
+        self._send(status, Response("text/plain; charset=utf-8", len(body), [body]))
+
+    def _read_body(self) -> Optional[memoryview]:
+        """Content-Length分の本文を、事前に確保したバッファへ直接読み込む"""
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self._send_error(411, "Content-Length が必要です")
+            return None
+        if length < 0 or length > MAX_BODY_BYTES:
+            self._send_error(413, f"本文が大きすぎます（上限 {MAX_BODY_BYTES} バイト）")
+            self.close_connection = True
+            return None
+        buffer = bytearray(length)
+        view = memoryview(buffer)
+        received = 0
+        while received < length:
+            n = self.rfile.readinto(view[received:received + RECV_CHUNK])
+            if not n:
+                self.close_connection = True
+                return None
+            received += n
+        return view
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path != "/health":
+            self._send_error(404, f"不明なパスです: {self.path}")
+            return
+        params = self.server.params
+        body = json.dumps({
+            "status": "ok",
+            "bitrate": params.bitrate,
+            "sample_rate": params.sample_rate,
+            "noise_level": params.noise_level,
+            "continuous_phase": params.continuous_phase,
+            "modulation": params.modulation,
+            "channels": params.channels,
+            "workers": self.server.workers,
+        }).encode("utf-8")
+        self._send(200, Response("application/json", len(body), [body]))
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        handler = ROUTES.get(url.path)
+        body = self._read_body()
+        if body is None:
+            return
+        if handler is None:
+            self._send_error(404, f"不明なパスです: {url.path}")
+            return
+        try:
+            response = handler(self.server, body, parse_qs(url.query))
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        except Exception as e:
+            self._send_error(500, f"{type(e).__name__}: {e}")
+            return
+        self._send(200, response)
+
+
+class ModemServer(HTTPServer):
+    """
+    モデム（NumPyと設定）を読み込んだまま常駐し、接続をワーカースレッドのプールで並列に処理するHTTPサーバー。
+    重い計算はNumPy内でGILを解放するので、スレッドでも複数リクエストが同時に進む。
+
+    :param address: 待ち受けるホストとポート
+    :param params: クエリで指定されなかった場合に使う変調パラメータ
+    :param workers: 同時に処理する接続数
+    :param verbose: Trueならリクエストごとにログを出す
+    """
+
+    def __init__(self, address: tuple[str, int], params: ModemParams, workers: int = 4, verbose: bool = False) -> None:
+        super().__init__(address, ModemRequestHandler)
+        self.params = params
+        self.workers = workers
+        self.verbose = verbose
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="エンコード・ノイズ付加・デコードを常駐プロセスで提供するHTTPサーバー")
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help='待ち受けるホスト')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='待ち受けるポート')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='同時に処理する接続数')
+    parser.add_argument('--verbose', action='store_true', help='リクエストごとにログを出す')
+    args = parser.parse_args()
+
+    server = ModemServer((args.host, args.port), ModemParams.from_config(), args.workers, args.verbose)
+    # 最初のリクエストが遅くならないよう、FFTの帯域などのキャッシュを温めておく
+    warm = encode_samples(b"\x00", params=server.params.with_overrides(noise_level=0))
+    decode_samples(warm, params=server.params)
+    print(f"[INFO] http://{args.host}:{args.port} で待ち受けます（workers={args.workers}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
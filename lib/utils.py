@@ -1,21 +1,303 @@
+import hashlib
 import numpy as np
-import wave
 import os
+import struct
+import sys
+import tempfile
+import threading
 import toml
 import io
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, Iterator, Literal, NamedTuple, Optional, Tuple
 
-def read_wav_file(file_path: str) -> np.ndarray:
-    """WAVファイルを読み取り、サンプルデータを返す"""
+WAV_CHUNK_FRAMES = 1 << 20  # iter_wav_chunksで一度に返すフレーム数
+WAV_HEADER_SIZE = 44  # wav_headerが返す標準ヘッダのバイト数
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE  # 実際の形式はfmtチャンクの拡張部分（SubFormat）に入っている
+
+class ConversionCancelled(Exception):
+    """進捗コールバックから送出して、エンコード/デコードを途中で中断するための例外"""
+
+
+class WavInfo(NamedTuple):
+    """WAVヘッダから読み取ったメタデータ"""
+    sample_rate: int
+    sample_width: int  # 1サンプルあたりのバイト数
+    n_channels: int
+    n_frames: int
+    data_offset: int  # dataチャンク本体のファイル先頭からのオフセット
+    format_tag: int = WAVE_FORMAT_PCM  # 1=整数PCM, 3=IEEE浮動小数点
+
+
+class SampleFormat(NamedTuple):
+    """出力するサンプルの形式"""
+    dtype: str  # ファイルに書くサンプルのdtype
+    format_tag: int  # WAVヘッダのフォーマットタグ
+    header: bool  # Falseならヘッダなしの生PCM（パイプで他のツールへ渡す用）
+
+
+# 出力形式の一覧（名前 → SampleFormat）
+# pcm8はpcm16の半分のサイズで、FSKの判定には十分な精度がある
+SAMPLE_FORMATS = {
+    "pcm16": SampleFormat('<i2', WAVE_FORMAT_PCM, True),
+    "pcm8": SampleFormat('u1', WAVE_FORMAT_PCM, True),
+    "float32": SampleFormat('<f4', WAVE_FORMAT_IEEE_FLOAT, True),
+    "raw": SampleFormat('<i2', WAVE_FORMAT_PCM, False),  # ヘッダなしの16ビットリトルエンディアン
+}
+DEFAULT_SAMPLE_FORMAT = "pcm16"
+
+
+def get_sample_format(name: str) -> SampleFormat:
+    """名前から出力形式を返す（未対応の名前なら ValueError）"""
+    try:
+        return SAMPLE_FORMATS[name]
+    except KeyError:
+        raise ValueError(f"未対応の出力形式です: {name}（{', '.join(SAMPLE_FORMATS)} のいずれか）") from None
+
+
+def convert_samples(samples: np.ndarray, output_format: str = DEFAULT_SAMPLE_FORMAT, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    int16のサンプル配列を出力形式のdtypeに変換する（pcm16/rawならコピーしない）。
+
+    :param out: 結果を書き込む配列（dtypeは出力形式のもの）
+    """
+    dtype = np.dtype(get_sample_format(output_format).dtype)
+    if dtype.kind == 'u':
+        # 上位8ビットを取り出して、0〜255（無音=128）のオフセット付きにする
+        converted = ((samples >> 8) + 128).astype(dtype)
+    elif dtype.kind == 'f':
+        converted = (samples / 32768.0).astype(dtype)
+    else:
+        converted = np.asarray(samples).astype(dtype, copy=False)
+    if out is None:
+        return converted
+    np.copyto(out, converted)
+    return out
+
+
+def wav_size(n_frames: int, output_format: str = DEFAULT_SAMPLE_FORMAT) -> int:
+    """n_frames フレームのモノラル音声を output_format で書き出したときのバイト数"""
+    fmt = get_sample_format(output_format)
+    return (WAV_HEADER_SIZE if fmt.header else 0) + n_frames * np.dtype(fmt.dtype).itemsize
+
+
+def _parse_wav_header(f: BinaryIO, total_size: int, name: str) -> WavInfo:
+    """ファイルオブジェクトの先頭からRIFFヘッダを解析し、fmtチャンクとdataチャンクの位置を返す"""
+    riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+    if riff != b'RIFF' or wave_id != b'WAVE':
+        raise ValueError(f"WAVファイルではありません: {name}")
+    fmt: Optional[tuple[int, int, int, int]] = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError(f"dataチャンクが見つかりません: {name}")
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            body = f.read(chunk_size + (chunk_size & 1))
+            format_tag, n_channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # SubFormat GUIDの先頭2バイトが本来のフォーマットタグ
+                format_tag, = struct.unpack('<H', body[24:26])
+            fmt = (format_tag, n_channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError(f"fmtチャンクがありません: {name}")
+            data_offset = f.tell()
+            # 書き込み途中のファイルなどでサイズが壊れている場合はファイル末尾までとみなす
+            data_size = min(chunk_size, total_size - data_offset)
+            format_tag, n_channels, sample_rate, bits = fmt
+            sample_width = bits // 8
+            if sample_width == 0 or n_channels == 0:
+                raise ValueError(f"fmtチャンクが不正です: {name}")
+            return WavInfo(
+                sample_rate=sample_rate,
+                sample_width=sample_width,
+                n_channels=n_channels,
+                n_frames=data_size // (sample_width * n_channels),
+                data_offset=data_offset,
+                format_tag=format_tag,
+            )
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def read_wav_header(file_path: str) -> WavInfo:
+    """RIFFヘッダを解析し、fmtチャンクとdataチャンクの位置を返す"""
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
 
-    with wave.open(file_path, 'r') as wav_file:
-        n_frames = wav_file.getnframes()
-        frames = wav_file.readframes(n_frames)
-        samples = np.frombuffer(frames, dtype=np.int16)
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        return _parse_wav_header(f, file_size, file_path)
+
+
+def wav_header(
+    n_frames: int,
+    sample_rate: int,
+    sample_width: int = 2,
+    n_channels: int = 1,
+    format_tag: int = WAVE_FORMAT_PCM
+) -> bytes:
+    """WAVの標準44バイトヘッダ（RIFF/fmt/dataチャンクの先頭）を作る"""
+    block_align = sample_width * n_channels
+    data_size = n_frames * block_align
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, format_tag, n_channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size,
+    )
+
+
+def format_header(n_frames: int, sample_rate: int, output_format: str = DEFAULT_SAMPLE_FORMAT) -> bytes:
+    """output_format のモノラル音声の先頭に書くヘッダ（生PCMなら空）"""
+    fmt = get_sample_format(output_format)
+    if not fmt.header:
+        return b''
+    return wav_header(n_frames, sample_rate, np.dtype(fmt.dtype).itemsize, 1, fmt.format_tag)
+
+
+def iter_wav_bytes(samples: np.ndarray, sample_rate: int, output_format: str = DEFAULT_SAMPLE_FORMAT) -> Iterator[Any]:
+    """
+    モノラルWAV（生PCMならヘッダなし）のバイト列を、ヘッダ→dataの順にチャンク単位で返す（全体のコピーを作らない）。
+
+    :param samples: int16のサンプル配列
+    :param output_format: 出力形式（SAMPLE_FORMATS の名前）
+    """
+    header = format_header(len(samples), sample_rate, output_format)
+    if header:
+        yield header
+    for start in range(0, len(samples), WAV_CHUNK_FRAMES):
+        yield np.ascontiguousarray(convert_samples(samples[start:start + WAV_CHUNK_FRAMES], output_format))
+
+
+def write_wav(file_path: str, samples: np.ndarray, sample_rate: int, output_format: str = DEFAULT_SAMPLE_FORMAT) -> str:
+    """
+    サンプル配列をモノラルWAV（既定は16ビット）として書き出し、書き込みと同時に計算したファイル全体のMD5を返す。
+    """
+    md5 = hashlib.md5()
+    with open(file_path, 'wb') as f:
+        for chunk in iter_wav_bytes(samples, sample_rate, output_format):
+            f.write(chunk)
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def wav_md5(samples: np.ndarray, sample_rate: int, output_format: str = DEFAULT_SAMPLE_FORMAT) -> str:
+    """write_wavで書き出した場合のWAVファイルのMD5を、ファイルを書かずに計算する"""
+    md5 = hashlib.md5()
+    for chunk in iter_wav_bytes(samples, sample_rate, output_format):
+        md5.update(chunk)
+    return md5.hexdigest()
+
+
+def is_mapped_format(info: WavInfo) -> bool:
+    """16/24/32ビット整数PCMなら、上位16ビットをコピーせずにint16として参照できる"""
+    return info.format_tag == WAVE_FORMAT_PCM and info.sample_width in (2, 3, 4)
+
+
+def _channel_samples(data: np.ndarray, info: WavInfo, channel: int) -> np.ndarray:
+    """
+    dataチャンクのバイト列（uint8配列）から、channel 番目のチャンネルをint16の値のサンプル配列として取り出す。
+    16/24/32ビット整数PCMは各サンプルの上位2バイトをストライド付きのビューで参照する（コピーなし）。
+    8ビットとfloat32は16ビット相当の値に変換する（コピーあり）。
+    """
+    if not (0 <= channel < info.n_channels):
+        raise ValueError(f"チャンネルは0〜{info.n_channels - 1}で指定してください（指定値: {channel}）")
+    width = info.sample_width
+    stride = width * info.n_channels
+    offset = channel * width
+    if is_mapped_format(info):
+        # リトルエンディアンなので、上位16ビットはサンプルの末尾2バイト
+        return np.ndarray((info.n_frames,), dtype='<i2', buffer=data, offset=offset + width - 2, strides=(stride,))
+    if info.format_tag == WAVE_FORMAT_PCM and width == 1:
+        view = np.ndarray((info.n_frames,), dtype='u1', buffer=data, offset=offset, strides=(stride,))
+        return (view.astype(np.int16) - 128) << 8
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT and width == 4:
+        view = np.ndarray((info.n_frames,), dtype='<f4', buffer=data, offset=offset, strides=(stride,))
+        return np.clip(view * 32768.0, -32768, 32767).astype(np.int16)
+    raise ValueError(f"未対応のWAV形式です: フォーマットタグ{info.format_tag}, {width * 8}ビット")
+
+
+def read_wav_with_info(file_path: str, writable: bool = False, channel: int = 0) -> tuple[np.ndarray, WavInfo]:
+    """
+    WAVファイルのdataチャンクをメモリマップし、指定チャンネルのサンプル配列（int16の値）とヘッダ情報を返す。
+    16ビットモノラルはマップそのもの、16/24/32ビット整数PCMはマップ上のストライド付きビューなのでコピーしない。
+    8ビットとfloat32は16ビット相当の値に変換する。
+
+    :param writable: Trueならサンプルへの書き込みがファイルに反映されるマップを返す（整数PCMの16ビット以上のみ）
+    :param channel: 複数チャンネルのWAVで取り出すチャンネル（0から）
+    """
+    info = read_wav_header(file_path)
+    if writable and not is_mapped_format(info):
+        raise ValueError(f"この形式のWAVはその場で書き換えられません: {info.sample_width * 8}ビット")
+    if info.n_frames == 0:
+        return np.zeros(0, dtype=np.int16), info
+    mode: Literal['r', 'r+'] = 'r+' if writable else 'r'
+    if info.sample_width == 2 and info.n_channels == 1 and info.format_tag == WAVE_FORMAT_PCM:
+        samples = np.memmap(file_path, dtype=np.dtype('<i2'), mode=mode, offset=info.data_offset, shape=(info.n_frames,))
+        return samples, info
+    data = np.memmap(
+        file_path, dtype=np.uint8, mode=mode, offset=info.data_offset,
+        shape=(info.n_frames * info.sample_width * info.n_channels,)
+    )
+    return _channel_samples(data, info, channel), info
+
+
+def read_wav_bytes(data: Any, channel: int = 0) -> tuple[np.ndarray, WavInfo]:
+    """
+    メモリ上のWAVバイト列（bytes/bytearray/memoryview）を解析し、
+    指定チャンネルのサンプル配列（int16の値、16ビット以上の整数PCMはコピーなしのビュー）とヘッダ情報を返す。
+    """
+    buffer = memoryview(data).cast('B')
+    try:
+        info = _parse_wav_header(io.BytesIO(buffer), len(buffer), "<bytes>")
+    except struct.error:
+        raise ValueError("WAVヘッダが途中で切れています") from None
+    n_bytes = info.n_frames * info.sample_width * info.n_channels
+    return _channel_samples(np.frombuffer(buffer, dtype=np.uint8, count=n_bytes, offset=info.data_offset), info, channel), info
+
+
+def read_raw_pcm(file_path: str) -> np.ndarray:
+    """
+    ヘッダなしの16ビットリトルエンディアン・モノラルPCM（出力形式 raw）を読む。
+    ファイルはメモリマップ、"-" なら標準入力を最後まで読む。
+    """
+    if file_path == "-":
+        data = sys.stdin.buffer.read()
+        return np.frombuffer(data, dtype='<i2', count=len(data) // 2)
+    n_samples = os.path.getsize(file_path) // 2
+    if n_samples == 0:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(file_path, dtype='<i2', mode='r', shape=(n_samples,))
+
+
+def flush_samples(samples: np.ndarray) -> None:
+    """read_wav_with_info(writable=True) で得た配列への書き込みをファイルに反映する"""
+    array: Optional[np.ndarray] = samples
+    while array is not None:
+        if isinstance(array, np.memmap):
+            array.flush()
+            return
+        array = array.base
+
+
+def read_wav_file(file_path: str, channel: int = 0) -> np.ndarray:
+    """WAVファイルを読み取り、サンプルデータを返す（16ビット以上の整数PCMはメモリマップによるゼロコピー）"""
+    samples, _ = read_wav_with_info(file_path, channel=channel)
     return samples
 
+
+def iter_wav_chunks(file_path: str, chunk_frames: int = WAV_CHUNK_FRAMES, channel: int = 0) -> Iterator[np.ndarray]:
+    """
+    WAVファイルの指定チャンネルのサンプルを chunk_frames フレームずつ順に返す。
+    各チャンクはメモリマップのビューなので、ファイル全体をRAMに読み込まない。
+    """
+    samples, _ = read_wav_with_info(file_path, channel=channel)
+    for start in range(0, len(samples), chunk_frames):
+        yield samples[start:start + chunk_frames]
+
+
 def calculate_fft(segment: np.ndarray, sample_rate: int) -> tuple[np.ndarray, np.ndarray]:
     """FFTを計算し、周波数と振幅を返す"""
     fft_result = np.fft.fft(segment, n=2**int(np.ceil(np.log2(len(segment))) + 1))
@@ -23,37 +305,162 @@ def calculate_fft(segment: np.ndarray, sample_rate: int) -> tuple[np.ndarray, np
     magnitude = np.abs(fft_result)
     return freqs, magnitude
 
+def bytes_to_bits(data: bytes) -> np.ndarray:
+    """バイト列を0/1のuint8配列（MSBファースト）に展開する"""
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+def bits_to_bytes(bits: np.ndarray) -> bytes:
+    """0/1の配列を8ビットずつバイト列に詰める（端数のビットは捨てる）"""
+    n_bytes = len(bits) // 8
+    return np.packbits(np.asarray(bits[:n_bytes * 8], dtype=np.uint8)).tobytes()
+
+class BitErrorStats(NamedTuple):
+    """正解のビット列と復元したビット列の比較結果"""
+    n_bits: int  # 正解のビット数
+    bit_errors: int  # 誤ったビットの数（復元結果が短ければ足りない分も誤りに数える）
+    n_bytes: int  # 正解のバイト数（端数のビットも1バイトに数える）
+    byte_errors: int  # 1ビットでも誤りを含むバイトの数
+    first_error: Optional[int]  # 最初に誤ったビットの位置（誤りがなければNone）
+
+    @property
+    def ber(self) -> float:
+        """ビット誤り率"""
+        return self.bit_errors / max(self.n_bits, 1)
+
+    @property
+    def byte_error_rate(self) -> float:
+        """バイト誤り率"""
+        return self.byte_errors / max(self.n_bytes, 1)
+
+    def describe(self) -> str:
+        first = "なし" if self.first_error is None else f"{self.first_error}ビット目"
+        return (
+            f"ビット誤り {self.bit_errors}/{self.n_bits} (BER {self.ber:.3g}), "
+            f"バイト誤り {self.byte_errors}/{self.n_bytes} ({self.byte_error_rate:.3g}), 最初の誤り: {first}"
+        )
+
+
+def bit_error_stats(expected: np.ndarray, actual: np.ndarray) -> BitErrorStats:
+    """
+    正解と復元結果の0/1配列をまとめて比較し、ビット誤り・バイト誤り・最初の誤りの位置を求める。
+    復元結果の余分なビット（M値FSKやFDMの穴埋めなど）は無視する。
+    """
+    expected = np.asarray(expected, dtype=np.uint8)
+    actual = np.asarray(actual, dtype=np.uint8)
+    n = min(len(expected), len(actual))
+    n_bytes = (len(expected) + 7) // 8
+    # 足りない分を誤りとして埋めた、正解と同じ長さ（8の倍数に切り上げ）の誤りマスク
+    mask = np.zeros(n_bytes * 8, dtype=bool)
+    mask[:len(expected)] = True
+    np.not_equal(expected[:n], actual[:n], out=mask[:n])
+    errors = np.flatnonzero(mask[:len(expected)])
+    return BitErrorStats(
+        n_bits=len(expected),
+        bit_errors=len(errors),
+        n_bytes=n_bytes,
+        byte_errors=int(np.count_nonzero(mask.reshape(-1, 8).any(axis=1))),
+        first_error=int(errors[0]) if len(errors) > 0 else None,
+    )
+
+def bitstring_to_bits(bit_string: str) -> np.ndarray:
+    """'0'/'1'の文字列を0/1のuint8配列に変換する"""
+    validate_bit_string(bit_string)
+    return np.frombuffer(bit_string.encode('ascii'), dtype=np.uint8) - ord('0')
+
+def bits_to_bitstring(bits: np.ndarray) -> str:
+    """0/1の配列を'0'/'1'の文字列に変換する"""
+    return (np.asarray(bits, dtype=np.uint8) + ord('0')).tobytes().decode('ascii')
+
+def validate_bits(bits: np.ndarray) -> None:
+    """ビット配列が0と1だけで構成されているかを検証"""
+    if len(bits) > 0 and np.max(bits) > 1:
+        raise ValueError("ビット列には0と1のみを含めてください。")
+
 def validate_bit_string(bit_string: str) -> None:
     """ビット列が有効かどうかを検証"""
-    if not all(bit in '01' for bit in bit_string):
-        raise ValueError("ビット列には0と1のみを含めてください。")
+    try:
+        codes = np.frombuffer(bit_string.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        raise ValueError("ビット列には0と1のみを含めてください。") from None
+    validate_bits(codes - ord('0'))
 
 def validate_noise_level(noise_level: int) -> None:
     """ノイズレベルが有効かどうかを検証"""
     if not (0 <= noise_level <= 5):
         raise ValueError("ノイズレベルは0〜5の範囲で指定してください。")
 
+# config.tomlの読み込み結果のキャッシュ（絶対パス -> (更新時刻・サイズ・inode, 内容)）
+_config_cache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+_config_lock = threading.Lock()
+
+
+def _config_stamp(config_path: str) -> Tuple[int, int, int]:
+    st = os.stat(config_path)
+    # os.replaceで置き換えるとinodeが変わるので、同じ時刻・サイズの書き換えも検出できる
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
 def load_config_toml(config_path: str = "config.toml") -> Dict[str, Any]:
-    """config.tomlを読み込んでdictで返す（encoding=utf-8固定）"""
+    """
+    config.tomlを読み込んでdictで返す（encoding=utf-8固定）。
+    ファイルが更新されていなければ前回の読み込み結果を使う。
+    """
+    key = os.path.abspath(config_path)
+    stamp = _config_stamp(config_path)
+    with _config_lock:
+        cached = _config_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return dict(cached[1])
     with open(config_path, "r", encoding="utf-8") as f:
-        return toml.load(io.StringIO(f.read()))
+        config = toml.load(io.StringIO(f.read()))
+    with _config_lock:
+        _config_cache[key] = (stamp, config)
+    # 呼び出し側が書き換えてもキャッシュに影響しないようにコピーを返す
+    return dict(config)
 
 def get_config_value(key: str, config_path: str = "config.toml") -> Optional[Any]:
     """config.tomlからkeyの値を取得"""
     config = load_config_toml(config_path)
     return config.get(key)
 
-def set_config_value(key: str, value: Any, config_path: str = "config.toml") -> None:
-    """config.tomlのkeyの値をvalueに書き換える（他はそのまま）"""
-    with open(config_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    with open(config_path, "w", encoding="utf-8") as f:
-        found = False
+def set_config_values(values: Dict[str, Any], config_path: str = "config.toml") -> None:
+    """
+    config.tomlの複数のkeyをまとめて書き換える（他の行はそのまま）。
+    一時ファイルに書いてから置き換えるので、読み手が書きかけの内容を見ることはない。
+    内容が変わらない場合は書き込まない。
+    """
+    with _config_lock:
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        remaining = dict(values)
+        new_lines = []
         for line in lines:
-            if line.strip().startswith(f"{key}"):
-                f.write(f"{key} = {value}\n")
-                found = True
+            name = line.split("=", 1)[0].strip() if "=" in line and not line.lstrip().startswith("#") else None
+            if name in remaining:
+                new_lines.append(toml.dumps({name: remaining.pop(name)}))
             else:
-                f.write(line)
-        if not found:
-            f.write(f"{key} = {value}\n")
+                new_lines.append(line)
+        if new_lines and not new_lines[-1].endswith("\n"):
+            new_lines[-1] += "\n"
+        for name, value in remaining.items():
+            new_lines.append(toml.dumps({name: value}))
+        if new_lines == lines:
+            return
+        directory = os.path.dirname(os.path.abspath(config_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".toml", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(new_lines)
+            if os.path.exists(config_path):
+                # mkstempは0600で作るので、元ファイルの権限を引き継ぐ
+                os.chmod(tmp_path, os.stat(config_path).st_mode & 0o777)
+            os.replace(tmp_path, config_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def set_config_value(key: str, value: Any, config_path: str = "config.toml") -> None:
+    """config.tomlのkeyの値をvalueに書き換える（他はそのまま）"""
+    set_config_values({key: value}, config_path)
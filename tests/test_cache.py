@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from lib.cache import WavCache, clean_cache_key, noisy_cache_key
+from lib.params import ModemParams
+
+
+class CacheKeyTest(unittest.TestCase):
+    """クリーンな音声のキーは波形を決める値だけで決まり、ノイズ付加後のキーはシードがあるときだけ作る"""
+
+    def setUp(self) -> None:
+        self.params = ModemParams(bitrate=1200, sample_rate=9600, noise_level=2)
+        self.key = clean_cache_key(b"payload", self.params)
+
+    def test_clean_key_depends_on_waveform_params(self) -> None:
+        changes = {
+            "bitrate": 600, "sample_rate": 22050, "modulation": "4fsk", "continuous_phase": True, "channels": 2,
+        }
+        for name, value in changes.items():
+            with self.subTest(name=name):
+                self.assertNotEqual(clean_cache_key(b"payload", self.params.with_overrides(**{name: value})), self.key)
+        self.assertNotEqual(clean_cache_key(b"other", self.params), self.key)
+
+    def test_clean_key_ignores_noise_level(self) -> None:
+        self.assertEqual(clean_cache_key(b"payload", self.params.with_overrides(noise_level=0)), self.key)
+
+    def test_noisy_key(self) -> None:
+        self.assertIsNone(noisy_cache_key(self.key, 2, None))
+        self.assertIsNone(noisy_cache_key(self.key, 0, 1))
+        keys = {noisy_cache_key(self.key, level, seed) for level in (1, 2) for seed in (0, 1)}
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(noisy_cache_key(self.key, 1, 0), noisy_cache_key(self.key, 1, 0))
+
+
+class WavCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.samples = np.arange(1000, dtype=np.int16)
+
+    def test_put_get(self) -> None:
+        cache = WavCache(self.tmp.name)
+        self.assertIsNone(cache.get("missing"))
+        cache.put("a", self.samples, 9600)
+        cached = cache.get("a")
+        assert cached is not None
+        np.testing.assert_array_equal(cached[0], self.samples)
+        self.assertEqual(cached[1], 9600)
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = WavCache(self.tmp.name)
+        for key in ("a", "b"):
+            cache.put(key, self.samples, 9600)
+        # 更新時刻の分解能に左右されないよう、使った順を時刻で明示する
+        now = time.time()
+        os.utime(cache.path("a"), (now - 20, now - 20))
+        os.utime(cache.path("b"), (now - 10, now - 10))
+        self.assertIsNotNone(cache.get("a"))
+        cache.max_bytes = os.path.getsize(cache.path("a")) * 2
+        cache.put("c", self.samples, 9600)
+        self.assertFalse(os.path.exists(cache.path("b")))
+        self.assertTrue(os.path.exists(cache.path("a")))
+        self.assertTrue(os.path.exists(cache.path("c")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,20 @@
+import subprocess
+import sys
+import unittest
+from lib import framing
+
+
+class ClientImportTest(unittest.TestCase):
+    """クライアントはNumPyを読み込まずに、フレームの既定サイズをサーバー側と共有する"""
+
+    def test_does_not_import_numpy(self) -> None:
+        code = (
+            "import sys, lib.client as c; "
+            "print('numpy' in sys.modules, c.FRAME_PAYLOAD_SIZE)"
+        )
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+        self.assertEqual(output, ["False", str(framing.FRAME_PAYLOAD_SIZE)])
+
+
+if __name__ == "__main__":
+    unittest.main()
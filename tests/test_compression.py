@@ -0,0 +1,38 @@
+import os
+import unittest
+from lib.compression import COMPRESSION_HEADER, compress_payload, decompress_payload, is_compressed
+
+
+class CompressionHeaderTest(unittest.TestCase):
+    """compress_payload のヘッダで圧縮の有無を判別し、壊れたデータは ValueError にする"""
+
+    def test_round_trip(self) -> None:
+        data = b"0123456789abcdef" * 256
+        info = compress_payload(data)
+        self.assertNotEqual(info.method, "stored")
+        self.assertLess(len(info.data), len(data))
+        self.assertTrue(is_compressed(info.data))
+        self.assertEqual(decompress_payload(info.data), data)
+
+    def test_incompressible_data_is_stored(self) -> None:
+        data = os.urandom(512)
+        info = compress_payload(data)
+        self.assertEqual(info.method, "stored")
+        self.assertEqual(len(info.data), COMPRESSION_HEADER.size + len(data))
+        self.assertEqual(decompress_payload(info.data), data)
+
+    def test_uncompressed_data_passes_through(self) -> None:
+        for data in (b"", b"hello", bytes(COMPRESSION_HEADER.size + 8)):
+            with self.subTest(data=data):
+                self.assertFalse(is_compressed(data))
+                self.assertEqual(decompress_payload(data), data)
+
+    def test_corruption_raises(self) -> None:
+        compressed = bytearray(compress_payload(b"abc" * 1000).data)
+        compressed[-1] ^= 0xFF
+        with self.assertRaises(ValueError):
+            decompress_payload(bytes(compressed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import unittest
+import numpy as np
+from lib.decode import decode_samples
+from lib.encode import encode_samples
+from lib.params import ModemParams
+from lib.utils import bits_to_bytes
+
+# app.py で選べるサンプリングレート
+SAMPLE_RATES = [8000, 9600, 16000, 22050, 44100, 48000]
+
+
+class DiscriminatorRoundTripTest(unittest.TestCase):
+    """位相連続FSKを周波数弁別でデコードすると、ノイズなしなら先頭・末尾のバイトまで元に戻る"""
+
+    def setUp(self) -> None:
+        self.data = np.random.default_rng(0).integers(0, 256, 200, dtype=np.uint8).tobytes()
+
+    def assert_round_trip(self, bitrate: int, sample_rate: int) -> None:
+        params = ModemParams(bitrate=bitrate, sample_rate=sample_rate, continuous_phase=True)
+        samples = encode_samples(self.data, params=params)
+        restored = bits_to_bytes(decode_samples(samples, detector="discriminator", params=params))
+        self.assertEqual(restored, self.data)
+
+    def test_1200bps(self) -> None:
+        for sample_rate in SAMPLE_RATES:
+            with self.subTest(sample_rate=sample_rate):
+                self.assert_round_trip(1200, sample_rate)
+
+    def test_2400bps(self) -> None:
+        for sample_rate in SAMPLE_RATES:
+            with self.subTest(sample_rate=sample_rate):
+                self.assert_round_trip(2400, sample_rate)
+
+    def test_edges_of_long_signal(self) -> None:
+        # 解析信号を求めるブロック（DISCRIMINATOR_BLOCK）をまたぐ長さでも端のバイトが壊れない
+        self.data = os.urandom(4000)
+        self.assert_round_trip(2400, 48000)
+
+
+if __name__ == "__main__":
+    unittest.main()
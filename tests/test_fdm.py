@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from lib.decode import decode_samples
+from lib.encode import encode_samples
+from lib.modulation import MODULATIONS
+from lib.params import ModemParams
+from lib.utils import bytes_to_bits
+
+SAMPLE_RATES = [8000, 22050, 44100, 48000]
+
+
+class FdmRoundTripTest(unittest.TestCase):
+    """validate() が通すチャンネル数なら、上限のシンボルレートでも fft / goertzel の両方で誤りなく戻る"""
+
+    def test_every_channel_count(self) -> None:
+        data = np.random.default_rng(0).integers(0, 256, 100, dtype=np.uint8).tobytes()
+        expected = bytes_to_bits(data)
+        for name, scheme in MODULATIONS.items():
+            for sample_rate in SAMPLE_RATES:
+                for channels in range(1, scheme.max_channels(sample_rate) + 1):
+                    for continuous_phase in (False, True):
+                        params = ModemParams(
+                            bitrate=int(scheme.max_fdm_symbol_rate), sample_rate=sample_rate, modulation=name,
+                            continuous_phase=continuous_phase, channels=channels
+                        )
+                        params.validate()
+                        samples = encode_samples(data, params=params)
+                        for detector in ("fft", "goertzel"):
+                            with self.subTest(
+                                modulation=name, sample_rate=sample_rate, channels=channels,
+                                continuous_phase=continuous_phase, detector=detector
+                            ):
+                                bits = decode_samples(samples, detector=detector, params=params)
+                                np.testing.assert_array_equal(bits[:len(expected)], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
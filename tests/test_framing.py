@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from lib.framing import coded_frame_size, frame_bytes, unframe_bytes
+
+PAYLOAD_SIZE = 32
+
+
+class FramingRoundTripTest(unittest.TestCase):
+    """frame_bytes → unframe_bytes で元に戻り、誤りは訂正または失敗ブロックとして報告される"""
+
+    def setUp(self) -> None:
+        self.data = np.random.default_rng(0).integers(0, 256, 100, dtype=np.uint8).tobytes()
+        self.framed = bytearray(frame_bytes(self.data, PAYLOAD_SIZE))
+
+    def test_round_trip(self) -> None:
+        report = unframe_bytes(bytes(self.framed), PAYLOAD_SIZE)
+        self.assertEqual(report.data, self.data)
+        self.assertEqual(report.n_blocks, 4)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.corrected_bits, 0)
+
+    def test_burst_error_is_corrected(self) -> None:
+        # インターリーブで連続した誤りは別々の符号語に散らばる
+        self.framed[5] ^= 0xFF
+        report = unframe_bytes(bytes(self.framed), PAYLOAD_SIZE)
+        self.assertEqual(report.data, self.data)
+        self.assertEqual(report.corrected_bits, 8)
+
+    def test_corrupted_block_is_reported(self) -> None:
+        start = coded_frame_size(PAYLOAD_SIZE) * 2
+        self.framed[start:start + 20] = bytes(20)
+        report = unframe_bytes(bytes(self.framed), PAYLOAD_SIZE)
+        self.assertEqual(report.failed, [2])
+        self.assertEqual(report.data[:2 * PAYLOAD_SIZE], self.data[:2 * PAYLOAD_SIZE])
+        self.assertEqual(report.data[3 * PAYLOAD_SIZE:], self.data[3 * PAYLOAD_SIZE:])
+
+    def test_missing_block_is_reported(self) -> None:
+        report = unframe_bytes(bytes(self.framed[:coded_frame_size(PAYLOAD_SIZE) * 3]), PAYLOAD_SIZE)
+        self.assertEqual(report.n_blocks, 4)
+        self.assertEqual(report.failed, [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from lib.params import ModemParams, resolve_params
+
+
+class ValidateTest(unittest.TestCase):
+    """デコードできない組み合わせは resolve_params の時点で ValueError にする"""
+
+    def test_mfsk_symbol_rate(self) -> None:
+        for modulation in ("4fsk", "8fsk"):
+            with self.subTest(modulation=modulation):
+                resolve_params(ModemParams(bitrate=600, sample_rate=8000, modulation=modulation))
+                with self.assertRaises(ValueError):
+                    resolve_params(ModemParams(bitrate=1200, sample_rate=8000, modulation=modulation))
+
+    def test_fdm_symbol_rate(self) -> None:
+        resolve_params(ModemParams(bitrate=600, sample_rate=22050, channels=2))
+        resolve_params(ModemParams(bitrate=2400, sample_rate=22050, channels=1))
+        for bitrate in (1200, 2400):
+            with self.assertRaises(ValueError):
+                resolve_params(ModemParams(bitrate=bitrate, sample_rate=22050, channels=2))
+        resolve_params(ModemParams(bitrate=300, sample_rate=22050, modulation="4fsk", channels=2))
+        with self.assertRaises(ValueError):
+            resolve_params(ModemParams(bitrate=600, sample_rate=22050, modulation="4fsk", channels=2))
+
+    def test_bfsk_default_is_valid(self) -> None:
+        resolve_params(ModemParams(bitrate=1200, sample_rate=9600))
+
+    def test_bfsk_symbol_rate(self) -> None:
+        resolve_params(ModemParams(bitrate=2400, sample_rate=48000))
+        with self.assertRaises(ValueError):
+            resolve_params(ModemParams(bitrate=4800, sample_rate=48000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from lib.decode import StreamingDecoder, decode_samples
+from lib.encode import encode_samples
+from lib.params import ModemParams
+
+CASES = {
+    "bfsk": ModemParams(bitrate=1200, sample_rate=9600),
+    "continuous_phase": ModemParams(bitrate=1200, sample_rate=44100, continuous_phase=True),
+    "4fsk": ModemParams(bitrate=300, sample_rate=8000, modulation="4fsk"),
+    "fdm": ModemParams(bitrate=300, sample_rate=22050, channels=3),
+}
+
+
+class StreamingDecoderTest(unittest.TestCase):
+    """任意の長さのチャンクに分けて feed しても、decode_samples で一括デコードしたビットと同じになる"""
+
+    def test_matches_batch_decode(self) -> None:
+        rng = np.random.default_rng(0)
+        data = rng.integers(0, 256, 61, dtype=np.uint8).tobytes()
+        for name, params in CASES.items():
+            for detector in ("fft", "goertzel"):
+                with self.subTest(case=name, detector=detector):
+                    samples = encode_samples(data, params=params)
+                    expected = decode_samples(samples, detector=detector, params=params)
+                    decoder = StreamingDecoder(params, detector)
+                    cuts = np.sort(rng.integers(0, len(samples), 20))
+                    parts = [decoder.feed(chunk) for chunk in np.split(samples, cuts)]
+                    parts.append(decoder.flush())
+                    np.testing.assert_array_equal(np.concatenate(parts), expected)
+                    self.assertEqual(decoder.n_samples, len(samples))
+                    self.assertEqual(decoder.buffered_samples, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
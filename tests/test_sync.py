@@ -0,0 +1,50 @@
+import contextlib
+import io
+import unittest
+import numpy as np
+from lib.decode import decode_samples, find_sync
+from lib.encode import encode_samples
+from lib.params import ModemParams
+from lib.utils import bits_to_bytes
+
+CASES = {
+    "bfsk": ModemParams(bitrate=1200, sample_rate=9600),
+    "continuous_phase": ModemParams(bitrate=1200, sample_rate=44100, continuous_phase=True),
+    "8fsk": ModemParams(bitrate=300, sample_rate=9600, modulation="8fsk"),
+    "fdm": ModemParams(bitrate=600, sample_rate=9600, channels=2),
+}
+# 1シンボルのサンプル数の倍数にならない無音
+LEADING_SILENCE = 37
+TRAILING_SILENCE = 23
+
+
+class FindSyncTest(unittest.TestCase):
+    """先頭と末尾に無音がある音声でも、同期ワードとデータの先頭のサンプル位置を見つける"""
+
+    def test_offsets(self) -> None:
+        data = np.random.default_rng(0).integers(0, 256, 40, dtype=np.uint8).tobytes()
+        for name, params in CASES.items():
+            with self.subTest(case=name):
+                plain = encode_samples(data, params=params)
+                framed = encode_samples(data, params=params, preamble=True)
+                sync_length = len(framed) - len(plain)
+                samples = np.concatenate([
+                    np.zeros(LEADING_SILENCE, dtype=np.int16), framed, np.zeros(TRAILING_SILENCE, dtype=np.int16),
+                ])
+                result = find_sync(
+                    samples, params.samples_per_bit(), params.sample_rate, continuous_phase=params.continuous_phase,
+                    scheme=params.scheme, channels=params.channels
+                )
+                self.assertEqual(result.offset, LEADING_SILENCE)
+                self.assertEqual(result.data_offset, LEADING_SILENCE + sync_length)
+                self.assertGreater(result.peak, 0.9)
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    restored = bits_to_bytes(decode_samples(samples, params=params, sync=True))
+                # 末尾の無音もシンボルとして判定されるので、余分なバイトは呼び出し側で切り捨てる
+                self.assertGreaterEqual(len(restored), len(data))
+                self.assertEqual(restored[:len(data)], data)
+
+
+if __name__ == "__main__":
+    unittest.main()
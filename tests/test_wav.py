@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from lib.utils import (
+    SAMPLE_FORMATS, get_sample_format, read_raw_pcm, read_wav_bytes, read_wav_with_info, wav_header, wav_size, write_wav,
+)
+
+SAMPLE_RATE = 8000
+
+
+def expected_samples(samples: np.ndarray, output_format: str) -> np.ndarray:
+    """output_format で書いて読み戻したときの値（pcm8は下位8ビットが落ちる）"""
+    if np.dtype(get_sample_format(output_format).dtype).itemsize == 1:
+        return (samples >> 8) << 8
+    return samples
+
+
+def pack_pcm(values: np.ndarray, width: int) -> bytes:
+    """int32の値（フレーム数, チャンネル数）を width バイトのリトルエンディアン整数PCMのdataにする"""
+    return values.astype('<i4').view(np.uint8).reshape(values.shape + (4,))[..., :width].tobytes()
+
+
+class SampleFormatTest(unittest.TestCase):
+    """SAMPLE_FORMATS のどの形式で書いても、同じ int16 の値として読み戻せる"""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(0)
+        self.samples = np.concatenate([
+            np.array([-32768, -1, 0, 1, 255, 256, 32767], dtype=np.int16),
+            rng.integers(-32768, 32768, 1000, dtype=np.int16),
+        ])
+
+    def test_round_trip(self) -> None:
+        for output_format, fmt in SAMPLE_FORMATS.items():
+            with self.subTest(output_format=output_format):
+                path = os.path.join(self.tmp.name, f"{output_format}.wav")
+                write_wav(path, self.samples, SAMPLE_RATE, output_format)
+                self.assertEqual(os.path.getsize(path), wav_size(len(self.samples), output_format))
+                expected = expected_samples(self.samples, output_format)
+                if not fmt.header:
+                    np.testing.assert_array_equal(read_raw_pcm(path), expected)
+                    continue
+                samples, info = read_wav_with_info(path)
+                self.assertEqual((info.sample_rate, info.n_channels, info.n_frames), (SAMPLE_RATE, 1, len(self.samples)))
+                np.testing.assert_array_equal(samples, expected)
+                with open(path, "rb") as f:
+                    from_bytes, _ = read_wav_bytes(f.read())
+                np.testing.assert_array_equal(from_bytes, expected)
+
+
+class MultiWidthInputTest(unittest.TestCase):
+    """24/32ビット・複数チャンネルの整数PCMは、指定チャンネルの上位16ビットを読む"""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, values: np.ndarray, width: int) -> str:
+        path = os.path.join(self.tmp.name, f"{width * 8}bit_{values.shape[1]}ch.wav")
+        with open(path, "wb") as f:
+            f.write(wav_header(len(values), SAMPLE_RATE, width, values.shape[1]))
+            f.write(pack_pcm(values, width))
+        return path
+
+    def test_24bit_stereo(self) -> None:
+        values = np.random.default_rng(1).integers(-(1 << 23), 1 << 23, (500, 2))
+        values[:3] = [[-(1 << 23), (1 << 23) - 1], [-1, 0], [255, 256]]
+        path = self.write(values, 3)
+        for channel in (0, 1):
+            with self.subTest(channel=channel):
+                samples, info = read_wav_with_info(path, channel=channel)
+                self.assertEqual((info.sample_width, info.n_channels, info.n_frames), (3, 2, len(values)))
+                np.testing.assert_array_equal(samples, values[:, channel] >> 8)
+                with open(path, "rb") as f:
+                    from_bytes, _ = read_wav_bytes(f.read(), channel=channel)
+                np.testing.assert_array_equal(from_bytes, values[:, channel] >> 8)
+        with self.assertRaises(ValueError):
+            read_wav_with_info(path, channel=2)
+
+    def test_32bit_mono(self) -> None:
+        values = np.random.default_rng(2).integers(-(1 << 31), 1 << 31, (500, 1))
+        samples, _ = read_wav_with_info(self.write(values, 4))
+        np.testing.assert_array_equal(samples, values[:, 0] >> 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from lib import encode
+from lib.decode import decode_bits, decode_samples
+from lib.encode import encode_samples, synthesize_to_file
+from lib.params import ModemParams
+from lib.utils import bytes_to_bits, read_wav_with_info, write_wav
+
+CASES = {
+    "bfsk": ModemParams(bitrate=1200, sample_rate=9600),
+    "continuous_phase": ModemParams(bitrate=1200, sample_rate=44100, continuous_phase=True),
+    "fdm": ModemParams(bitrate=300, sample_rate=22050, modulation="4fsk", channels=3),
+}
+
+
+class ParallelDecodeTest(unittest.TestCase):
+    """シンボル境界で分割してプロセスプールで判定しても、workers=1 とビット単位で一致する"""
+
+    def test_matches_single_worker(self) -> None:
+        # 808ビット = 16シャードで割り切れない数。末尾には1シンボルに満たない端数も付ける
+        data = np.random.default_rng(0).integers(0, 256, 101, dtype=np.uint8).tobytes()
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, params in CASES.items():
+                samples = encode_samples(data, params=params)
+                samples = np.concatenate([samples, samples[:3]])
+                path = os.path.join(tmp, f"{name}.wav")
+                write_wav(path, samples, params.sample_rate)
+                for detector in ("fft", "goertzel"):
+                    with self.subTest(case=name, detector=detector):
+                        expected = decode_samples(samples, detector=detector, params=params)
+                        np.testing.assert_array_equal(expected[:len(data) * 8], bytes_to_bits(data))
+                        # サンプル配列は共有メモリ経由、WAVファイルはメモリマップ経由でワーカーに渡る
+                        np.testing.assert_array_equal(
+                            decode_samples(samples, detector=detector, workers=4, params=params), expected
+                        )
+                        np.testing.assert_array_equal(
+                            decode_bits(path, detector=detector, workers=4, params=params), expected
+                        )
+
+
+class ParallelEncodeTest(unittest.TestCase):
+    """シャードごとに並列に合成しても、ノイズのシードを指定すれば workers=1 とバイト単位で一致する"""
+
+    def test_matches_single_worker(self) -> None:
+        bits = np.random.default_rng(0).integers(0, 2, 1001, dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(encode, "ENCODE_SHARD_SAMPLES", 1000):
+            for name, params in CASES.items():
+                tones = encode.carrier_tones(params.scheme, 1, params.sample_rate)
+                for output_format in ("pcm16", "pcm8", "float32"):
+                    with self.subTest(case=name, output_format=output_format):
+                        paths = []
+                        for workers in (1, 4):
+                            path = os.path.join(tmp, f"{name}_{output_format}_{workers}.wav")
+                            # 1001ビットは1シャードのビット数で割り切れない
+                            synthesize_to_file(
+                                bits, params.samples_per_bit(), params.sample_rate, 0, path, workers,
+                                continuous_phase=params.continuous_phase, tones=tones, output_format=output_format,
+                                seed=1,
+                            )
+                            paths.append(path)
+                        with open(paths[0], "rb") as f1, open(paths[1], "rb") as f4:
+                            self.assertEqual(f1.read(), f4.read())
+                        _, info = read_wav_with_info(paths[0])
+                        self.assertEqual(info.n_frames, encode.total_samples(len(bits), params.samples_per_bit()))
+
+
+if __name__ == "__main__":
+    unittest.main()